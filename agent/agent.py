@@ -2,10 +2,13 @@ from __future__ import annotations
 
 from livekit.agents import JobContext, cli, WorkerOptions
 from .helper.entrypoint_handler import handle_entrypoint
+from .helper.rag_connector import rag_index, embedding_cache
 
 def prewarm_fnc(proc):
     """Prewarm function for session initialization"""
-    pass
+    # Map the knowledge base index and load frequent query embeddings before the first call needs them
+    rag_index.warm()
+    embedding_cache.warm()
 
 async def entrypoint(ctx: JobContext):
     """Main entrypoint for the agent - delegates to handler"""
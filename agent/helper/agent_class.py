@@ -19,6 +19,7 @@ from utils.utils import load_prompt
 from utils.gpt_inferencer import LLMPromptRunner
 from utils.number_to_conversational_string import convert_number_to_conversational
 from utils.preprocess_text_before_tts import preprocess_text
+from utils.plivo_barge_in import INTERRUPT_TOPIC
 from .config_manager import config_manager
 from .call_handlers import CallState
 from .database_helpers import insert_call_end_async
@@ -315,6 +316,23 @@ class VoiceServiceAgent(Agent, BaseCustomerServiceAgent):
         
         logger.info(f"Voice agent {agent_name} initialized")
 
+    def enable_barge_in_signal(self, session, room: rtc.Room):
+        """Tell the telephony bridge when speech is interrupted so it can flush carrier-buffered audio"""
+        def on_speech_done(handle):
+            if handle.interrupted and room.isconnected():
+                asyncio.create_task(self._publish_interruption(room))
+
+        @session.on("speech_created")
+        def on_speech_created(ev):
+            ev.speech_handle.add_done_callback(on_speech_done)
+
+    async def _publish_interruption(self, room: rtc.Room):
+        try:
+            await room.local_participant.publish_data(b"interrupted", reliable=True, topic=INTERRUPT_TOPIC)
+            logger.debug("Published barge-in signal")
+        except Exception as e:
+            logger.error(f"Failed to publish barge-in signal: {e}")
+
 
     async def send_message(self, message: str, message_type: str = "text"):
         """Send a message through LiveKit data channels"""
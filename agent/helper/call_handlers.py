@@ -11,6 +11,7 @@ from livekit import rtc, api
 from .config_manager import config_manager
 from .logging_config import get_logger
 from .database_helpers import insert_call_start_async
+from utils.call_setup_timeline import report_setup_timeline
 import os
 from dotenv import load_dotenv
 logger = get_logger(__name__)
@@ -28,6 +29,22 @@ class CallState:
         self.start_time = None
         self.room_name = None
         self.participant_identity = None
+        # CallSetupTimeline of this call (SIP voice calls)
+        self.setup_timeline = None
+
+    def mark_setup(self, phase: str):
+        if self.setup_timeline is not None and phase:
+            self.setup_timeline.mark(phase)
+
+def track_setup_greeting(session, call_state: CallState):
+    """Complete the call's setup timeline when the agent first speaks (the on_enter greeting) and report it"""
+    @session.on("agent_state_changed")
+    def on_agent_state_changed(ev):
+        timeline = call_state.setup_timeline
+        if ev.new_state == "speaking" and timeline is not None and not timeline.finished:
+            timeline.mark("greeting_started")
+            timeline.finished = True
+            asyncio.create_task(report_setup_timeline(timeline))
 
 async def handle_outbound_sip_call(ctx, phone_number: str, participant_identity: str, 
                                  dial_info: Dict[str, Any], agent_name: str, call_state: CallState) -> Optional[rtc.RemoteParticipant]:
@@ -47,106 +64,27 @@ async def handle_outbound_sip_call(ctx, phone_number: str, participant_identity:
                 wait_until_answered=False,
             )
         )
+        call_state.mark_setup("sip_participant_created")
         
         # Wait for participant to join
         participant = await ctx.wait_for_participant(identity=participant_identity)
         logger.info(f"Participant joined: {participant.identity}")
+        call_state.mark_setup("participant_joined")
         
-        # Monitor call state with timeout
-        start_time = perf_counter()
-        timeout = 45  # 45 second timeout
-        last_status = None  # Track status changes to reduce log noise
+        # Wake the status loop as soon as sip.callStatus changes (polling alone adds up to 0.5s)
+        status_changed = asyncio.Event()
         
-        while perf_counter() - start_time < timeout:
-            call_status = participant.attributes.get("sip.callStatus")
-            disconnect_reason = participant.disconnect_reason
-            
-            # Only log when status changes to reduce noise
-            if call_status != last_status:
-                logger.info(f"Call status changed: {call_status}, Disconnect reason: {disconnect_reason}")
-                last_status = call_status
-            
-            if call_status == "active":
-                # User picked up
-                call_state.call_started = True
-                call_state.start_time = datetime.now()
-                
-                # Use async database operation
-                await insert_call_start_async(
-                    ctx.room.name, agent_name, "started", dial_info,
-                    dial_info.get('name', "Outbound Call"),
-                    CALLING_NUMBER,
-                    phone_number, 
-                    "Outbound",
-                    dial_info.get('user_id', 0)
-                )
-                logger.info("User has picked up - Call started")
-                return participant
-                
-            elif disconnect_reason == rtc.DisconnectReason.USER_REJECTED:
-                # User rejected the call
-                await insert_call_start_async(
-                    ctx.room.name, agent_name, "Call rejected", dial_info,
-                    dial_info.get('name', "Outbound Call"),
-                    CALLING_NUMBER,
-                    phone_number, 
-                    "Outbound",
-                    dial_info.get('user_id', 0)
-                )
-                logger.info("User rejected the call")
-                ctx.shutdown()
-                return None
-                
-            elif disconnect_reason == rtc.DisconnectReason.USER_UNAVAILABLE:
-                # User did not pick up
-                await insert_call_start_async(
-                    ctx.room.name, agent_name, "User did not pick", dial_info,
-                    dial_info.get('name', "Outbound Call"),
-                    CALLING_NUMBER,
-                    phone_number, 
-                    "Outbound",
-                    dial_info.get('user_id', 0)
-                )
-                logger.info("User did not pick up")
-                ctx.shutdown()
-                return None
-                
-            elif call_status in ["failed", "busy", "no-answer"]:
-                # Call failed for various reasons
-                reason_map = {
-                    "failed": "Call failed",
-                    "busy": "User busy",
-                    "no-answer": "User did not pick"
-                }
-                status = reason_map.get(call_status, f"Call {call_status}")
-                
-                await insert_call_start_async(
-                    ctx.room.name, agent_name, status, dial_info,
-                    dial_info.get('name', "Outbound Call"),
-                    CALLING_NUMBER,
-                    phone_number, 
-                    "Outbound",
-                    dial_info.get('user_id', 0)
-                )
-                logger.info(f"Call ended: {status}")
-                ctx.shutdown()
-                return None
-            
-            # Wait a bit before checking again
-            await asyncio.sleep(0.5)
+        def on_attributes_changed(changed_attributes, changed_participant):
+            if changed_participant.identity == participant_identity and "sip.callStatus" in changed_attributes:
+                call_state.mark_setup(changed_attributes["sip.callStatus"])
+                status_changed.set()
         
-        # Timeout reached
-        await insert_call_start_async(
-            ctx.room.name, agent_name, "Call timeout", dial_info,
-            dial_info.get('name', "Outbound Call"),
-            CALLING_NUMBER,
-            phone_number, 
-            "Outbound",
-            dial_info.get('user_id', 0)
-        )
-        logger.info("Call timed out")
-        ctx.shutdown()
-        return None
+        ctx.room.on("participant_attributes_changed", on_attributes_changed)
+        try:
+            return await _wait_for_outbound_answer(ctx, participant, phone_number, dial_info, agent_name,
+                                                   call_state, status_changed)
+        finally:
+            ctx.room.off("participant_attributes_changed", on_attributes_changed)
         
     except api.TwirpError as e:
         error_msg = f"SIP Error: {e.message}"
@@ -167,10 +105,116 @@ async def handle_outbound_sip_call(ctx, phone_number: str, participant_identity:
         ctx.shutdown()
         return None
 
+async def _wait_for_outbound_answer(ctx, participant: rtc.RemoteParticipant, phone_number: str,
+                                    dial_info: Dict[str, Any], agent_name: str, call_state: CallState,
+                                    status_changed: asyncio.Event) -> Optional[rtc.RemoteParticipant]:
+    """Follow sip.callStatus of the dialed participant until it answers, fails or times out"""
+    # Monitor call state with timeout
+    start_time = perf_counter()
+    timeout = 45  # 45 second timeout
+    last_status = None  # Track status changes to reduce log noise
+    
+    while perf_counter() - start_time < timeout:
+        call_status = participant.attributes.get("sip.callStatus")
+        disconnect_reason = participant.disconnect_reason
+        
+        # Only log when status changes to reduce noise
+        if call_status != last_status:
+            logger.info(f"Call status changed: {call_status}, Disconnect reason: {disconnect_reason}")
+            last_status = call_status
+            call_state.mark_setup(call_status)
+        
+        if call_status == "active":
+            # User picked up
+            call_state.call_started = True
+            call_state.start_time = datetime.now()
+            
+            # Use async database operation
+            await insert_call_start_async(
+                ctx.room.name, agent_name, "started", dial_info,
+                dial_info.get('name', "Outbound Call"),
+                CALLING_NUMBER,
+                phone_number, 
+                "Outbound",
+                dial_info.get('user_id', 0)
+            )
+            logger.info("User has picked up - Call started")
+            return participant
+            
+        elif disconnect_reason == rtc.DisconnectReason.USER_REJECTED:
+            # User rejected the call
+            await insert_call_start_async(
+                ctx.room.name, agent_name, "Call rejected", dial_info,
+                dial_info.get('name', "Outbound Call"),
+                CALLING_NUMBER,
+                phone_number, 
+                "Outbound",
+                dial_info.get('user_id', 0)
+            )
+            logger.info("User rejected the call")
+            ctx.shutdown()
+            return None
+            
+        elif disconnect_reason == rtc.DisconnectReason.USER_UNAVAILABLE:
+            # User did not pick up
+            await insert_call_start_async(
+                ctx.room.name, agent_name, "User did not pick", dial_info,
+                dial_info.get('name', "Outbound Call"),
+                CALLING_NUMBER,
+                phone_number, 
+                "Outbound",
+                dial_info.get('user_id', 0)
+            )
+            logger.info("User did not pick up")
+            ctx.shutdown()
+            return None
+            
+        elif call_status in ["failed", "busy", "no-answer"]:
+            # Call failed for various reasons
+            reason_map = {
+                "failed": "Call failed",
+                "busy": "User busy",
+                "no-answer": "User did not pick"
+            }
+            status = reason_map.get(call_status, f"Call {call_status}")
+            
+            await insert_call_start_async(
+                ctx.room.name, agent_name, status, dial_info,
+                dial_info.get('name', "Outbound Call"),
+                CALLING_NUMBER,
+                phone_number, 
+                "Outbound",
+                dial_info.get('user_id', 0)
+            )
+            logger.info(f"Call ended: {status}")
+            ctx.shutdown()
+            return None
+        
+        # Wait for the next status change (or re-check in 0.5s)
+        try:
+            await asyncio.wait_for(status_changed.wait(), timeout=0.5)
+        except asyncio.TimeoutError:
+            pass
+        status_changed.clear()
+    
+    # Timeout reached
+    await insert_call_start_async(
+        ctx.room.name, agent_name, "Call timeout", dial_info,
+        dial_info.get('name', "Outbound Call"),
+        CALLING_NUMBER,
+        phone_number, 
+        "Outbound",
+        dial_info.get('user_id', 0)
+    )
+    logger.info("Call timed out")
+    ctx.shutdown()
+    return None
+
 async def handle_inbound_call(ctx, agent_name: str, call_state: CallState) -> rtc.RemoteParticipant:
     """Handle inbound SIP call"""
     logger.info("Waiting for inbound participant")
     participant = await ctx.wait_for_participant()
+    call_state.mark_setup("participant_joined")
     call_state.call_started = True
     call_state.start_time = datetime.now()
     call_state.participant_identity = participant.identity
@@ -0,0 +1,217 @@
+"""
+Query-embedding cache for knowledge-base lookups.
+
+Callers ask the same few questions all day, and each one would otherwise
+cost an embeddings round trip before the index is even searched. Embeddings
+are cached by normalized query text together with the embedding model and
+dimension (so changing either never serves a mismatched vector) in two tiers:
+
+- an in-process LRU (RAG_EMBEDDING_CACHE_MEMORY entries)
+- an SQLite file shared by every job process on the worker and kept across
+  restarts (RAG_EMBEDDING_CACHE_PATH, "" to disable), trimmed to
+  RAG_EMBEDDING_CACHE_DISK_MAX entries by least recent use
+
+Entries older than RAG_EMBEDDING_CACHE_TTL seconds are dropped from both.
+Disk reads run in a thread and disk writes in the background, so a hit never
+waits on the network and a miss pays no extra latency. If the disk tier fails
+it is switched off and the memory tier keeps working.
+"""
+
+import asyncio
+import collections
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Kept out of the (git-tracked) index directory
+RAG_EMBEDDING_CACHE_PATH = os.getenv("RAG_EMBEDDING_CACHE_PATH", "/app/cache/rag/query_embeddings.sqlite")
+RAG_EMBEDDING_CACHE_MEMORY = int(os.getenv("RAG_EMBEDDING_CACHE_MEMORY", 1024))
+RAG_EMBEDDING_CACHE_DISK_MAX = int(os.getenv("RAG_EMBEDDING_CACHE_DISK_MAX", 20000))
+RAG_EMBEDDING_CACHE_TTL = int(os.getenv("RAG_EMBEDDING_CACHE_TTL", 7 * 24 * 3600))
+# Disk expiry/size trim runs once per this many writes
+_TRIM_EVERY = 100
+
+_PUNCTUATION = re.compile(r"[^\w\s]+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    """Case, width, punctuation and spacing insensitive form of a query"""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = _PUNCTUATION.sub(" ", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+class EmbeddingCache:
+    """Two-tier (memory LRU + SQLite) cache of query embeddings for one model/dimension"""
+
+    def __init__(self, model: str, dimensions: int, path: str = RAG_EMBEDDING_CACHE_PATH,
+                 memory_size: int = RAG_EMBEDDING_CACHE_MEMORY, disk_max: int = RAG_EMBEDDING_CACHE_DISK_MAX,
+                 ttl: int = RAG_EMBEDDING_CACHE_TTL):
+        self.model = model
+        self.dimensions = dimensions
+        self.path = path
+        self.memory_size = memory_size
+        self.disk_max = disk_max
+        self.ttl = ttl
+        self._memory = collections.OrderedDict()  # key -> (vector, created_at)
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._disk_enabled = bool(path)
+        self._writes = 0
+        self._tasks = set()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0,
+                      "memory_evictions": 0, "disk_evictions": 0, "expired": 0, "disk_errors": 0}
+
+    def key(self, text: str) -> str:
+        normalized = normalize_query(text)
+        return hashlib.sha256(f"{self.model}|{self.dimensions}|{normalized}".encode()).hexdigest()
+
+    # Memory tier
+
+    def _memory_get(self, key: str, now: float):
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        if now - entry[1] > self.ttl:
+            del self._memory[key]
+            self.stats["expired"] += 1
+            return None
+        self._memory.move_to_end(key)
+        return entry[0]
+
+    def _memory_put(self, key: str, vector, created_at: float):
+        self._memory[key] = (vector, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+            self.stats["memory_evictions"] += 1
+
+    # Disk tier (blocking; called in threads)
+
+    def _connect(self):
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=1.0, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, created_at REAL NOT NULL, last_used REAL NOT NULL, vector BLOB NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+            self._db = db
+        return self._db
+
+    def _disk(self, operation, *args):
+        """Run a disk operation; the first failure turns the disk tier off"""
+        if not self._disk_enabled:
+            return None
+        with self._db_lock:
+            try:
+                return operation(self._connect(), *args)
+            except (sqlite3.Error, OSError) as e:
+                self.stats["disk_errors"] += 1
+                self._disk_enabled = False
+                logger.warning(f"Query embedding disk cache disabled ({self.path}): {e}")
+                return None
+
+    def _disk_get(self, db, key: str, now: float):
+        row = db.execute("SELECT vector, created_at FROM embeddings WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if now - row[1] > self.ttl:
+            db.execute("DELETE FROM embeddings WHERE key = ?", (key,))
+            self.stats["expired"] += 1
+            return None
+        db.execute("UPDATE embeddings SET last_used = ? WHERE key = ?", (now, key))
+        return array("f", row[0]).tolist(), row[1]
+
+    def _disk_put(self, db, key: str, vector, now: float):
+        db.execute("INSERT OR REPLACE INTO embeddings (key, created_at, last_used, vector) VALUES (?, ?, ?, ?)",
+                   (key, now, now, array("f", vector).tobytes()))
+        self._writes += 1
+        if self._writes % _TRIM_EVERY == 1:
+            self._disk_trim(db, now)
+
+    def _disk_trim(self, db, now: float):
+        expired = db.execute("DELETE FROM embeddings WHERE created_at < ?", (now - self.ttl,)).rowcount
+        evicted = db.execute(
+            "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.disk_max,),
+        ).rowcount
+        self.stats["expired"] += max(expired, 0)
+        self.stats["disk_evictions"] += max(evicted, 0)
+
+    def _disk_recent(self, db, limit: int, now: float):
+        return db.execute(
+            "SELECT key, vector, created_at FROM embeddings WHERE created_at >= ? ORDER BY last_used DESC LIMIT ?",
+            (now - self.ttl, limit),
+        ).fetchall()
+
+    # Public API
+
+    def warm(self):
+        """Preload the most recently used disk entries into memory (called from the worker prewarm hook)"""
+        now = time.time()
+        rows = self._disk(self._disk_recent, self.memory_size, now) or []
+        for key, blob, created_at in reversed(rows):
+            self._memory_put(key, array("f", blob).tolist(), created_at)
+        if rows:
+            logger.info(f"Query embedding cache warmed with {len(rows)} entries")
+
+    async def get(self, text: str):
+        """Cached embedding for a query, or None"""
+        key = self.key(text)
+        now = time.time()
+        vector = self._memory_get(key, now)
+        if vector is not None:
+            self.stats["memory_hits"] += 1
+            return vector
+        if self._disk_enabled:
+            entry = await asyncio.to_thread(self._disk, self._disk_get, key, now)
+            if entry is not None:
+                self.stats["disk_hits"] += 1
+                self._memory_put(key, entry[0], entry[1])
+                return entry[0]
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, text: str, vector):
+        """Store an embedding; the disk write happens in the background"""
+        key = self.key(text)
+        now = time.time()
+        vector = list(vector)
+        self._memory_put(key, vector, now)
+        self.stats["stores"] += 1
+        if self._disk_enabled:
+            task = asyncio.create_task(asyncio.to_thread(self._disk, self._disk_put, key, vector, now))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def get_or_create(self, text: str, create):
+        """Cached embedding, or `await create(text)` and cache the result"""
+        vector = await self.get(text)
+        if vector is None:
+            vector = await create(text)
+            self.put(text, vector)
+        return vector
+
+    def get_stats(self):
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_ratio": round(hits / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "disk_enabled": self._disk_enabled,
+        }
@@ -10,11 +10,13 @@ from utils.hungup_idle_call import idle_call_watcher
 
 from .config_manager import config_manager
 from .logging_config import setup_logging, get_logger
-from .call_handlers import CallState, handle_outbound_sip_call, handle_inbound_call, get_disconnect_reason
+from .call_handlers import (CallState, handle_outbound_sip_call, handle_inbound_call, get_disconnect_reason,
+                            track_setup_greeting)
+from utils.call_setup_timeline import CallSetupTimeline
 from .database_helpers import insert_call_end_async
 from .session_helpers import (create_agent_session, setup_background_audio, 
                              setup_audio_recording, get_room_input_options,
-                             create_chat_session)
+                             create_chat_session, prewarm_agent_session)
 from .transcript_manager import transcript_manager
 from .agent_class import (create_voice_service_agent, create_chat_service_agent, 
                              VoiceServiceAgent, ChatServiceAgent)
@@ -249,11 +251,13 @@ async def create_agent_based_on_modality(modality: str, agent_name: str, appoint
 
 async def handle_entrypoint(ctx: JobContext):
     """Handle the main entrypoint logic with modality support"""
+    setup_timeline = CallSetupTimeline("sip", ctx.job.room.name, origin_phase="job_started")
     await ctx.connect()
     
     # Initialize session state
     session_state = CallState()
     session_state.room_name = ctx.room.name
+    session_state.setup_timeline = setup_timeline
     
     task_refs = {"idle_watcher": None, "chat_timeout_watcher": None}
 
@@ -334,12 +338,21 @@ async def handle_entrypoint(ctx: JobContext):
 
         else:
             # Voice mode
+            session = None
+            if metadata.get("warm_pool"):
+                # Warm-pool room: build the session and open provider connections while waiting for the caller
+                session = create_agent_session(userdata, config, agent_config)
+                prewarm_agent_session(session)
+
             participant = await handle_sip_mode(ctx, contact_info, agent_name, session_state, required_fields)
             if not participant and required_fields:  # Outbound call failed
                 return
 
             # Create voice session
-            session = create_agent_session(userdata, config, agent_config)
+            if session is None:
+                session = create_agent_session(userdata, config, agent_config)
+            agent.enable_barge_in_signal(session, ctx.room)
+            track_setup_greeting(session, session_state)
             
             # Start agent session
             room_input_options = get_room_input_options(config["mode"])
@@ -348,6 +361,7 @@ async def handle_entrypoint(ctx: JobContext):
                 room=ctx.room,
                 room_input_options=room_input_options,
             )
+            session_state.mark_setup("session_started")
             
             if participant:
                 agent.set_participant(participant)
@@ -1,39 +1,62 @@
-from rag.warm_up_rag import embeddings_dimension as EMBEDDINGS_DIMENSION
-from livekit.plugins import openai, rag
-from livekit.plugins import rag
-import pickle
+from rag.warm_up_rag import embeddings_dimension as EMBEDDINGS_DIMENSION, embeddings_model as EMBEDDINGS_MODEL
+from livekit.plugins import openai
 import os
+from .rag_index import RagIndex, reciprocal_rank_fusion
+from .embedding_cache import EmbeddingCache
+from .logging_config import get_logger
 from dotenv import load_dotenv
 load_dotenv(dotenv_path="/app/.env.local")
 # load_dotenv()
 
+logger = get_logger(__name__)
+
 
 
 INDEX_PATH = os.getenv("VECTOR_INDEX_PATH", "/app/rag/vdb_data")
-file_name = os.getenv("VECTOR_FILE_NAME", "knowledge-base-earkart")
-DATA_PATH = os.getenv("VECTOR_DATA_PKL_PATH", f"/app/rag/rag_knowledge_base/{file_name}.pkl")
-with open(DATA_PATH, "rb") as f:
-    paragraphs_by_uuid = pickle.load(f)    
+# "vector": embeddings only; "hybrid": embeddings and BM25 fused by reciprocal rank;
+# "fast": BM25 alone (no network) when it covers the question confidently, hybrid otherwise
+RAG_SEARCH_MODES = ("vector", "hybrid", "fast")
+RAG_SEARCH_MODE = os.getenv("RAG_SEARCH_MODE", "vector")
+if RAG_SEARCH_MODE not in RAG_SEARCH_MODES:
+    raise ValueError(f"Unknown RAG_SEARCH_MODE: {RAG_SEARCH_MODE}")
+# Share of the question's BM25 weight the best paragraph must match to skip embeddings in "fast" mode
+RAG_LEXICAL_MIN_COVERAGE = float(os.getenv("RAG_LEXICAL_MIN_COVERAGE", 0.8))
+# Candidates taken from each retriever before fusion
+RAG_FUSION_CANDIDATES = int(os.getenv("RAG_FUSION_CANDIDATES", 20))
+# Loaded once per process (prewarm_fnc) and swapped when warm_up_rag.py publishes a new index
+rag_index = RagIndex(INDEX_PATH)
+embedding_cache = EmbeddingCache(EMBEDDINGS_MODEL, EMBEDDINGS_DIMENSION)
+
+async def _embed_query(user_msg):
+    user_embedding = await openai.create_embeddings(
+        input=[user_msg],
+        model=EMBEDDINGS_MODEL,
+        dimensions=EMBEDDINGS_DIMENSION,
+    )
+    return user_embedding[0].embedding
 
 async def enrich_with_rag(
     user_msg,
-    top_k=5
+    top_k=5,
+    mode=RAG_SEARCH_MODE
 ) -> None:
     """
     Locate the last user message, use it to query the RAG model for
     the most relevant paragraph, add that to context, and generate a response.
     """
-    annoy_index = rag.annoy.AnnoyIndex.load(INDEX_PATH)
-    user_embedding = await openai.create_embeddings(
-        input=[user_msg],
-        model="text-embedding-3-small",
-        dimensions=EMBEDDINGS_DIMENSION,
-    )
+    snapshot = await rag_index.get()
+    if snapshot is None:
+        logger.warning("Knowledge base search skipped: no RAG index loaded")
+        return []
+    if mode == "vector" or snapshot.lexical is None:
+        embedding = await embedding_cache.get_or_create(user_msg, _embed_query)
+        return snapshot.query(embedding, top_k)
 
-    results = annoy_index.query(user_embedding[0].embedding, n=top_k)
-    paragraphs = list()
-    for res in results:
-        paragraph = paragraphs_by_uuid[res.userdata]
-        paragraphs.append(paragraph)
+    candidates = max(top_k, RAG_FUSION_CANDIDATES)
+    lexical_ids, coverage = snapshot.lexical_search(user_msg, candidates)
+    if mode == "fast" and lexical_ids and coverage >= RAG_LEXICAL_MIN_COVERAGE:
+        return snapshot.texts(lexical_ids[:top_k])
 
-    return paragraphs
+    embedding = await embedding_cache.get_or_create(user_msg, _embed_query)
+    vector_ids = snapshot.vector_search(embedding, candidates)
+    return snapshot.texts(reciprocal_rank_fusion([vector_ids, lexical_ids])[:top_k])
@@ -0,0 +1,174 @@
+"""
+Process-wide RAG index for the knowledge base tool.
+
+The index is loaded once per job process and shared by every call it
+serves. Both the Annoy index and the paragraph store are memory-mapped, so
+all job processes on a worker read the same page-cache pages instead of each
+holding a copy, and nothing is unpickled; the prewarm hook loads the index
+with prefault so the first search_knowledge_base call doesn't hit the disk.
+Builds that include a BM25 index (rag/lexical_index.py) also serve lexical
+and hybrid (reciprocal rank fusion) searches.
+
+Queries check the manifest (index_info.json) at most every
+RAG_INDEX_CHECK_SECONDS. When warm_up_rag.py has published a new index, it is
+loaded in a thread and swapped in with a single reference assignment:
+queries already running keep the snapshot they started with, and the old
+mappings go away with their last user. An index that fails to load is
+skipped until the next check; with no loadable index at all get() returns
+None (old-layout directories need `python -m rag.warm_up_rag --convert-legacy`).
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+import annoy
+from rag.lexical_index import LexicalIndex
+from rag.paragraph_store import ParagraphStore
+from rag.warm_up_rag import INDEX_INFO_FILE
+
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+RAG_INDEX_CHECK_SECONDS = float(os.getenv("RAG_INDEX_CHECK_SECONDS", 5))
+RRF_K = 60
+
+
+def reciprocal_rank_fusion(rankings, k: int = RRF_K):
+    """Merge ranked id lists: each id scores sum(1 / (k + rank)) over the lists it appears in"""
+    scores = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, 1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+@dataclass(frozen=True)
+class RagSnapshot:
+    """One loaded version of the index and its paragraphs"""
+    index: annoy.AnnoyIndex
+    paragraphs: ParagraphStore
+    lexical: LexicalIndex  # None for builds without one
+    info: dict
+    signature: tuple
+    loaded_at: float
+
+    def texts(self, ids):
+        return [self.paragraphs[i] for i in ids]
+
+    def vector_search(self, vector, n: int):
+        """Ids of the n paragraphs nearest to vector"""
+        return self.index.get_nns_by_vector(vector, n)
+
+    def lexical_search(self, query: str, n: int):
+        """Ids of the n best BM25 matches and the share of the query the best one covers"""
+        results, coverage = self.lexical.search(query, n)
+        return [doc for doc, _ in results], coverage
+
+    def query(self, vector, n: int):
+        """Texts of the n paragraphs nearest to vector"""
+        return self.texts(self.vector_search(vector, n))
+
+
+class RagIndex:
+    """Lazily loaded, hot-swappable Annoy index plus the paragraphs it points to"""
+
+    def __init__(self, index_dir: str, check_interval: float = RAG_INDEX_CHECK_SECONDS):
+        self.index_dir = index_dir
+        self.info_path = os.path.join(index_dir, INDEX_INFO_FILE)
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._next_check = 0.0
+        self._load_lock = threading.Lock()
+        self.stats = {"loads": 0, "reloads": 0, "load_errors": 0, "last_load_ms": 0.0}
+
+    def _signature(self):
+        """(inode, size, mtime) of the manifest; every build replaces it"""
+        st = os.stat(self.info_path)
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def _load(self, signature, prefault: bool) -> RagSnapshot:
+        start = time.perf_counter()
+        with open(self.info_path) as f:
+            info = json.load(f)
+        paragraphs = ParagraphStore(os.path.join(self.index_dir, info["paragraphs"]))
+        index = annoy.AnnoyIndex(info["dimensions"], info["metric"])
+        index.load(os.path.join(self.index_dir, info["annoy"]), prefault=prefault)
+        lexical = LexicalIndex(os.path.join(self.index_dir, info["lexical"])) if info.get("lexical") else None
+        counts = (index.get_n_items(), len(paragraphs), lexical.doc_count if lexical else info["count"])
+        if any(count != info["count"] for count in counts):
+            index.unload()
+            paragraphs.close()
+            if lexical is not None:
+                lexical.close()
+            raise ValueError(f"index has {counts[0]} items, paragraph store {counts[1]}, "
+                             f"lexical {counts[2] if lexical else '-'}, manifest {info['count']}")
+
+        self.stats["last_load_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return RagSnapshot(index, paragraphs, lexical, info, signature, time.time())
+
+    def refresh(self, prefault: bool = True) -> bool:
+        """Load the index if it is missing or changed on disk; True if a new snapshot was swapped in"""
+        if not self._load_lock.acquire(blocking=self._snapshot is None):
+            return False  # another thread is already reloading; keep serving the current snapshot
+        try:
+            signature = self._signature()
+            current = self._snapshot
+            if current is not None and current.signature == signature:
+                return False
+            try:
+                snapshot = self._load(signature, prefault)
+            except Exception as e:
+                self.stats["load_errors"] += 1
+                if current is None:
+                    raise
+                logger.warning(f"Keeping current RAG index, new one not loadable yet: {e}")
+                return False
+            self._snapshot = snapshot
+            self.stats["reloads" if current is not None else "loads"] += 1
+            logger.info(f"RAG index {'reloaded' if current is not None else 'loaded'}: "
+                        f"{len(snapshot.paragraphs)} items in {self.stats['last_load_ms']}ms")
+            return True
+        finally:
+            self._load_lock.release()
+
+    def warm(self):
+        """Load with prefault (called from the worker prewarm hook); failures are left to the first query"""
+        try:
+            self.refresh(prefault=True)
+            self._next_check = time.monotonic() + self.check_interval
+        except Exception as e:
+            logger.error(f"Failed to prewarm RAG index: {e}")
+
+    async def get(self) -> RagSnapshot:
+        """Current snapshot (None if no index could be loaded), checking for a new version at most every check_interval"""
+        now = time.monotonic()
+        if self._snapshot is None or now >= self._next_check:
+            self._next_check = now + self.check_interval
+            try:
+                changed = self._snapshot is None or self._signature() != self._snapshot.signature
+            except OSError as e:
+                # Files mid-replace or removed: keep serving what is mapped
+                changed = self._snapshot is None
+                if not changed:
+                    logger.warning(f"RAG index files unavailable, keeping current index: {e}")
+            if changed:
+                try:
+                    await asyncio.to_thread(self.refresh)
+                except Exception as e:
+                    # Only reached without a snapshot; retried at the next check
+                    logger.error(f"No RAG index available in {self.index_dir}: {e}")
+        return self._snapshot
+
+    def get_stats(self):
+        snapshot = self._snapshot
+        return {
+            **self.stats,
+            "items": len(snapshot.paragraphs) if snapshot else 0,
+            "lexical_terms": snapshot.lexical.term_count if snapshot and snapshot.lexical else 0,
+            "loaded_at": snapshot.loaded_at if snapshot else None,
+        }
@@ -42,6 +42,18 @@ def create_agent_session(userdata: UserData, config: Dict[str, Any], agent_confi
     logger.info("Voice agent session created successfully")
     return session
 
+def prewarm_agent_session(session: AgentSession):
+    """Open STT/TTS/LLM provider connections before a participant joins (warm-pool rooms)"""
+    for component in (session.stt, session.tts, session.llm):
+        prewarm = getattr(component, "prewarm", None)
+        if prewarm is None:
+            continue
+        try:
+            prewarm()
+        except Exception as e:
+            logger.warning(f"Failed to prewarm {type(component).__name__}: {e}")
+    logger.info("Voice agent session prewarmed")
+
 class ChatSession:
     """Chat session wrapper for chat modality"""
     
@@ -362,7 +362,7 @@ async def create_dispatch(fastapi_request: Request, db: Session = Depends(get_da
             # ========== TWILIO/LIVEKIT IMPLEMENTATION ==========
             from utils.call import run_livekit_dispatch
             
-            result = run_livekit_dispatch(
+            result = await run_livekit_dispatch(
                 metadata=metadata_,
                 contact_number=request_body['contact_number'],
                 agent_name=model.model_name,
@@ -370,10 +370,7 @@ async def create_dispatch(fastapi_request: Request, db: Session = Depends(get_da
             if not result["success"]:
                 raise HTTPException(status_code=500, detail=result["error"])
             
-            # Parse the result output to extract the room ID
-            import re
-            room_match = re.search(r'room:"(.*?)"', result["output"])
-            room_id = room_match.group(1) if room_match else None
+            room_id = result["room"]
             
             # Create database record with Twilio/LiveKit-specific data
             new_call = models.Call(
@@ -594,10 +591,11 @@ async def stream_audio(call_id: str):
         
         async def stream_audio_content():
             yield audio_bytes
-        
+
+        # Calls recorded by the Plivo bridge are stored as WAV under the same key
         return StreamingResponse(
             stream_audio_content(),
-            media_type="audio/mpeg"
+            media_type="audio/wav" if audio_bytes[:4] == b"RIFF" else "audio/mpeg"
         )
     
     except HTTPException:
@@ -937,7 +935,7 @@ async def create_chat_session(fastapi_request: Request, db: Session = Depends(ge
             "session_id": request_body.get('session_id', f"chat_{request_body['user_id']}_{datetime.now().timestamp()}")
         }
         
-        result = run_livekit_dispatch(
+        result = await run_livekit_dispatch(
             metadata=metadata_,
             contact_number="chat_session",
             agent_name=model.model_name,
@@ -946,9 +944,7 @@ async def create_chat_session(fastapi_request: Request, db: Session = Depends(ge
         if not result["success"]:
             raise HTTPException(status_code=500, detail=result["error"])
         
-        import re
-        room_match = re.search(r'room:"(.*?)"', result["output"])
-        room_id = room_match.group(1) if room_match else None
+        room_id = result["room"]
         
         new_chat = models.Call(
             user_id=int(request_body['user_id']),
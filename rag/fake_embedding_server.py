@@ -0,0 +1,84 @@
+"""
+Local stand-in for the OpenAI embeddings endpoint, for indexing and RAG tests
+without an API key or network.
+
+Vectors are deterministic: each word maps to a fixed random direction and a
+text's vector is the normalized sum of its words, so paragraphs that share
+words land near each other and the index returns sensible neighbours.
+--latency-ms simulates the per-request round trip.
+
+    python -m rag.fake_embedding_server --port 8089 --latency-ms 300
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 python -m rag.warm_up_rag
+"""
+
+import argparse
+import asyncio
+import base64
+import functools
+import hashlib
+import re
+
+import numpy as np
+from aiohttp import web
+
+MAX_INPUTS = 2048  # OpenAI's per-request limit
+_WORD = re.compile(r"\w+")
+
+
+@functools.lru_cache(maxsize=100_000)
+def _word_vector(word: str, dimensions: int) -> np.ndarray:
+    seed = int.from_bytes(hashlib.sha256(word.encode()).digest()[:8], "little")
+    return np.random.default_rng(seed).standard_normal(dimensions).astype(np.float32)
+
+
+def fake_embedding(text: str, dimensions: int) -> np.ndarray:
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for word in _WORD.findall(text.lower()):
+        vector += _word_vector(word, dimensions)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def create_app(latency_ms: float = 0.0, dimensions: int = 1536) -> web.Application:
+    stats = {"requests": 0, "inputs": 0}
+
+    async def embeddings(request):
+        body = await request.json()
+        inputs = body.get("input")
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        if not inputs or len(inputs) > MAX_INPUTS:
+            return web.json_response({"error": {"message": f"input must have 1-{MAX_INPUTS} items"}}, status=400)
+        stats["requests"] += 1
+        stats["inputs"] += len(inputs)
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        size = body.get("dimensions") or dimensions
+        data = []
+        for i, text in enumerate(inputs):
+            vector = fake_embedding(text, size)
+            if body.get("encoding_format") == "base64":
+                embedding = base64.b64encode(vector.astype("<f4").tobytes()).decode()
+            else:
+                embedding = vector.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+        return web.json_response({"object": "list", "data": data, "model": body.get("model"),
+                                  "usage": {"prompt_tokens": 0, "total_tokens": 0}})
+
+    async def get_stats(request):
+        return web.json_response(stats)
+
+    app = web.Application(client_max_size=64 * 1024 * 1024)
+    app.router.add_post("/v1/embeddings", embeddings)
+    app.router.add_get("/stats", get_stats)
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake OpenAI embeddings server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Simulated round trip per request")
+    parser.add_argument("--dimensions", type=int, default=1536, help="Used when a request doesn't set one")
+    args = parser.parse_args()
+    web.run_app(create_app(args.latency_ms, args.dimensions), host=args.host, port=args.port)
@@ -0,0 +1,153 @@
+"""
+BM25 lexical index over the knowledge-base paragraphs.
+
+Built by warm_up_rag.py next to the Annoy index (same item ids) and read by
+the agent without any network call, for questions that name a service, area
+or price verbatim. Like the paragraph store it is one memory-mapped file:
+
+    b"KBLX" | version u32 | docs u32 | terms u32 | k1 f32 | b f32 | avgdl f32
+    | doc_lengths u32[docs] | term_offsets u64[terms + 1]
+    | posting_offsets u64[terms + 1] | terms (sorted UTF-8 blob)
+    | postings (doc u32, tf u32)[...]
+
+Terms are found by binary search over the sorted term blob and scored with
+numpy, so a lookup touches only the postings of the query's terms.
+"""
+
+import mmap
+import re
+import struct
+import unicodedata
+from collections import Counter
+
+import numpy as np
+
+MAGIC = b"KBLX"
+VERSION = 1
+_HEADER = struct.Struct("<4sIIIfff")
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN = re.compile(r"\w+")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by can could do does for from have how i if in is it its me my "
+    "of on or our please so that the their them there they this to us was we what when where "
+    "which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> list:
+    """Lowercased word tokens without stopwords; plural 's' is folded ("prices" -> "price")"""
+    tokens = []
+    for token in _TOKEN.findall(unicodedata.normalize("NFKC", text).casefold()):
+        if token in _STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def write_lexical_index(path: str, paragraphs, k1: float = BM25_K1, b: float = BM25_B) -> int:
+    """Build the BM25 index for paragraphs (in item order) and write it to path; returns the term count"""
+    postings = {}
+    doc_lengths = []
+    for doc, paragraph in enumerate(paragraphs):
+        tokens = tokenize(paragraph)
+        doc_lengths.append(len(tokens))
+        for term, tf in Counter(tokens).items():
+            postings.setdefault(term.encode("utf-8"), []).append((doc, tf))
+
+    terms = sorted(postings)
+    term_offsets = np.zeros(len(terms) + 1, dtype="<u8")
+    np.cumsum([len(term) for term in terms], out=term_offsets[1:])
+    posting_offsets = np.zeros(len(terms) + 1, dtype="<u8")
+    np.cumsum([len(postings[term]) for term in terms], out=posting_offsets[1:])
+    pairs = np.array([pair for term in terms for pair in postings[term]], dtype="<u4").reshape(-1, 2)
+    avgdl = sum(doc_lengths) / len(doc_lengths) if doc_lengths else 0.0
+
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(doc_lengths), len(terms), k1, b, avgdl))
+        f.write(np.asarray(doc_lengths, dtype="<u4").tobytes())
+        f.write(term_offsets.tobytes())
+        f.write(posting_offsets.tobytes())
+        f.write(b"".join(terms))
+        f.write(pairs.tobytes())
+    return len(terms)
+
+
+class LexicalIndex:
+    """Read-only, memory-mapped BM25 index"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, docs, terms, self.k1, self.b, self.avgdl = _HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != VERSION:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a lexical index (v{VERSION})")
+        self.doc_count = docs
+        self.term_count = terms
+        offset = _HEADER.size
+        self._doc_lengths = np.frombuffer(self._mmap, dtype="<u4", count=docs, offset=offset)
+        offset += 4 * docs
+        self._term_offsets = np.frombuffer(self._mmap, dtype="<u8", count=terms + 1, offset=offset)
+        offset += 8 * (terms + 1)
+        self._posting_offsets = np.frombuffer(self._mmap, dtype="<u8", count=terms + 1, offset=offset)
+        offset += 8 * (terms + 1)
+        self._terms_start = offset
+        offset += int(self._term_offsets[-1])
+        self._postings = np.frombuffer(self._mmap, dtype="<u4", count=2 * int(self._posting_offsets[-1]),
+                                       offset=offset).reshape(-1, 2)
+        # BM25 length normalisation per document, computed once
+        self._norm = self.k1 * (1 - self.b + self.b * self._doc_lengths / (self.avgdl or 1.0))
+
+    def _term(self, i: int) -> bytes:
+        return self._mmap[self._terms_start + int(self._term_offsets[i]):self._terms_start + int(self._term_offsets[i + 1])]
+
+    def _find(self, term: bytes):
+        lo, hi = 0, self.term_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._term(mid) < term:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < self.term_count and self._term(lo) == term else None
+
+    def idf(self, df: int) -> float:
+        return float(np.log(1 + (self.doc_count - df + 0.5) / (df + 0.5)))
+
+    def search(self, query: str, n: int):
+        """
+        Top n (doc, score) pairs for query, plus the share of the query's weight
+        (idf, with unknown terms at the maximum) that the best document matches.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not self.doc_count:
+            return [], 0.0
+        scores = np.zeros(self.doc_count, dtype=np.float32)
+        matched = np.zeros(self.doc_count, dtype=np.float32)
+        total_weight = 0.0
+        for term in terms:
+            i = self._find(term.encode("utf-8"))
+            if i is None:
+                total_weight += self.idf(0)
+                continue
+            postings = self._postings[int(self._posting_offsets[i]):int(self._posting_offsets[i + 1])]
+            docs, tf = postings[:, 0], postings[:, 1].astype(np.float32)
+            weight = self.idf(len(docs))
+            total_weight += weight
+            scores[docs] += weight * tf * (self.k1 + 1) / (tf + self._norm[docs])
+            matched[docs] += weight
+
+        count = min(n, self.doc_count)
+        top = np.argpartition(-scores, count - 1)[:count]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        results = [(int(doc), float(scores[doc])) for doc in top if scores[doc] > 0]
+        coverage = float(matched[results[0][0]]) / total_weight if results else 0.0
+        return results, coverage
+
+    def close(self):
+        del self._doc_lengths, self._term_offsets, self._posting_offsets, self._postings, self._norm
+        self._mmap.close()
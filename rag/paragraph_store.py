@@ -0,0 +1,79 @@
+"""
+Compact paragraph store for the knowledge-base index.
+
+Paragraph i of the store is the text of Annoy item i. The file is a small
+header, a little-endian uint64 offsets array (count + 1 entries) and one
+contiguous UTF-8 blob:
+
+    b"KBPS" | version u32 | count u32 | offsets[count + 1] | blob
+
+Readers mmap it and decode a paragraph only when it is looked up, so opening
+a store costs the same whatever the KB size, its pages are shared between
+processes through the page cache, and nothing is unpickled.
+"""
+
+import mmap
+import struct
+import sys
+from array import array
+
+MAGIC = b"KBPS"
+VERSION = 1
+_HEADER = struct.Struct("<4sII")
+
+
+def write_paragraph_store(path: str, paragraphs) -> int:
+    """Write paragraphs (in item order) to path; returns the count"""
+    encoded = [p.encode("utf-8") for p in paragraphs]
+    offsets = array("Q", [0])
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+    if sys.byteorder != "little":
+        offsets.byteswap()
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(encoded)))
+        f.write(offsets.tobytes())
+        for data in encoded:
+            f.write(data)
+    return len(encoded)
+
+
+class ParagraphStore:
+    """Read-only, memory-mapped view of a paragraph store file"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = _HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != VERSION:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a paragraph store (v{VERSION})")
+        start = _HEADER.size
+        self._blob_start = start + 8 * (count + 1)
+        if sys.byteorder == "little":
+            self._offsets = memoryview(self._mmap)[start:self._blob_start].cast("Q")
+        else:
+            self._offsets = array("Q", self._mmap[start:self._blob_start])
+            self._offsets.byteswap()
+        self._count = count
+        if self._blob_start + self._offsets[count] != len(self._mmap):
+            self.close()
+            raise ValueError(f"{path} is truncated")
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, i: int) -> str:
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        start = self._blob_start + self._offsets[i]
+        end = self._blob_start + self._offsets[i + 1]
+        return self._mmap[start:end].decode("utf-8")
+
+    def __iter__(self):
+        return (self[i] for i in range(self._count))
+
+    def close(self):
+        if isinstance(self._offsets, memoryview):
+            self._offsets.release()
+        self._mmap.close()
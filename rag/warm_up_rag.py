@@ -1,60 +1,294 @@
+"""
+Build the knowledge-base index the agent searches (rag/vdb_data).
+
+An index is four files in VECTOR_INDEX_PATH: the Annoy index, a paragraph
+store (rag/paragraph_store.py: item i's text), a BM25 index over the same
+items (rag/lexical_index.py) and index_info.json, the manifest naming the
+other three. A build writes new data files under fresh
+names and then replaces the manifest, so agents always see a complete index.
+
+Paragraphs are identified by a hash of their text, so re-indexing an edited
+knowledge base only embeds paragraphs that are new or changed; the vectors of
+the rest are read back from the current index (when it was built with the
+same embedding model and dimension). Embeddings are requested in batches of
+--batch-size inputs with at most --concurrency requests in flight. If no
+paragraph changed, the live index is left alone. Indexes in the old layout
+(index.annoy, the rag plugin's metadata.pkl and a pickled {uuid: text} dict)
+are converted with --convert-legacy, reusing their vectors, and are also read
+back by incremental builds.
+
+    python -m rag.warm_up_rag                      # VECTOR_* env paths
+    python -m rag.warm_up_rag --raw rag/rag_knowledge_base/knowledge-base-mysyara.txt \
+        rag/rag_knowledge_base/knowledge-base-areas-reference.txt
+    python -m rag.warm_up_rag --full               # re-embed everything
+    python -m rag.warm_up_rag --convert-legacy     # old index.annoy + metadata.pkl + .pkl, offline
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 python -m rag.warm_up_rag  # fake_embedding_server
+"""
+
+import argparse
 import asyncio
+import base64
+import hashlib
+import json
 import pickle
+import struct
+import time
+import types
 import uuid
 
 import aiohttp
+import annoy
 from dotenv import load_dotenv
 from livekit.agents import tokenize
-from livekit.plugins import openai, rag
 from tqdm import tqdm
 import os
 
+from rag.lexical_index import write_lexical_index
+from rag.paragraph_store import ParagraphStore, write_paragraph_store
+
 load_dotenv(dotenv_path="/app/.env.local")
 load_dotenv()
 
 file_name = os.getenv("VECTOR_FILE_NAME", "knowledge-base-earkart")
 embeddings_dimension = int(os.getenv("EMBEDDINGS_DIMENSION", 1536))
+embeddings_model = os.getenv("EMBEDDINGS_MODEL", "text-embedding-3-small")
+# Comma-separated to index several files together
 raw_data_path = os.getenv("VECTOR_RAW_DATA_PATH", f"/app/rag/rag_knowledge_base/{file_name}.txt")
 index_path = os.getenv("VECTOR_INDEX_PATH", "/app/rag/vdb_data")
-pkl_path = os.getenv("VECTOR_DATA_PKL_PATH", f"/app/rag/rag_knowledge_base/{file_name}.pkl")
-raw_data = open(raw_data_path, "r", encoding="utf-8").read()
+# Paragraphs of an old-layout index (only read by --convert-legacy and incremental builds)
+legacy_pkl_path = os.getenv("VECTOR_DATA_PKL_PATH", f"/app/rag/rag_knowledge_base/{file_name}.pkl")
+embeddings_url = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/") + "/embeddings"
+batch_size = int(os.getenv("EMBEDDINGS_BATCH_SIZE", 64))
+concurrency = int(os.getenv("EMBEDDINGS_CONCURRENCY", 4))
+INDEX_INFO_FILE = "index_info.json"
+INDEX_METRIC = "angular"
+LEGACY_ANNOY_FILE = "index.annoy"
+LEGACY_METADATA_FILE = "metadata.pkl"
+MAX_ATTEMPTS = 5
 
 # from this blog https://openai.com/index/new-embedding-models-and-api-updates/
 # 512 seems to provide good MTEB score with text-embedding-3-small
 
+
+def paragraph_id(paragraph: str) -> str:
+    """Content hash deciding whether a paragraph's embedding can be reused"""
+    return hashlib.sha256(paragraph.encode("utf-8")).hexdigest()
+
+
 async def _create_embeddings(
-    input: str, http_session: aiohttp.ClientSession
-) -> openai.EmbeddingData:
-    results = await openai.create_embeddings(
-        input=[input],
-        model="text-embedding-3-small",
-        dimensions=embeddings_dimension,
-        http_session=http_session,
-    )
-    return results[0]
-
-
-async def main() -> None:
-    async with aiohttp.ClientSession() as http_session:
-        idx_builder = rag.annoy.IndexBuilder(f=embeddings_dimension, metric="angular")
-
-        paragraphs_by_uuid = {}
+    inputs: list, http_session: aiohttp.ClientSession
+) -> list:
+    """Embed a batch of texts in one request (retried with backoff on 429/5xx and network errors)"""
+    api_key = os.getenv("OPENAI_API_KEY", "")
+    payload = {"model": embeddings_model, "input": inputs, "encoding_format": "base64",
+               "dimensions": embeddings_dimension}
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            async with http_session.post(embeddings_url, json=payload,
+                                         headers={"Authorization": f"Bearer {api_key}"}) as resp:
+                if resp.status == 429 or resp.status >= 500:
+                    raise aiohttp.ClientResponseError(resp.request_info, resp.history, status=resp.status)
+                resp.raise_for_status()
+                data = (await resp.json())["data"]
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            status = getattr(e, "status", None)
+            if attempt == MAX_ATTEMPTS - 1 or (status is not None and status < 500 and status != 429):
+                raise
+            await asyncio.sleep(0.5 * 2 ** attempt)
+            continue
+        vectors = [None] * len(inputs)
+        for d in data:
+            raw = base64.b64decode(d["embedding"])
+            vectors[d["index"]] = list(struct.unpack(f"{len(raw) // 4}f", raw))
+        return vectors
+
+
+async def embed_paragraphs(paragraphs: list, http_session: aiohttp.ClientSession,
+                           batch_size: int = batch_size, concurrency: int = concurrency) -> list:
+    """Embeddings for paragraphs, in order, batch_size per request and concurrency requests at a time"""
+    semaphore = asyncio.Semaphore(concurrency)
+    progress = tqdm(total=len(paragraphs), unit="paragraph")
+
+    async def embed_batch(batch):
+        async with semaphore:
+            vectors = await _create_embeddings(batch, http_session)
+        progress.update(len(batch))
+        return vectors
+
+    batches = [paragraphs[i:i + batch_size] for i in range(0, len(paragraphs), batch_size)]
+    try:
+        results = await asyncio.gather(*(embed_batch(batch) for batch in batches))
+    finally:
+        progress.close()
+    return [vector for vectors in results for vector in vectors]
+
+
+def read_index_info(path: str = None) -> dict:
+    """The live index's manifest (raises OSError/ValueError if there is none)"""
+    with open(os.path.join(path or index_path, INDEX_INFO_FILE)) as f:
+        return json.load(f)
+
+
+class _LegacyUnpickler(pickle.Unpickler):
+    """Reads old-layout pickles without the rag plugin, allowing only the types they contain"""
+
+    def find_class(self, module, name):
+        if (module, name) == ("livekit.plugins.rag.annoy", "_FileData"):
+            return types.SimpleNamespace
+        if (module, name) == ("uuid", "UUID"):
+            return uuid.UUID
+        if (module, name) in (("copyreg", "_reconstructor"), ("builtins", "object")):
+            return super().find_class(module, name)
+        raise pickle.UnpicklingError(f"unexpected {module}.{name} in legacy index")
+
+
+def load_legacy_index(path: str = None, pkl_path: str = None):
+    """(paragraphs, vectors, dimensions, metric) of an old-layout index, in item order"""
+    path = path or index_path
+    with open(os.path.join(path, LEGACY_METADATA_FILE), "rb") as f:
+        metadata = _LegacyUnpickler(f).load()
+    with open(pkl_path or legacy_pkl_path, "rb") as f:
+        paragraphs_by_uuid = _LegacyUnpickler(f).load()
+    index = annoy.AnnoyIndex(metadata.f, metadata.metric)
+    index.load(os.path.join(path, LEGACY_ANNOY_FILE))
+    count = index.get_n_items()
+    paragraphs = [paragraphs_by_uuid[metadata.userdata[i]] for i in range(count)]
+    vectors = [index.get_item_vector(i) for i in range(count)]
+    index.unload()
+    return paragraphs, vectors, metadata.f, metadata.metric
+
+
+def load_previous_vectors() -> dict:
+    """Vectors of the live index by paragraph id (empty if it was built with another model/dimension)"""
+    try:
+        info = read_index_info()
+    except (OSError, ValueError):
+        # No manifest yet: reuse an old-layout index (built with the default model) if there is one
+        try:
+            paragraphs, vectors, dimensions, metric = load_legacy_index()
+        except (OSError, ValueError, KeyError, pickle.UnpicklingError):
+            return {}
+        if (dimensions, metric) != (embeddings_dimension, INDEX_METRIC):
+            return {}
+        return {paragraph_id(paragraph): vector for paragraph, vector in zip(paragraphs, vectors)}
+    try:
+        if (info["model"], info["dimensions"]) != (embeddings_model, embeddings_dimension):
+            return {}
+        index = annoy.AnnoyIndex(info["dimensions"], info["metric"])
+        index.load(os.path.join(index_path, info["annoy"]))
+        store = ParagraphStore(os.path.join(index_path, info["paragraphs"]))
+    except (OSError, ValueError, KeyError):
+        return {}
+    return {paragraph_id(paragraph): index.get_item_vector(i) for i, paragraph in enumerate(store)}
+
+
+def _write_json(path: str, data: dict) -> None:
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def publish_index(index, paragraphs: list, build_id: str) -> None:
+    """
+    Write the data files under new names, then replace the manifest.
+    Running agents keep the old files memory-mapped until they reload: those
+    are unlinked here, never overwritten, so the mappings stay valid.
+    """
+    os.makedirs(index_path, exist_ok=True)
+    try:
+        previous = read_index_info()
+    except (OSError, ValueError):
+        previous = {}
+    info = {
+        "model": embeddings_model, "dimensions": embeddings_dimension, "metric": INDEX_METRIC,
+        "count": len(paragraphs), "annoy": f"index-{build_id}.annoy", "paragraphs": f"paragraphs-{build_id}.bin",
+        "lexical": f"lexical-{build_id}.bin",
+    }
+    for name, write in ((info["annoy"], index.save),
+                        (info["paragraphs"], lambda path: write_paragraph_store(path, paragraphs)),
+                        (info["lexical"], lambda path: write_lexical_index(path, paragraphs)),
+                        (INDEX_INFO_FILE, lambda path: _write_json(path, info))):
+        staged = os.path.join(index_path, f".{name}.tmp")
+        write(staged)
+        os.replace(staged, os.path.join(index_path, name))
+
+    for name in (previous.get("annoy"), previous.get("paragraphs"), previous.get("lexical")):
+        if name and name not in (info["annoy"], info["paragraphs"], info["lexical"]):
+            try:
+                os.unlink(os.path.join(index_path, name))
+            except OSError:
+                pass
+
+
+async def main(raw_paths: list = None, full: bool = False, trees: int = 50, batch_size: int = batch_size,
+               concurrency: int = concurrency) -> None:
+    start = time.perf_counter()
+    paragraphs_by_id = {}
+    for path in raw_paths or raw_data_path.split(","):
+        with open(path, "r", encoding="utf-8") as f:
+            raw_data = f.read()
         for p in tokenize.basic.tokenize_paragraphs(raw_data):
-            p_uuid = uuid.uuid4()
-            paragraphs_by_uuid[p_uuid] = p
+            paragraphs_by_id.setdefault(paragraph_id(p), p)
+
+    previous = {} if full else load_previous_vectors()
+    if previous and previous.keys() == paragraphs_by_id.keys() and "lexical" in _index_info_or_empty():
+        print(f"index up to date ({len(paragraphs_by_id)} paragraphs), nothing to do.")
+        return
+
+    missing = [p_id for p_id in paragraphs_by_id if p_id not in previous]
+    print(f"{len(paragraphs_by_id)} paragraphs: {len(paragraphs_by_id) - len(missing)} unchanged, "
+          f"{len(missing)} to embed.")
+    vectors = dict(previous)
+    if missing:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=120)) as http_session:
+            embedded = await embed_paragraphs([paragraphs_by_id[p_id] for p_id in missing], http_session,
+                                              batch_size, concurrency)
+        vectors.update(zip(missing, embedded))
+
+    build_index(paragraphs_by_id, vectors, trees)
+    print(f"saved index in VDB ({time.perf_counter() - start:.1f}s).")
+
+
+def _index_info_or_empty() -> dict:
+    try:
+        return read_index_info()
+    except (OSError, ValueError):
+        return {}
+
 
-        for p_uuid, paragraph in tqdm(paragraphs_by_uuid.items()):
-            resp = await _create_embeddings(paragraph, http_session)
-            idx_builder.add_item(resp.embedding, p_uuid)
+def build_index(paragraphs_by_id: dict, vectors: dict, trees: int = 50) -> None:
+    """Build the Annoy index for paragraphs (by id, in item order) and publish it"""
+    index = annoy.AnnoyIndex(embeddings_dimension, INDEX_METRIC)
+    for i, p_id in enumerate(paragraphs_by_id):
+        index.add_item(i, vectors[p_id])
+    index.build(trees, n_jobs=-1)
+    build_id = hashlib.sha256(f"{embeddings_model}|{embeddings_dimension}|{''.join(paragraphs_by_id)}".encode()).hexdigest()[:12]
+    publish_index(index, list(paragraphs_by_id.values()), build_id)
 
-        idx_builder.build()
-        idx_builder.save(index_path)
-        print("saved index in VDB.")
 
-        # save data with pickle
-        with open(pkl_path, "wb") as f:
-            pickle.dump(paragraphs_by_uuid, f)
+def convert_legacy_index(trees: int = 50) -> None:
+    """Rewrite an old-layout index in the current layout, reusing its vectors (no embeddings calls)"""
+    paragraphs, vectors, dimensions, metric = load_legacy_index()
+    if (dimensions, metric) != (embeddings_dimension, INDEX_METRIC):
+        raise ValueError(f"legacy index is {dimensions}-d {metric}; set EMBEDDINGS_DIMENSION to match")
+    vectors_by_id = {}
+    for paragraph, vector in zip(paragraphs, vectors):
+        vectors_by_id.setdefault(paragraph_id(paragraph), vector)
+    paragraphs_by_id = {paragraph_id(paragraph): paragraph for paragraph in paragraphs}
+    build_index(paragraphs_by_id, vectors_by_id, trees)
+    print(f"converted legacy index ({len(paragraphs_by_id)} paragraphs) in {index_path}.")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Build the knowledge-base index")
+    parser.add_argument("--raw", nargs="+", help="Knowledge-base text files (default: VECTOR_RAW_DATA_PATH)")
+    parser.add_argument("--full", action="store_true", help="Re-embed every paragraph")
+    parser.add_argument("--convert-legacy", action="store_true",
+                        help="Convert the old index.annoy/metadata.pkl/VECTOR_DATA_PKL_PATH files, offline")
+    parser.add_argument("--batch-size", type=int, default=batch_size, help="Inputs per embeddings request")
+    parser.add_argument("--concurrency", type=int, default=concurrency, help="Embeddings requests in flight")
+    parser.add_argument("--trees", type=int, default=50, help="Annoy trees")
+    args = parser.parse_args()
+    if args.convert_legacy:
+        convert_legacy_index(trees=args.trees)
+    else:
+        asyncio.run(main(raw_paths=args.raw, full=args.full, trees=args.trees, batch_size=args.batch_size, concurrency=args.concurrency))
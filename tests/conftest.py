@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+DIMENSIONS = 8
+
+
+@pytest.fixture
+def warm_up_rag(tmp_path, monkeypatch):
+    """rag.warm_up_rag building small (8-d) indexes in a temporary VECTOR_INDEX_PATH"""
+    module = pytest.importorskip("rag.warm_up_rag")
+    monkeypatch.setattr(module, "index_path", str(tmp_path / "vdb_data"))
+    monkeypatch.setattr(module, "embeddings_dimension", DIMENSIONS)
+    return module
+
+
+def vector_for(paragraph: str):
+    """Deterministic unit vector for a paragraph"""
+    seed = sum(paragraph.encode()) * 7919 + len(paragraph)
+    vector = np.random.default_rng(seed).standard_normal(DIMENSIONS)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+def build(warm_up_rag, paragraphs):
+    """Publish an index of paragraphs (in order) with vector_for() vectors"""
+    by_id = {warm_up_rag.paragraph_id(p): p for p in paragraphs}
+    warm_up_rag.build_index(by_id, {p_id: vector_for(p) for p_id, p in by_id.items()}, trees=5)
+    return warm_up_rag.read_index_info(warm_up_rag.index_path)
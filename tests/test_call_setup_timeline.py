@@ -0,0 +1,71 @@
+import time
+
+import pytest
+
+from utils.call_setup_timeline import CallSetupTimeline, SetupTimelineStore, summarize_exports
+
+
+def _timeline(kind, phases):
+    timeline = CallSetupTimeline(kind, "room-a", origin_phase=next(iter(phases)))
+    timeline.phases.update(phases)
+    return timeline
+
+
+def test_origin_from_another_node_offsets_later_phases():
+    timeline = CallSetupTimeline("plivo", "room-a", origin=time.time() - 0.5, origin_phase="answer_xml")
+    timeline.mark("ws_connected")
+    timeline.mark("ws_connected")  # first occurrence wins
+    assert timeline.phases["answer_xml"] == 0.0
+    assert timeline.phases["ws_connected"] == pytest.approx(500, abs=50)
+
+
+def test_steps_follow_arrival_order():
+    # Warm rooms: the agent joins before the WebSocket connects
+    timeline = _timeline("plivo", {"answer_xml": 0.0, "agent_joined": 40.0, "ws_connected": 120.0})
+    assert timeline.steps() == {"answer_xml": 0.0, "agent_joined": 40.0, "ws_connected": 80.0}
+    assert timeline.to_dict()["steps"] == timeline.steps()
+
+
+def test_store_summarizes_per_kind_in_phase_order():
+    store = SetupTimelineStore(keep=2)
+    for offset in (0, 10, 20):
+        store.finish(_timeline("plivo", {"answer_xml": 0.0, "ws_connected": 100.0 + offset,
+                                         "first_agent_audio": 900.0 + offset}))
+    store.add({"kind": "sip", "phases": {"job_started": 0.0, "active": 2500.0},
+               "steps": {"job_started": 0.0, "active": 2500.0}})
+    assert len(store.recent) == 2
+
+    summary = store.summary()
+    assert list(summary["plivo"]) == ["answer_xml", "ws_connected", "first_agent_audio"]
+    audio = summary["plivo"]["first_agent_audio"]
+    assert audio["since_start"]["count"] == 3 and audio["since_start"]["max_ms"] == 920.0
+    assert audio["step"]["max_ms"] == 800.0
+    assert summary["sip"]["active"]["since_start"]["max_ms"] == 2500.0
+
+
+def test_finish_is_idempotent_and_exports_merge():
+    store = SetupTimelineStore()
+    timeline = _timeline("plivo", {"answer_xml": 0.0, "ws_connected": 50.0})
+    store.finish(timeline)
+    store.finish(timeline)
+    other = SetupTimelineStore()
+    other.finish(_timeline("plivo", {"answer_xml": 0.0, "ws_connected": 70.0}))
+
+    merged = summarize_exports([store.export(), other.export(), None])
+    assert merged["plivo"]["ws_connected"]["since_start"]["count"] == 2
+    assert merged["plivo"]["ws_connected"]["since_start"]["max_ms"] == 70.0
+
+
+def test_reports_cannot_add_phases_or_kinds():
+    store = SetupTimelineStore()
+    store.add({"kind": "sip", "call_id": "x" * 1000,
+               "phases": {"job_started": 0.0, "active": 2500.0, "evil|phase": 1.0, "made_up": 5.0,
+                          "ringing": float("nan"), "greeting_started": "soon"},
+               "steps": {"active": 2500.0, "other": 3.0}})
+    assert set(store.histograms) == {("sip", "at", "job_started"), ("sip", "at", "active"), ("sip", "step", "active")}
+    assert all(key.count("|") == 2 for key in store.export())
+    assert store.recent[-1]["phases"] == {"job_started": 0.0, "active": 2500.0}
+    assert len(store.recent[-1]["call_id"]) == 128
+    with pytest.raises(ValueError):
+        store.add({"kind": "made-up", "phases": {"active": 1.0}})
+    assert len(store.recent) == 1
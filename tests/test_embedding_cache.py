@@ -0,0 +1,143 @@
+import asyncio
+import importlib
+import time
+
+import pytest
+
+try:
+    from agent.helper import embedding_cache
+    from agent.helper.embedding_cache import EmbeddingCache, normalize_query
+except Exception as e:  # agent.helper needs livekit-agents and the deployed /app config
+    pytest.skip(f"agent helpers not importable: {e}", allow_module_level=True)
+
+
+class _Clock:
+    def __init__(self):
+        self.now = time.time()
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(embedding_cache.time, "time", clock)
+    return clock
+
+
+async def _put(cache, text, vector):
+    cache.put(text, vector)
+    await asyncio.gather(*cache._tasks)
+
+
+def test_queries_are_normalized():
+    assert normalize_query("  What's the PRICE?? ") == "what s the price"
+    assert normalize_query("ＦＵＬＬ\twidth") == "full width"
+    cache = EmbeddingCache("text-embedding-3-small", 512, path="")
+    assert cache.key("Battery cost?") == cache.key("battery   cost")
+    assert cache.key("battery cost") != EmbeddingCache("text-embedding-3-small", 1536, path="").key("battery cost")
+
+
+def test_memory_tier_is_lru():
+    async def run():
+        cache = EmbeddingCache("m", 2, path="", memory_size=2)
+        cache.put("a", [1.0, 0.0])
+        cache.put("b", [0.0, 1.0])
+        assert await cache.get("a") == [1.0, 0.0]  # a is now the most recent
+        cache.put("c", [0.5, 0.5])
+        return cache, [await cache.get(text) for text in ("a", "b", "c")]
+
+    cache, vectors = asyncio.run(run())
+    assert vectors == [[1.0, 0.0], None, [0.5, 0.5]]
+    assert cache.stats["memory_evictions"] == 1 and cache.stats["misses"] == 1
+
+
+def test_entries_expire_after_the_ttl(clock, tmp_path):
+    async def run():
+        cache = EmbeddingCache("m", 2, path=str(tmp_path / "cache.sqlite"), ttl=60)
+        await _put(cache, "a", [1.0, 0.0])
+        clock.now += 30
+        fresh = await cache.get("a")
+        clock.now += 31
+        expired = await cache.get("a")
+        cache._memory.clear()
+        on_disk = await cache.get("a")
+        return cache, fresh, expired, on_disk
+
+    cache, fresh, expired, on_disk = asyncio.run(run())
+    assert fresh == [1.0, 0.0] and expired is None and on_disk is None
+    assert cache.stats["expired"] == 2
+
+
+def test_disk_tier_is_shared_and_survives_restarts(tmp_path):
+    path = str(tmp_path / "cache" / "query_embeddings.sqlite")
+
+    async def run():
+        writer = EmbeddingCache("m", 2, path=path)
+        await _put(writer, "battery cost", [0.25, 0.75])
+        reader = EmbeddingCache("m", 2, path=path)
+        vector = await reader.get("Battery cost?")
+        again = await reader.get("battery cost")
+        return reader, vector, again
+
+    reader, vector, again = asyncio.run(run())
+    assert vector == again == [0.25, 0.75]
+    assert reader.stats["disk_hits"] == 1 and reader.stats["memory_hits"] == 1
+
+    warmed = EmbeddingCache("m", 2, path=path)
+    warmed.warm()
+    assert len(warmed._memory) == 1
+
+
+def test_disk_tier_evicts_least_recently_used(clock, tmp_path):
+    async def run():
+        cache = EmbeddingCache("m", 1, path=str(tmp_path / "cache.sqlite"), disk_max=2)
+        for i, text in enumerate(("a", "b", "c")):
+            clock.now += 1
+            await _put(cache, text, [float(i)])
+        cache._memory.clear()
+        clock.now += 1
+        await cache.get("a")  # a becomes the most recently used
+        cache._disk(cache._disk_trim, clock.now)
+        cache._memory.clear()
+        return cache, [await cache.get(text) for text in ("a", "b", "c")]
+
+    cache, vectors = asyncio.run(run())
+    assert vectors == [[0.0], None, [2.0]]
+    assert cache.stats["disk_evictions"] == 1
+
+
+def test_disk_failure_falls_back_to_memory(tmp_path):
+    blocker = tmp_path / "not-a-directory"
+    blocker.write_text("")
+
+    async def run():
+        cache = EmbeddingCache("m", 1, path=str(blocker / "cache.sqlite"))
+        await _put(cache, "a", [1.0])
+        return cache, await cache.get("a")
+
+    cache, vector = asyncio.run(run())
+    assert vector == [1.0]
+    assert cache.get_stats()["disk_enabled"] is False and cache.stats["disk_errors"] == 1
+
+
+def test_get_or_create_embeds_once():
+    calls = []
+
+    async def create(text):
+        calls.append(text)
+        return [1.0, 2.0]
+
+    async def run():
+        cache = EmbeddingCache("m", 2, path="")
+        return [await cache.get_or_create("Where are you?", create) for _ in range(3)]
+
+    assert asyncio.run(run()) == [[1.0, 2.0]] * 3
+    assert calls == ["Where are you?"]
+
+
+def test_default_path_is_outside_the_index_directory(monkeypatch):
+    monkeypatch.delenv("RAG_EMBEDDING_CACHE_PATH", raising=False)
+    fresh = importlib.reload(embedding_cache)
+    assert "vdb_data" not in fresh.RAG_EMBEDDING_CACHE_PATH
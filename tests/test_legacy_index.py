@@ -0,0 +1,78 @@
+import os
+import pickle
+import sys
+import types
+import uuid
+
+import annoy
+import pytest
+
+from conftest import DIMENSIONS, vector_for
+
+PARAGRAPHS = ["Exterior wash for sedans costs 40 AED.", "We cover Al Karamah and Deira.",
+              "Battery replacement takes 30 minutes.", "We cover Al Karamah and Deira."]
+
+
+def _legacy_index(warm_up_rag, monkeypatch, tmp_path, dimensions=DIMENSIONS):
+    """Old-layout index.annoy + metadata.pkl and paragraphs pickle, as the rag plugin wrote them"""
+    plugin = types.ModuleType("livekit.plugins.rag.annoy")
+
+    class _FileData:
+        pass
+
+    _FileData.__module__, _FileData.__qualname__ = plugin.__name__, "_FileData"
+    plugin._FileData = _FileData
+    monkeypatch.setitem(sys.modules, plugin.__name__, plugin)
+
+    os.makedirs(warm_up_rag.index_path)
+    index = annoy.AnnoyIndex(dimensions, "angular")
+    metadata, paragraphs_by_uuid = _FileData(), {}
+    metadata.f, metadata.metric, metadata.userdata = dimensions, "angular", {}
+    for i, paragraph in enumerate(PARAGRAPHS):
+        index.add_item(i, vector_for(paragraph)[:dimensions])
+        metadata.userdata[i] = uuid.uuid4()
+        paragraphs_by_uuid[metadata.userdata[i]] = paragraph
+    index.build(5)
+    index.save(os.path.join(warm_up_rag.index_path, warm_up_rag.LEGACY_ANNOY_FILE))
+    index.unload()
+    with open(os.path.join(warm_up_rag.index_path, warm_up_rag.LEGACY_METADATA_FILE), "wb") as f:
+        pickle.dump(metadata, f)
+    pkl_path = tmp_path / "knowledge-base.pkl"
+    with open(pkl_path, "wb") as f:
+        pickle.dump(paragraphs_by_uuid, f)
+    monkeypatch.setattr(warm_up_rag, "legacy_pkl_path", str(pkl_path))
+
+
+def test_legacy_index_is_read_in_item_order(warm_up_rag, monkeypatch, tmp_path):
+    _legacy_index(warm_up_rag, monkeypatch, tmp_path)
+    monkeypatch.delitem(sys.modules, "livekit.plugins.rag.annoy")  # no rag plugin needed to read it
+    paragraphs, vectors, dimensions, metric = warm_up_rag.load_legacy_index()
+    assert paragraphs == PARAGRAPHS and (dimensions, metric) == (DIMENSIONS, "angular")
+    assert vectors[1] == pytest.approx(vector_for(PARAGRAPHS[1]), abs=1e-6)
+
+
+def test_convert_reuses_vectors_and_drops_duplicates(warm_up_rag, monkeypatch, tmp_path):
+    _legacy_index(warm_up_rag, monkeypatch, tmp_path)
+    previous = warm_up_rag.load_previous_vectors()
+    assert len(previous) == 3
+
+    warm_up_rag.convert_legacy_index(trees=5)
+    info = warm_up_rag.read_index_info()
+    assert info["count"] == 3 and info["dimensions"] == DIMENSIONS
+    assert warm_up_rag.load_previous_vectors().keys() == previous.keys()
+
+
+def test_convert_refuses_another_dimension(warm_up_rag, monkeypatch, tmp_path):
+    _legacy_index(warm_up_rag, monkeypatch, tmp_path, dimensions=4)
+    assert warm_up_rag.load_previous_vectors() == {}
+    with pytest.raises(ValueError, match="4-d angular"):
+        warm_up_rag.convert_legacy_index(trees=5)
+
+
+def test_unsafe_pickles_are_refused(warm_up_rag, monkeypatch, tmp_path):
+    _legacy_index(warm_up_rag, monkeypatch, tmp_path)
+    with open(warm_up_rag.legacy_pkl_path, "wb") as f:
+        pickle.dump({"paragraphs": os.system}, f)
+    with pytest.raises(pickle.UnpicklingError, match="posix.system|nt.system"):
+        warm_up_rag.load_legacy_index()
+    assert warm_up_rag.load_previous_vectors() == {}
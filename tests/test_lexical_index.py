@@ -0,0 +1,65 @@
+import pytest
+
+from rag.lexical_index import LexicalIndex, tokenize, write_lexical_index
+
+PARAGRAPHS = ["Exterior wash for sedans costs 40 AED.",
+              "Interior cleaning for SUVs costs 60 AED, exterior wash included.",
+              "We cover Al Karamah and Deira.",
+              "Battery replacement takes 30 minutes."]
+
+
+@pytest.fixture
+def lexical(tmp_path):
+    path = str(tmp_path / "lexical.bin")
+    write_lexical_index(path, PARAGRAPHS)
+    index = LexicalIndex(path)
+    yield index
+    index.close()
+
+
+def test_tokenize_drops_stopwords_and_folds_plurals():
+    assert tokenize("What are the PRICES of your services?") == ["price", "service"]
+    assert tokenize("Is glass cleaning available?") == ["glass", "cleaning", "available"]
+    assert tokenize("bus and gas") == ["bus", "gas"]
+
+
+def test_round_trip(lexical):
+    assert lexical.doc_count == 4
+    assert lexical.term_count == len({t for p in PARAGRAPHS for t in tokenize(p)})
+    assert lexical.avgdl == pytest.approx(sum(len(tokenize(p)) for p in PARAGRAPHS) / 4)
+    assert lexical._find("deira".encode()) is not None and lexical._find(b"dubai") is None
+
+
+def test_bm25_ranking(lexical):
+    results, coverage = lexical.search("exterior wash price for sedans", 3)
+    assert [doc for doc, _ in results] == [0, 1]
+    assert results[0][1] > results[1][1] > 0
+    assert 0 < coverage < 1  # "price" is in no paragraph
+
+    results, coverage = lexical.search("Karamah", 5)
+    assert [doc for doc, _ in results] == [2] and coverage == pytest.approx(1.0)
+
+
+def test_rare_terms_weigh_more(lexical):
+    assert lexical.idf(1) > lexical.idf(2) > lexical.idf(4)
+    results, _ = lexical.search("sedans costs", 2)
+    assert results[0][0] == 0
+
+
+def test_queries_without_known_terms(lexical, tmp_path):
+    assert lexical.search("", 3) == ([], 0.0)
+    assert lexical.search("what is the", 3) == ([], 0.0)
+    assert lexical.search("fujairah", 3) == ([], 0.0)
+
+    path = str(tmp_path / "empty.bin")
+    write_lexical_index(path, [])
+    empty = LexicalIndex(path)
+    assert empty.search("wash", 3) == ([], 0.0)
+    empty.close()
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "lexical.bin"
+    path.write_bytes(b"KBPS" + bytes(32))
+    with pytest.raises(ValueError, match="not a lexical index"):
+        LexicalIndex(str(path))
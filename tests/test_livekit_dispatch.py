@@ -0,0 +1,101 @@
+import asyncio
+from types import SimpleNamespace
+
+from livekit import api
+
+from utils.livekit_dispatch import AgentDispatchClient
+
+
+class _Dispatches:
+    """
+    create_dispatch that raises the queued errors first, then succeeds. "hang" times
+    out before the dispatch is created, "slow" after (the response is lost).
+    """
+
+    def __init__(self, *errors, list_error=None):
+        self.errors = list(errors)
+        self.list_error = list_error
+        self.requests = []
+        self.created = []
+
+    async def create_dispatch(self, request):
+        self.requests.append(request)
+        error = self.errors.pop(0) if self.errors else None
+        if error == "hang":
+            await asyncio.sleep(1)
+        elif error == "slow":
+            self.created.append(SimpleNamespace(id=f"AD_{len(self.requests)}", agent_name=request.agent_name,
+                                                room=request.room))
+            await asyncio.sleep(1)
+        elif error is not None:
+            raise error
+        dispatch = SimpleNamespace(id=f"AD_{len(self.requests)}", agent_name=request.agent_name, room=request.room)
+        self.created.append(dispatch)
+        return dispatch
+
+    async def list_dispatch(self, room_name):
+        if self.list_error:
+            raise self.list_error
+        return [d for d in self.created if d.room == room_name]
+
+
+def _client(dispatches, **kwargs):
+    pool = SimpleNamespace(client=SimpleNamespace(agent_dispatch=dispatches))
+    return AgentDispatchClient(pool, retry_backoff=0, **kwargs)
+
+
+def test_dispatch_retries_transient_errors():
+    dispatches = _Dispatches(ConnectionRefusedError("refused"), "hang")
+    client = _client(dispatches, timeout=0.05, retries=2)
+    result = asyncio.run(client.dispatch("Earkart", "room-a", metadata={"call_type": "inbound"}))
+    assert result.success and result.attempts == 3 and result.dispatch_id == "AD_3"
+    assert dispatches.requests[0].agent_name == "Earkart" and dispatches.requests[0].room == "room-a"
+    assert dispatches.requests[0].metadata == '{"call_type": "inbound"}'
+    assert (client.stats["dispatched"], client.stats["retries"], client.stats["timeouts"]) == (1, 2, 1)
+
+
+def test_dispatch_stops_on_permanent_errors():
+    dispatches = _Dispatches(api.TwirpError("not_found", "no such agent", status=404))
+    client = _client(dispatches, retries=2)
+    result = asyncio.run(client.dispatch("Nobody", "room-a"))
+    assert not result.success and result.attempts == 1
+    assert result.error == "not_found: no such agent"
+    assert client.stats["failed"] == 1
+
+
+def test_dispatch_gives_up_after_retries():
+    dispatches = _Dispatches(*[ConnectionRefusedError("down")] * 3)
+    result = asyncio.run(_client(dispatches, retries=1).dispatch("Earkart"))
+    assert not result.success and result.attempts == 2
+    assert result.room_name.startswith("room-")
+
+
+def test_timed_out_dispatch_that_was_created_is_not_repeated():
+    dispatches = _Dispatches("slow")
+    client = _client(dispatches, timeout=0.05, retries=2)
+    result = asyncio.run(client.dispatch("Earkart", "room-a"))
+    assert result.success and result.dispatch_id == "AD_1" and result.attempts == 1
+    assert len(dispatches.requests) == 1 and len(dispatches.created) == 1
+    assert (client.stats["timeouts"], client.stats["recovered"], client.stats["retries"]) == (1, 1, 0)
+
+
+def test_other_agents_in_the_room_do_not_count():
+    dispatches = _Dispatches("hang")
+    dispatches.created.append(SimpleNamespace(id="AD_0", agent_name="Mysyara", room="room-a"))
+    result = asyncio.run(_client(dispatches, timeout=0.05, retries=1).dispatch("Earkart", "room-a"))
+    assert result.success and result.dispatch_id == "AD_2" and result.attempts == 2
+
+
+def test_unverifiable_failure_is_not_retried():
+    dispatches = _Dispatches("hang", list_error=ConnectionResetError("reset"))
+    client = _client(dispatches, timeout=0.05, retries=2)
+    result = asyncio.run(client.dispatch("Earkart", "room-a"))
+    assert not result.success and result.attempts == 1 and len(dispatches.requests) == 1
+    assert "not retried" in result.error and client.stats["retries"] == 0
+
+
+def test_dispatch_many_keeps_request_order():
+    client = _client(_Dispatches())
+    results = asyncio.run(client.dispatch_many([{"agent_name": "A", "room_name": "r1"},
+                                                {"agent_name": "B", "room_name": "r2"}]))
+    assert [(r.agent_name, r.room_name, r.success) for r in results] == [("A", "r1", True), ("B", "r2", True)]
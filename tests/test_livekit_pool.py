@@ -0,0 +1,53 @@
+import asyncio
+import time
+
+from livekit import api
+
+from utils.livekit_pool import LiveKitClientPool
+
+
+def _pool(**kwargs):
+    return LiveKitClientPool("ws://127.0.0.1:7880", "devkey", "secret-secret-secret-secret-secret", **kwargs)
+
+
+def test_prefetched_token_is_used_once():
+    pool = _pool()
+    pool.prefetch_token("room-a", "Telephony")
+    identity, token = pool.take_token("room-a", "Telephony")
+    assert identity.startswith("telephony-")
+    claims = api.TokenVerifier("devkey", "secret-secret-secret-secret-secret").verify(token)
+    assert claims.identity == identity and claims.video.room == "room-a" and claims.video.room_join
+    assert pool.stats["token_cache_hits"] == 1
+
+    second_identity, _ = pool.take_token("room-a", "Telephony")
+    assert second_identity != identity
+    assert pool.stats["token_cache_hits"] == 1 and pool.stats["tokens_minted"] == 2
+
+
+def test_stale_token_is_minted_again():
+    pool = _pool(token_ttl=0)
+    pool.prefetch_token("room-a", "Telephony")
+    pool.take_token("room-a", "Telephony")
+    assert pool.stats["token_cache_hits"] == 0 and pool.stats["tokens_minted"] == 2
+
+
+def test_concurrent_ensure_room_shares_one_request():
+    pool = _pool()
+    created = []
+
+    async def create_room(room_name, room_options):
+        created.append(room_name)
+        await asyncio.sleep(0.01)
+        pool._rooms[room_name] = time.monotonic()
+        return True
+
+    pool._create_room = create_room
+
+    async def run():
+        results = await asyncio.gather(*(pool.ensure_room("room-a") for _ in range(5)))
+        assert all(results)
+        return await pool.ensure_room("room-a")
+
+    assert asyncio.run(run())
+    assert created == ["room-a"]
+    assert pool.stats["room_cache_hits"] == 1
@@ -0,0 +1,42 @@
+import pytest
+
+from rag.paragraph_store import ParagraphStore, write_paragraph_store
+
+PARAGRAPHS = ["Exterior wash for sedans costs 40 AED.", "", "غسيل السيارات في دبي", "Line one\nline two 🚗"]
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "paragraphs.bin")
+    assert write_paragraph_store(path, PARAGRAPHS) == 4
+    store = ParagraphStore(path)
+    assert len(store) == 4
+    assert list(store) == PARAGRAPHS
+    assert store[2] == PARAGRAPHS[2]
+    with pytest.raises(IndexError):
+        store[4]
+    with pytest.raises(IndexError):
+        store[-1]
+    store.close()
+
+
+def test_empty_store(tmp_path):
+    path = str(tmp_path / "paragraphs.bin")
+    write_paragraph_store(path, [])
+    store = ParagraphStore(path)
+    assert len(store) == 0 and list(store) == []
+    store.close()
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "paragraphs.bin"
+    path.write_bytes(b"\x80\x04pickle" + bytes(16))
+    with pytest.raises(ValueError, match="not a paragraph store"):
+        ParagraphStore(str(path))
+
+
+def test_rejects_truncated_files(tmp_path):
+    path = tmp_path / "paragraphs.bin"
+    write_paragraph_store(str(path), PARAGRAPHS)
+    path.write_bytes(path.read_bytes()[:-3])
+    with pytest.raises(ValueError, match="truncated"):
+        ParagraphStore(str(path))
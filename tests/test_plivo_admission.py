@@ -0,0 +1,91 @@
+from utils import plivo_admission
+from utils.plivo_admission import AdmissionController
+
+
+def _controller(active_calls=0, **limits):
+    return AdmissionController(["call"] * active_calls, **limits)
+
+
+def test_reservations_count_against_max_calls():
+    admission = _controller(active_calls=1, max_calls=3)
+    assert admission.check("CA-1") == (True, None)
+    admission.reserve("CA-1")
+    admission.reserve("CA-2")
+    assert admission.pending_calls == 2
+    assert admission.check("CA-3") == (False, "calls")
+    assert admission.stats["rejected_calls"] == 1
+    assert admission.load()["pending_calls"] == 2 and admission.load()["load"] == 1.0
+
+
+def test_repeated_answer_request_keeps_one_slot():
+    admission = _controller(max_calls=2)
+    admission.reserve("CA-1")
+    admission.reserve("CA-2")
+    assert admission.check("CA-1") == (True, None)  # retry of an already admitted call
+    admission.reserve("CA-1")
+    assert admission.pending_calls == 2
+
+
+def test_stream_connect_consumes_its_reservation():
+    admission = _controller(max_calls=1)
+    admission.reserve("CA-1")
+    assert admission.admit_stream("CA-2") == (False, "calls")  # someone else's slot
+    assert admission.admit_stream("CA-1") == (True, None)
+    assert admission.pending_calls == 0 and admission.stats["admitted"] == 1
+
+
+def test_hangup_before_connect_releases_the_slot():
+    admission = _controller(max_calls=1)
+    admission.reserve("CA-1")
+    assert admission.check("CA-2") == (False, "calls")
+    assert admission.release("CA-1")
+    assert not admission.release("CA-1")
+    assert admission.check("CA-2") == (True, None)
+
+
+def test_unclaimed_reservations_expire(monkeypatch):
+    admission = _controller(max_calls=1)
+    admission.reserve("CA-1")
+    monkeypatch.setattr(plivo_admission, "RESERVATION_TTL", 0)
+    assert admission.pending_calls == 0
+    assert admission.check("CA-2") == (True, None)
+
+
+def test_reserved_stream_is_refused_when_the_worker_is_unhealthy():
+    admission = _controller(max_loop_lag_ms=100)
+    admission.reserve("CA-1")
+    admission.loop_lag_ms = 150
+    assert admission.admit_stream("CA-1") == (False, "loop_lag")
+    admission.loop_lag_ms = 0
+    assert admission.admit_stream("CA-1") == (True, None)
+
+
+def test_loop_lag_limit_is_off_by_default():
+    admission = AdmissionController([])
+    admission.loop_lag_ms = 10_000
+    assert admission.max_loop_lag_ms == 0
+    assert admission.check() == (True, None)
+
+
+
+def test_answered_call_is_taken_on_any_worker():
+    answering, streaming = _controller(max_calls=1), _controller(active_calls=1, max_calls=1)
+    answering.reserve("CA-1")
+    ticket = answering.ticket("CA-1")
+    # The kernel handed the stream to a full (even unhealthy) worker: Plivo already answered
+    streaming.loop_lag_ms, streaming.max_loop_lag_ms = 500, 100
+    assert streaming.admit_stream("CA-1", ticket) == (True, None)
+    assert answering.pending_calls == 1  # released by the caller on the answering worker
+    assert answering.release("CA-1")
+
+
+def test_tickets_are_bound_to_the_call_and_expire(monkeypatch):
+    admission = _controller(active_calls=1, max_calls=1)
+    ticket = admission.ticket("CA-1")
+    issued, _, signature = ticket.partition(".")
+    assert admission.admit_stream("CA-2", ticket) == (False, "calls")
+    assert admission.admit_stream("CA-1", f"{issued}.{'0' * len(signature)}") == (False, "calls")
+    assert admission.admit_stream("CA-1", f"{int(issued) + 1}.{signature}") == (False, "calls")
+    assert admission.admit_stream("CA-1", "garbage") == (False, "calls")
+    monkeypatch.setattr(plivo_admission, "TICKET_TTL", -10)
+    assert admission.admit_stream("CA-1", ticket) == (False, "calls")
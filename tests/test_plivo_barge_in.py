@@ -0,0 +1,112 @@
+import asyncio
+
+import numpy as np
+
+from utils import plivo_ws
+from utils.plivo_barge_in import AgentSilenceDetector
+from utils.plivo_messages import PlivoMessageTemplates
+from utils.plivo_packetizer import PlayAudioPacketizer
+
+SPEECH = (np.sin(np.arange(160) / 3) * 3000).astype(np.int16)
+SILENCE = np.zeros(160, dtype=np.int16)
+
+
+def _agent_speaks(detector, frames=5):
+    for _ in range(frames):
+        assert not detector.process(SPEECH)
+
+
+def test_agent_pause_without_caller_speech_is_not_a_barge_in():
+    detector = AgentSilenceDetector(silence_ms=60)
+    _agent_speaks(detector)
+    assert not any(detector.process(SILENCE) for _ in range(10))
+    assert detector.stats == {"agent_gaps": 1, "barge_ins": 0}
+
+
+def test_caller_speech_in_the_gap_fires_once():
+    detector = AgentSilenceDetector(silence_ms=60)
+    _agent_speaks(detector)
+    fired = []
+    for _ in range(6):
+        detector.caller_frame(SPEECH)
+        fired.append(detector.process(SILENCE))
+    assert fired == [False, False, True, False, False, False]
+    assert detector.stats["barge_ins"] == 1
+
+
+def test_caller_speaking_over_the_agent_arms_the_detector():
+    detector = AgentSilenceDetector(silence_ms=40)
+    detector.caller_frame(SPEECH)  # caller already talking when the agent is cut off
+    _agent_speaks(detector, 1)
+    assert [detector.process(SILENCE) for _ in range(2)] == [False, True]
+
+
+def test_caller_speech_before_the_agent_spoke_does_not_count():
+    detector = AgentSilenceDetector(silence_ms=40)
+    detector.caller_frame(SPEECH)
+    detector.caller_frame(SILENCE)
+    _agent_speaks(detector)
+    assert not any(detector.process(SILENCE) for _ in range(4))
+
+
+def test_reset_disarms():
+    detector = AgentSilenceDetector(silence_ms=40)
+    _agent_speaks(detector)
+    detector.caller_frame(SPEECH)
+    detector.reset()
+    assert not any(detector.process(SILENCE) for _ in range(4))
+
+
+class _WebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, message, text=False):
+        self.sent.append(message)
+
+
+def _handler():
+    """TelephonyWebSocketHandler with just what barge-in touches"""
+    handler = plivo_ws.TelephonyWebSocketHandler.__new__(plivo_ws.TelephonyWebSocketHandler)
+    handler.websocket = _WebSocket()
+    handler.stream_sid = "stream-1"
+    handler.templates = PlivoMessageTemplates(stream_id="stream-1")
+    handler._send_bytes_as_text = True
+    handler._audio_since_clear = False
+    handler._barge_in_guard_until = 0.0
+    handler.stats = {"barge_ins": 0, "barge_in_packets_purged": 0}
+
+    async def send(packet):
+        await handler.websocket.send(packet, text=True)
+        handler._audio_since_clear = True
+        return True
+
+    handler.packetizer = PlayAudioPacketizer(send, packet_ms=20)
+    return handler
+
+
+def test_barge_in_purges_before_the_next_push():
+    async def run():
+        handler = _handler()
+        handler.packetizer.start()
+        handler.packetizer.push(b"\x01" * 160 * 10)
+        await asyncio.sleep(0.03)  # some agent audio reached Plivo
+        clear_audio = handler.barge_in("silence")
+        assert len(handler.packetizer._queue) == 0  # purged synchronously, before any later push
+        await clear_audio
+        handler.packetizer.push(b"\x02" * 160)
+        await handler.packetizer.stop(flush=True)
+        return handler
+
+    handler = asyncio.run(run())
+    sent = handler.websocket.sent
+    clear_at = sent.index(handler.templates.clear_audio)
+    assert all(packet[0] == 1 for packet in sent[:clear_at]) and sent[clear_at + 1:] == [b"\x02" * 160]
+    assert handler.stats["barge_ins"] == 1 and handler.stats["barge_in_packets_purged"] >= 5
+    assert not handler.packetizer._task  # stopped cleanly, the send loop never died
+
+
+def test_barge_in_without_audio_at_plivo_sends_nothing():
+    handler = _handler()
+    assert handler.barge_in("signal") is None
+    assert handler._barge_in_guard_until > 0 and handler.stats["barge_ins"] == 0
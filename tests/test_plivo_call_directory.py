@@ -0,0 +1,78 @@
+import asyncio
+import socket
+
+import pytest
+
+from utils.plivo_call_directory import (CallDirectory, MemoryCallDirectory, RedisCallDirectory,
+                                        create_call_directory, serve_stand_in)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _exercise(directory: CallDirectory):
+    await directory.register("http://10.0.0.1:9100", ["room-a", "CA-1", None])
+    await directory.register("http://10.0.0.2:9100", ["room-b"], ttl=1)
+    assert await directory.lookup("unknown", "CA-1") == "http://10.0.0.1:9100"
+    assert await directory.lookup(None, "room-b") == "http://10.0.0.2:9100"
+    assert await directory.lookup("unknown") is None
+    assert await directory.lookup() is None
+
+    await directory.unregister(["room-a", "CA-1"])
+    assert await directory.lookup("room-a", "CA-1") is None
+    await asyncio.sleep(1.1)
+    assert await directory.lookup("room-b") is None
+
+
+def test_memory_directory():
+    directory = MemoryCallDirectory()
+    asyncio.run(_exercise(directory))
+    assert not directory.shared
+    assert directory.stats["registered"] == 2 and directory.stats["hits"] == 2
+
+
+def test_redis_directory_against_the_stand_in():
+    port = _free_port()
+
+    async def run():
+        server = asyncio.create_task(serve_stand_in("127.0.0.1", port))
+        await asyncio.sleep(0.1)
+        directory = create_call_directory(f"redis://127.0.0.1:{port}/0")
+        try:
+            assert isinstance(directory, RedisCallDirectory) and directory.shared
+            await _exercise(directory)
+            assert await directory.execute([("PING",), ("EXPIRE", "plivo:call:none", 5)]) == ["PONG", 0]
+            return directory.stats
+        finally:
+            await directory.aclose()
+            server.cancel()
+
+    stats = asyncio.run(run())
+    assert stats["errors"] == 0 and stats["hits"] == 2
+
+
+def test_redis_directory_survives_an_unreachable_server():
+    async def run():
+        directory = RedisCallDirectory(f"redis://127.0.0.1:{_free_port()}", timeout=0.2)
+        await directory.register("http://10.0.0.1:9100", ["room-a"])
+        owner = await directory.lookup("room-a")
+        await directory.aclose()
+        return owner, directory.stats["errors"]
+
+    assert asyncio.run(run()) == (None, 2)
+
+
+def test_directory_urls():
+    assert isinstance(create_call_directory("memory"), MemoryCallDirectory)
+    with pytest.raises(ValueError):
+        create_call_directory("rediss://cache:6380")
+    with pytest.raises(ValueError):
+        create_call_directory("etcd://cache")
+
+
+def test_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        CallDirectory()
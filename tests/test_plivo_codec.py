@@ -0,0 +1,50 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from utils.plivo_codec import MulawCodec, pcm_to_ulaw, ulaw_to_pcm
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore", DeprecationWarning)
+    audioop = pytest.importorskip("audioop")  # removed in Python 3.13
+
+ALL_ULAW = bytes(range(256))
+ALL_PCM = np.arange(-32768, 32768, dtype=np.int16)
+
+
+def test_decode_matches_audioop_for_every_byte():
+    expected = np.frombuffer(audioop.ulaw2lin(ALL_ULAW, 2), dtype=np.int16)
+    np.testing.assert_array_equal(ulaw_to_pcm(ALL_ULAW), expected)
+
+
+def test_encode_matches_audioop_for_every_sample():
+    expected = np.frombuffer(audioop.lin2ulaw(ALL_PCM.tobytes(), 2), dtype=np.uint8)
+    np.testing.assert_array_equal(pcm_to_ulaw(ALL_PCM), expected)
+
+
+def test_round_trip_is_stable():
+    decoded = ulaw_to_pcm(ALL_ULAW)
+    # 0x7F and 0xFF both decode to 0 and encode back to 0xFF
+    expected = np.frombuffer(ALL_ULAW.replace(b"\x7f", b"\xff"), dtype=np.uint8)
+    np.testing.assert_array_equal(pcm_to_ulaw(decoded), expected)
+
+
+def test_buffers_are_written_in_place():
+    out = np.full(400, 7, dtype=np.int16)
+    decoded = ulaw_to_pcm(ALL_ULAW[:160], out)
+    assert decoded.base is out or decoded is out
+    assert decoded.size == 160 and out[160] == 7
+
+    pcm_bytes = ALL_PCM[::256].tobytes()
+    encoded = pcm_to_ulaw(pcm_bytes, np.empty(512, dtype=np.uint8))
+    assert bytes(encoded) == audioop.lin2ulaw(pcm_bytes, 2)
+
+
+def test_codec_grows_for_oversized_packets():
+    codec = MulawCodec(max_samples=160)
+    packet = ALL_ULAW * 4  # 1024 samples
+    np.testing.assert_array_equal(codec.decode(packet), np.frombuffer(audioop.ulaw2lin(packet, 2), dtype=np.int16))
+    pcm = ALL_PCM[::32]
+    assert bytes(codec.encode(pcm)) == audioop.lin2ulaw(pcm.tobytes(), 2)
+    assert bytes(codec.encode(pcm.tobytes())) == audioop.lin2ulaw(pcm.tobytes(), 2)
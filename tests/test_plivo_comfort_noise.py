@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from utils.plivo_comfort_noise import BASE_NOISE_RMS, NOISE_TYPES, ComfortNoiseMixer, get_noise_loop
+
+
+@pytest.mark.parametrize("noise_type", NOISE_TYPES)
+def test_noise_loop_level(noise_type):
+    loop = get_noise_loop(noise_type, 2.0)
+    rms = float(np.sqrt(np.mean(loop.astype(np.float64) ** 2)))
+    assert rms == pytest.approx(2 * BASE_NOISE_RMS, rel=0.05)
+    assert not loop.flags.writeable
+    assert get_noise_loop(noise_type, 2.0) is loop
+
+
+def test_mix_adds_the_loop_and_saturates():
+    mixer = ComfortNoiseMixer("white", 1.0)
+    offset = mixer._offset
+    silence = mixer.mix(np.zeros(160, dtype=np.int16)).copy()
+    np.testing.assert_array_equal(silence, mixer._loop[offset:offset + 160])
+
+    loud = mixer.mix(np.full(3200, 32767, dtype=np.int16))  # larger than the preallocated buffers
+    assert loud.dtype == np.int16 and loud.size == 3200
+    assert loud.max() == 32767 and loud.min() > 32767 - 8 * BASE_NOISE_RMS
+
+
+def test_from_params():
+    assert ComfortNoiseMixer.from_params({}) is None
+    assert ComfortNoiseMixer.from_params({"bg_noise": "false", "noise_volume": "2"}) is None
+    mixer = ComfortNoiseMixer.from_params({"bg_noise": "true", "noise_type": "pink", "noise_volume": "2.34"})
+    assert (mixer.noise_type, mixer.volume) == ("pink", 2.3)
+    mixer = ComfortNoiseMixer.from_params({"bg_noise": "1", "noise_type": "jet-engine", "noise_volume": "50"})
+    assert (mixer.noise_type, mixer.volume) == ("call-center", 10.0)
+    assert ComfortNoiseMixer.from_params({"bg_noise": "yes", "noise_volume": "0"}) is None
+
+
+@pytest.mark.parametrize("volume", ["nan", "inf", "-inf", "loud", None])
+def test_from_params_invalid_volume_uses_default(volume):
+    mixer = ComfortNoiseMixer.from_params({"bg_noise": "true", "noise_volume": volume})
+    assert mixer.volume == 1.0
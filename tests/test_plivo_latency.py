@@ -0,0 +1,85 @@
+import json
+import random
+
+import numpy as np
+import pytest
+
+from utils.plivo_latency import (SPEECH_PEAK, LatencyHistogram, LatencyProbes, ResponseLatencyTracker,
+                                 frame_peak, merge_exports)
+
+
+def test_percentiles_within_bucket_resolution():
+    rng = random.Random(7)
+    values = [rng.uniform(1, 500) for _ in range(10000)]
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.record(value)
+    ordered = sorted(values)
+    for q in (50, 95, 99):
+        exact = ordered[int(q / 100 * len(ordered)) - 1]
+        assert histogram.percentile(q) == pytest.approx(exact, rel=0.08)
+    assert histogram.percentile(100) == pytest.approx(max(values))
+    summary = histogram.summary()
+    assert summary["count"] == 10000 and summary["max_ms"] == round(max(values), 1)
+    assert summary["mean_ms"] == pytest.approx(sum(values) / len(values), abs=0.1)
+
+
+def test_percentile_never_exceeds_max():
+    histogram = LatencyHistogram()
+    histogram.record(20.0)
+    assert histogram.percentile(50) == 20.0
+    assert LatencyHistogram().percentile(99) == 0.0
+
+
+def test_export_round_trip_and_merge():
+    a, b = LatencyHistogram(), LatencyHistogram()
+    for value in (1, 2, 3):
+        a.record(value)
+    for value in (100, 200):
+        b.record(value)
+    restored = LatencyHistogram.from_export(json.loads(json.dumps(a.export())))
+    assert restored.summary() == a.summary()
+
+    restored.merge(b)
+    assert restored.count == 5 and restored.max == 200
+    assert restored.total == pytest.approx(306)
+
+
+def test_probes_feed_the_parent_and_merge_across_workers():
+    process = LatencyProbes()
+    call = LatencyProbes(parent=process)
+    call.record("response_ms", 400)
+    assert process.histograms["response_ms"].count == 1
+
+    other_worker = LatencyProbes()
+    other_worker.record("response_ms", 600)
+    merged = merge_exports([process.export(), other_worker.export(), None])
+    assert merged["response_ms"]["count"] == 2 and merged["response_ms"]["max_ms"] == 600
+    assert merged["inbound_queue_ms"]["count"] == 0
+
+
+def test_response_tracker_measures_caller_end_to_agent_reply():
+    probes = LatencyProbes()
+    tracker = ResponseLatencyTracker(probes, min_agent_gap=0.3)
+    tracker.caller_frame(SPEECH_PEAK, 10.0)
+    tracker.caller_frame(SPEECH_PEAK, 10.5)  # caller still talking
+    tracker.caller_frame(0, 10.52)
+    tracker.agent_frame(0, 10.9)  # silence doesn't count
+    tracker.agent_frame(SPEECH_PEAK, 11.3)
+    tracker.agent_frame(SPEECH_PEAK, 11.32)  # rest of the same reply
+    histogram = probes.histograms["response_ms"]
+    assert histogram.count == 1 and histogram.max == pytest.approx(800)
+
+
+def test_response_tracker_ignores_agent_speech_continuing_after_a_short_gap():
+    probes = LatencyProbes()
+    tracker = ResponseLatencyTracker(probes, min_agent_gap=0.3)
+    tracker.agent_frame(SPEECH_PEAK, 1.0)
+    tracker.caller_frame(SPEECH_PEAK, 1.05)  # backchannel over the agent
+    tracker.agent_frame(SPEECH_PEAK, 1.1)
+    assert probes.histograms["response_ms"].count == 0
+
+
+def test_frame_peak():
+    assert frame_peak(np.array([3, -32768, 100], dtype=np.int16)) == 32768
+    assert frame_peak(np.array([], dtype=np.int16)) == 0
@@ -0,0 +1,59 @@
+import json
+import os
+import subprocess
+import sys
+import wave
+
+import numpy as np
+import pytest
+
+from utils.plivo_codec import ulaw_to_pcm
+from utils.plivo_loadgen import load_audio, synthesize_audio
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_synthesized_audio_alternates_speech_and_noise():
+    pcm = ulaw_to_pcm(synthesize_audio(4.0))
+    assert pcm.size == 32000
+    talking, pause = np.abs(pcm[:9600].astype(np.int32)).mean(), np.abs(pcm[9600:16000].astype(np.int32)).mean()
+    assert talking > 10 * pause
+
+
+def test_load_audio_reads_wav_and_raw(tmp_path):
+    pcm = (np.sin(np.arange(800) / 5) * 5000).astype(np.int16)
+    wav_path = str(tmp_path / "caller.wav")
+    with wave.open(wav_path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(8000)
+        wav.writeframes(pcm.tobytes())
+    ulaw = load_audio(wav_path)
+    assert len(ulaw) == 800
+    np.testing.assert_allclose(ulaw_to_pcm(ulaw), pcm, atol=200)
+
+    raw_path = tmp_path / "caller.ulaw"
+    raw_path.write_bytes(ulaw)
+    assert load_audio(str(raw_path)) == ulaw
+
+
+def test_load_audio_rejects_wideband_wav(tmp_path):
+    path = str(tmp_path / "wide.wav")
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(16000)
+        wav.writeframes(b"\x00\x00" * 160)
+    with pytest.raises(ValueError):
+        load_audio(path)
+
+
+def test_echo_bridge_round_trip():
+    result = subprocess.run(
+        [sys.executable, "-m", "utils.plivo_loadgen", "--calls", "1", "--seconds", "1", "--ramp", "0", "--json"],
+        cwd=ROOT, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    report = json.loads(result.stdout)
+    assert report["streams_completed"] == 1 and not report["errors"]
+    assert report["packets_sent"] == 50 and report["packets_received"] > 0
+    assert report["bridge_latency"]["inbound_queue_ms"]["count"] == 50
@@ -0,0 +1,41 @@
+import base64
+import json
+
+from utils.plivo_messages import PlivoMessageTemplates, parse_media_payload
+
+
+def test_play_audio_matches_json_dumps():
+    templates = PlivoMessageTemplates("stream-1")
+    audio = bytes(range(256)) * 2
+    message = templates.play_audio(audio)
+    assert json.loads(message) == {
+        "event": "playAudio",
+        "media": {"contentType": "audio/x-mulaw", "sampleRate": 8000,
+                  "payload": base64.b64encode(audio).decode()},
+    }
+    assert templates.play_audio(memoryview(audio)) == message
+
+
+def test_play_audio_uses_configured_format():
+    message = json.loads(PlivoMessageTemplates(content_type="audio/x-l16", sample_rate=16000).play_audio(b"\x00\x01"))
+    assert message["media"]["contentType"] == "audio/x-l16"
+    assert message["media"]["sampleRate"] == 16000
+
+
+def test_clear_audio():
+    assert json.loads(PlivoMessageTemplates("stream-1").clear_audio) == {"event": "clearAudio", "streamId": "stream-1"}
+
+
+def test_parse_media_payload():
+    audio = bytes(range(160))
+    event = json.dumps({"event": "media", "streamId": "s", "media": {
+        "track": "inbound", "timestamp": "1", "payload": base64.b64encode(audio).decode()}}, separators=(",", ":"))
+    assert parse_media_payload(event) == audio
+    assert parse_media_payload(event.encode()) == audio
+
+
+def test_parse_falls_back_for_other_events():
+    assert parse_media_payload('{"event":"start","start":{"callId":"c"}}') is None
+    assert parse_media_payload('{"event": "media", "media": {"payload": "AAA="}}') is None  # not compact
+    assert parse_media_payload('{"event":"media","media":{}}') is None
+    assert parse_media_payload('{"event":"media","media":{"payload":"A"}}') is None  # bad base64
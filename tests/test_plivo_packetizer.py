@@ -0,0 +1,150 @@
+import asyncio
+import time
+
+import pytest
+
+from utils.plivo_packetizer import DROP_NEWEST, DROP_OLDEST, MULAW_SILENCE, PlayAudioPacketizer
+
+
+async def _never_sent(packet):
+    raise AssertionError("send loop not started")
+
+
+def test_packets_have_fixed_size():
+    packetizer = PlayAudioPacketizer(_never_sent, packet_ms=20)
+    assert packetizer.packet_bytes == 160
+    packetizer.push(b"\x01" * 100)
+    assert len(packetizer._queue) == 0 and packetizer.queued_ms == 12
+    packetizer.push(b"\x02" * 300)
+    assert [len(p) for p, _ in packetizer._queue] == [160, 160]
+    assert packetizer._queue[0][0] == b"\x01" * 100 + b"\x02" * 60
+    assert len(packetizer._pending) == 80
+
+
+def test_packet_size_follows_packet_ms():
+    assert PlayAudioPacketizer(_never_sent, packet_ms=40).packet_bytes == 320
+    assert PlayAudioPacketizer(_never_sent, packet_ms=20, sample_rate=16000).packet_bytes == 320
+
+
+def test_flush_pads_with_silence():
+    packetizer = PlayAudioPacketizer(_never_sent)
+    packetizer.push(b"\x01" * 50)
+    packetizer.flush()
+    packet, _ = packetizer._queue[0]
+    assert packet == b"\x01" * 50 + bytes([MULAW_SILENCE]) * 110
+    assert packetizer.stats["flushes"] == 1
+    packetizer.flush()  # nothing pending
+    assert len(packetizer._queue) == 1
+
+
+@pytest.mark.parametrize("policy, kept", [(DROP_OLDEST, [b"\x02", b"\x03"]), (DROP_NEWEST, [b"\x00", b"\x01"])])
+def test_drop_policies(policy, kept):
+    packetizer = PlayAudioPacketizer(_never_sent, packet_ms=20, max_queue_ms=40, drop_policy=policy)
+    for i in range(4):
+        packetizer.push(bytes([i]) * 160)
+    assert [p[:1] for p, _ in packetizer._queue] == kept
+    assert packetizer.stats["packets_dropped"] == 2
+
+
+def test_unknown_drop_policy():
+    with pytest.raises(ValueError):
+        PlayAudioPacketizer(_never_sent, drop_policy="drop-all")
+
+
+def test_clear_counts_queued_and_partial_packets():
+    packetizer = PlayAudioPacketizer(_never_sent)
+    packetizer.push(b"\x01" * 400)
+    assert packetizer.clear() == 3
+    assert packetizer.queued_ms == 0 and packetizer.stats["packets_cleared"] == 3
+
+
+def test_send_loop_delivers_in_order():
+    sent = []
+
+    async def send(packet):
+        sent.append(packet)
+        return True
+
+    async def run():
+        packetizer = PlayAudioPacketizer(send, packet_ms=20)
+        packetizer.start()
+        for i in range(5):
+            packetizer.push(bytes([i]) * 160)
+        packetizer.push(b"\x09" * 10)
+        await packetizer.stop(flush=True)
+        return packetizer
+
+    packetizer = asyncio.run(run())
+    assert [p[0] for p in sent] == [0, 1, 2, 3, 4, 9]
+    assert all(len(p) == 160 for p in sent)
+    assert packetizer.stats["packets_sent"] == 6 and packetizer.stats["packets_failed"] == 0
+
+
+def test_clear_racing_the_wakeup_keeps_the_loop_alive():
+    sent = []
+
+    async def send(packet):
+        sent.append(packet)
+        return True
+
+    async def run():
+        packetizer = PlayAudioPacketizer(send, packet_ms=20)
+        packetizer.start()
+        await asyncio.sleep(0.01)  # send loop waiting on an empty queue
+        packetizer.push(b"\x01" * 160)  # wakes the loop...
+        packetizer.clear()  # ...which then finds the queue empty
+        await asyncio.sleep(0.03)
+        alive = not packetizer._task.done()
+        packetizer.push(b"\x02" * 320)
+        await packetizer.stop(flush=True)
+        return alive
+
+    assert asyncio.run(run())
+    assert [p[0] for p in sent] == [2, 2]
+
+
+def test_send_errors_do_not_stop_the_loop():
+    sent = []
+
+    async def send(packet):
+        if packet[0] == 1:
+            raise ConnectionResetError("socket gone")
+        sent.append(packet)
+        return True
+
+    async def run():
+        packetizer = PlayAudioPacketizer(send, packet_ms=20)
+        packetizer.start()
+        for i in range(3):
+            packetizer.push(bytes([i]) * 160)
+        await packetizer.stop(flush=True)
+        return packetizer
+
+    packetizer = asyncio.run(run())
+    assert [p[0] for p in sent] == [0, 2]
+    assert packetizer.stats["packets_failed"] == 1
+
+
+@pytest.mark.parametrize("chunk_ms", [20, 60])
+def test_paced_on_a_fixed_grid(chunk_ms):
+    # Producers delivering several packets at once (e.g. 100ms LiveKit frames) must
+    # still go out one packet per packet_ms, not in bursts
+    sent_at = []
+
+    async def send(packet):
+        sent_at.append(time.monotonic())
+        return True
+
+    async def run():
+        packetizer = PlayAudioPacketizer(send, packet_ms=20)
+        packetizer.start()
+        start = time.monotonic()
+        for i in range(600 // chunk_ms):
+            packetizer.push(b"\x01" * 8 * chunk_ms)
+            await asyncio.sleep(max(0.0, start + (i + 1) * chunk_ms / 1000 - time.monotonic()))
+        await packetizer.stop(flush=True)
+
+    asyncio.run(run())
+    gaps_ms = sorted(abs((b - a) * 1000 - 20) for a, b in zip(sent_at[1:], sent_at[2:]))
+    assert len(sent_at) == 30
+    assert gaps_ms[len(gaps_ms) // 2] < 3 and gaps_ms[int(len(gaps_ms) * 0.9)] < 8
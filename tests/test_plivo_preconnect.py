@@ -0,0 +1,59 @@
+import asyncio
+
+import numpy as np
+
+from utils import plivo_ws
+from utils.plivo_codec import pcm_to_ulaw
+
+
+class _WebSocket:
+    async def send(self, message):
+        pass
+
+
+class _AudioSource:
+    def __init__(self):
+        self.pushed = []
+
+    async def push_audio_data(self, mulaw_data):
+        self.pushed.append(mulaw_data)
+
+
+SILENCE = pcm_to_ulaw(np.zeros(160, dtype=np.int16)).tobytes()
+SPEECH = pcm_to_ulaw((np.sin(np.arange(160) / 3) * 6000).astype(np.int16)).tobytes()
+
+
+def _handler():
+    handler = plivo_ws.TelephonyWebSocketHandler("room-a", _WebSocket())
+    handler.audio_source = _AudioSource()
+    return handler
+
+
+def test_flush_keeps_preroll_before_first_speech(monkeypatch):
+    monkeypatch.setattr(plivo_ws, "PRECONNECT_PREROLL_MS", 60)
+    handler = _handler()
+    for frame in [SILENCE] * 20 + [SPEECH] * 5 + [SILENCE] * 2:
+        handler._buffer_preconnect_audio(frame)
+    asyncio.run(handler._flush_preconnect_buffer())
+
+    assert handler.audio_source.pushed == [SILENCE] * 3 + [SPEECH] * 5 + [SILENCE] * 2
+    assert handler.track_published and handler._catching_up
+    assert handler.stats["preconnect_buffered_ms"] == 540
+    assert handler.stats["preconnect_trimmed_ms"] == 340 and handler.stats["preconnect_flushed_ms"] == 200
+
+
+def test_silence_only_buffer_is_dropped():
+    handler = _handler()
+    for _ in range(10):
+        handler._buffer_preconnect_audio(SILENCE)
+    asyncio.run(handler._flush_preconnect_buffer())
+    assert handler.audio_source.pushed == [] and not handler._catching_up
+
+
+def test_buffer_is_bounded(monkeypatch):
+    monkeypatch.setattr(plivo_ws, "PRECONNECT_BUFFER_MS", 100)
+    handler = _handler()
+    for _ in range(8):
+        handler._buffer_preconnect_audio(SPEECH)
+    assert len(handler.preconnect_buffer) == 5
+    assert handler.stats["preconnect_trimmed_ms"] == 60
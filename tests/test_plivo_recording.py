@@ -0,0 +1,102 @@
+import asyncio
+import os
+import wave
+
+import numpy as np
+import pytest
+
+from utils.plivo_codec import pcm_to_ulaw
+from utils.plivo_recording import AGENT, CALLER, CallRecorder, recording_enabled, recording_file_stem
+
+TONE = (np.sin(np.arange(160) / 3) * 6000).astype(np.int16)
+
+
+def _read_wav(path):
+    with wave.open(path, "rb") as wav:
+        assert (wav.getnchannels(), wav.getsampwidth(), wav.getframerate()) == (2, 2, 8000)
+        return np.frombuffer(wav.readframes(wav.getnframes()), dtype="<i2").reshape(-1, 2)
+
+
+def test_channels_are_recorded_side_by_side(tmp_path):
+    recorder = CallRecorder("call-1", directory=str(tmp_path), max_seconds=5)
+    recorder.write(CALLER, pcm_to_ulaw(TONE).tobytes())
+    recorder.write(AGENT, pcm_to_ulaw(TONE).tobytes())
+    recorder.write(AGENT, pcm_to_ulaw(TONE).tobytes())
+    assert recorder.get_stats()["duration_ms"] == 40
+
+    frames = _read_wav(recorder._finalize())
+    assert frames.shape == (320, 2)
+    np.testing.assert_allclose(frames[:160, 0], TONE, atol=200)
+    np.testing.assert_array_equal(frames[160:, 0], 0)  # caller was silent for the second frame
+    np.testing.assert_allclose(frames[:, 1], np.tile(TONE, 2), atol=200)
+    assert not (tmp_path / "call-1.ulaw2").exists()
+
+
+def test_recording_is_truncated_at_capacity(tmp_path):
+    recorder = CallRecorder("call-2", directory=str(tmp_path), max_seconds=1)
+    chunk = pcm_to_ulaw(np.tile(TONE, 10)).tobytes()  # 200ms
+    for _ in range(6):
+        recorder.write(CALLER, chunk)
+    assert recorder.stats["caller_ms"] == 1000 and recorder.stats["truncated_ms"] == 200
+    recorder._release()
+
+
+def test_ulaw_format(tmp_path):
+    recorder = CallRecorder("call-3", directory=str(tmp_path), max_seconds=1, audio_format="ulaw")
+    recorder.write(CALLER, b"\x10" * 160)
+    with open(recorder._finalize(), "rb") as f:
+        data = f.read()
+    assert data[20:22] == b"\x07\x00"  # WAVE_FORMAT_MULAW
+    assert data.endswith(b"\x10\xff" * 160)
+
+
+def test_room_names_stay_inside_the_recording_dir(tmp_path):
+    directory = tmp_path / "recordings"
+    directory.mkdir()
+    (tmp_path / "victim.wav").write_bytes(b"keep")
+    for room in ("../victim", "../../etc/passwd", "/tmp/x", "a/b", "..", "", "é" * 100):
+        recorder = CallRecorder(room, directory=str(directory), max_seconds=1)
+        assert os.path.dirname(recorder.raw_path) == str(directory.resolve())
+        assert os.path.dirname(recorder.wav_path) == str(directory.resolve())
+        recorder.write(CALLER, b"\x10" * 160)
+        os.unlink(recorder._finalize())
+    assert (tmp_path / "victim.wav").read_bytes() == b"keep"
+    assert sorted(os.listdir(directory)) == []
+
+
+def test_file_names():
+    assert recording_file_stem("plivo-call-5f2c_1") == "plivo-call-5f2c_1"
+    assert recording_file_stem("../victim") != recording_file_stem("__victim")
+    assert recording_file_stem("../victim").startswith("victim-")
+
+
+def test_symlinked_file_is_refused(tmp_path):
+    (tmp_path / "room-1.ulaw2").symlink_to(tmp_path.parent / "elsewhere.ulaw2")
+    with pytest.raises(ValueError):
+        CallRecorder("room-1", directory=str(tmp_path), max_seconds=1)
+
+
+def test_recording_switch():
+    assert recording_enabled({"record": "1"}) and recording_enabled({"record": "True"})
+    assert not recording_enabled({"record": "0"})
+
+
+def test_upload_uses_the_backend_call_id(tmp_path, monkeypatch):
+    s3 = pytest.importorskip("database.connectors.s3")
+    uploads = []
+
+    class _S3Connector:
+        def __init__(self, bucket):
+            self.bucket = bucket
+
+        async def upload_file_async(self, path, key):
+            uploads.append((self.bucket, key))
+            return f"s3://{self.bucket}/{key}"
+
+    monkeypatch.setattr(s3, "S3Connector", _S3Connector)
+    recorder = CallRecorder("plivo-room-1", directory=str(tmp_path), max_seconds=1)
+    recorder.write(CALLER, b"\x10" * 160)
+    url = asyncio.run(recorder.finalize_and_upload(bucket="recordings", call_id="req-uuid-1"))
+    assert uploads == [("recordings", "mp3/req-uuid-1.mp3")]
+    assert url == "s3://recordings/mp3/req-uuid-1.mp3"
+    assert not (tmp_path / "plivo-room-1.wav").exists()
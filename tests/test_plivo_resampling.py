@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from livekit import rtc
+
+from utils.plivo_ws import create_resampler
+
+
+def test_no_resampler_for_matching_rates():
+    assert create_resampler(8000, 8000, "high") is None
+
+
+@pytest.mark.parametrize("input_rate, output_rate", [(8000, 16000), (16000, 8000), (8000, 48000)])
+def test_direct_resampling_keeps_duration(input_rate, output_rate):
+    resampler = create_resampler(input_rate, output_rate, "high")
+    samples_in = input_rate // 50
+    frame = rtc.AudioFrame.create(sample_rate=input_rate, num_channels=1, samples_per_channel=samples_in)
+    t = np.arange(samples_in) / input_rate
+    tone = (np.sin(2 * np.pi * 440 * t) * 8000).astype(np.int16)
+
+    produced = 0
+    for _ in range(50):  # one second of 20ms frames
+        np.frombuffer(frame.data, dtype=np.int16)[:] = tone
+        for out in resampler.push(frame):
+            assert out.sample_rate == output_rate
+            produced += out.samples_per_channel
+    produced += sum(out.samples_per_channel for out in resampler.flush())
+    assert produced == pytest.approx(output_rate, rel=0.02)
+
+
+def test_unknown_quality_falls_back_to_medium():
+    assert create_resampler(8000, 16000, "bogus") is not None
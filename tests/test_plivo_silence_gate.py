@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from utils.plivo_silence_gate import SilenceGate, frame_rms
+
+rng = np.random.default_rng(3)
+LINE_NOISE = rng.normal(0, 20, 160).astype(np.int16)
+SPEECH = (np.sin(np.arange(160) / 3) * 3000).astype(np.int16)
+
+
+def test_frame_rms():
+    assert frame_rms(np.full(160, 100, dtype=np.int16)) == pytest.approx(100)
+    assert frame_rms(np.array([], dtype=np.int16)) == 0.0
+
+
+def test_gate_opens_on_the_first_speech_frame_and_holds_for_the_hangover():
+    gate = SilenceGate(mode="comfort", hangover_ms=60)
+    assert not gate.process(LINE_NOISE)
+    assert gate.process(SPEECH) and gate.is_open and gate.is_speech
+    # 60ms hangover = three 20ms frames of noise still pass
+    assert [gate.process(LINE_NOISE) for _ in range(5)] == [True, True, True, False, False]
+    assert not gate.is_speech and not gate.is_open
+    assert gate.stats["speech_onsets"] == 1
+
+
+def test_noise_floor_adapts_to_a_noisy_line():
+    gate = SilenceGate(mode="pause", min_rms=150, floor_ratio=3.0, hangover_ms=0)
+    noisy_line = rng.normal(0, 120, 160).astype(np.int16)
+    for _ in range(300):
+        assert not gate.process(noisy_line)
+    assert gate.noise_floor == pytest.approx(frame_rms(noisy_line), rel=0.05)
+    # Above min_rms but not 3x the line noise
+    assert not gate.process(rng.normal(0, 250, 160).astype(np.int16))
+    assert gate.process(SPEECH)
+
+
+def test_stats_and_modes():
+    gate = SilenceGate(mode="pause", hangover_ms=0)
+    for _ in range(3):
+        gate.process(LINE_NOISE)
+    gate.process(SPEECH)
+    stats = gate.get_stats()
+    assert stats["frames"] == 4 and stats["frames_suppressed"] == 3 and stats["suppression_ratio"] == 0.75
+    with pytest.raises(ValueError):
+        SilenceGate(mode="mute")
@@ -0,0 +1,72 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from utils import plivo_ws
+from utils.livekit_dispatch import DispatchResult
+from utils.plivo_warm_pool import WarmRoom, WarmRoomPool
+
+
+class _LiveKitPool:
+    def __init__(self):
+        self.deleted = []
+        self.client = SimpleNamespace(room=SimpleNamespace(delete_room=self._delete_room))
+
+    async def _delete_room(self, request):
+        self.deleted.append(request.room)
+
+    def forget_room(self, room_name):
+        pass
+
+
+def test_claim_only_serves_the_warmed_agent():
+    async def run():
+        pool = WarmRoomPool(_LiveKitPool(), ["Earkart"])
+        pool._ready["Earkart"].extend([WarmRoom("warm-1", "Earkart"), WarmRoom("warm-2", "Earkart")])
+        assert pool.claim("Mysyara") is None
+        assert pool.claim("Earkart") == "warm-1"
+        assert pool.claim("Earkart") == "warm-2"
+        assert pool.claim("Earkart") is None
+        return pool
+
+    pool = asyncio.run(run())
+    assert pool.stats["claims"] == 2 and pool.stats["misses"] == 1
+    assert pool.arrival_rate("Earkart") == 3 / pool.rate_window
+
+
+def test_claim_skips_and_recycles_stale_rooms():
+    async def run():
+        livekit_pool = _LiveKitPool()
+        pool = WarmRoomPool(livekit_pool, ["Earkart"], max_room_age=60)
+        stale = WarmRoom("warm-old", "Earkart")
+        stale.created_at = time.monotonic() - 120
+        pool._ready["Earkart"].extend([stale, WarmRoom("warm-new", "Earkart")])
+        room = pool.claim("Earkart")
+        await asyncio.sleep(0)
+        return room, livekit_pool.deleted
+
+    assert asyncio.run(run()) == ("warm-new", ["warm-old"])
+
+
+def test_target_size_follows_arrivals():
+    pool = WarmRoomPool(_LiveKitPool(), ["Earkart"], min_size=1, max_size=4, setup_seconds=5, rate_window=10)
+    assert pool.target_size("Earkart") == 1
+    pool._claims["Earkart"].extend([time.monotonic()] * 3)  # 0.3/s * 5s * 2 = 3
+    assert pool.target_size("Earkart") == 3
+    pool._claims["Earkart"].extend([time.monotonic()] * 30)
+    assert pool.target_size("Earkart") == 4
+
+
+def test_cold_calls_dispatch_the_requested_agent(monkeypatch):
+    dispatched = []
+
+    async def dispatch(agent_name, room_name):
+        dispatched.append((agent_name, room_name))
+        result = DispatchResult(agent_name, room_name)
+        result.success = True
+        return result
+
+    monkeypatch.setattr(plivo_ws, "agent_dispatcher", SimpleNamespace(dispatch=dispatch))
+    asyncio.run(plivo_ws.trigger_agent("room-a", "Mysyara"))
+    asyncio.run(plivo_ws.trigger_agent("room-b"))
+    assert dispatched == [("Mysyara", "room-a"), (plivo_ws.agent_name, "room-b")]
@@ -0,0 +1,89 @@
+import asyncio
+import socket
+from types import SimpleNamespace
+
+from utils import plivo_workers
+from utils.plivo_workers import (HandlerRegistry, control_port, forward_release, start_control_server,
+                                 worker_address)
+
+
+def _handler(room_name, **stats):
+    return SimpleNamespace(room_name=room_name, get_stats=lambda: {"room": room_name, "stats": stats})
+
+
+def test_registry_tracks_live_handlers():
+    registry = HandlerRegistry(worker_id=2)
+    a, b = _handler("room-a"), _handler("room-b")
+    registry.add(a)
+    registry.add(b)
+    assert len(registry) == 2 and registry.get("room-a") is a and a in registry
+
+    registry.remove(_handler("room-a"))  # a different handler for the same room is not removed
+    assert registry.get("room-a") is a
+    registry.remove(a)
+    assert registry.handlers() == [b] and a not in registry
+    assert registry.total_calls == 2
+
+
+def test_snapshot_sums_numeric_call_stats():
+    registry = HandlerRegistry(worker_id=1)
+    registry.add(_handler("room-a", frames=10, codec="pcmu"))
+    registry.add(_handler("room-b", frames=5))
+    snapshot = registry.snapshot()
+    assert snapshot["worker_id"] == 1
+    assert snapshot["active_calls"] == 2
+    assert snapshot["totals"] == {"frames": 15}
+    assert [call["room"] for call in snapshot["calls"]] == ["room-a", "room-b"]
+
+
+def test_worker_control_addresses():
+    assert control_port(3) == control_port(0) + 3
+    assert worker_address(3).endswith(f":{control_port(3)}")
+
+
+def test_find_by_plivo_identifiers():
+    registry = HandlerRegistry()
+    handler = _handler("room-a")
+    registry.add(handler)
+    registry.index(handler, "CA-1", "ST-1", None)
+    assert registry.find(None, "ST-1") is handler
+    assert registry.find("unknown", "CA-1") is handler
+    assert registry.find("room-a") is handler
+    assert registry.find("unknown", None) is None
+
+    registry.remove(handler)
+    assert registry.find("CA-1", "ST-1", "room-a") is None
+
+
+def test_release_is_forwarded_to_the_answering_worker(monkeypatch):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    monkeypatch.setattr(plivo_workers, "WORKER_CONTROL_BASE_PORT", port)
+    reserved = {"CA-1"}
+
+    def release(key):
+        if key in reserved:
+            reserved.remove(key)
+            return True
+        return False
+
+    async def run():
+        runner = await start_control_server(HandlerRegistry(worker_id=0), release_fnc=release)
+        try:
+            owner = f"http://127.0.0.1:{port}"
+            return await forward_release("CA-1", owner=owner), await forward_release("CA-1", owner=owner)
+        finally:
+            await runner.cleanup()
+
+    assert asyncio.run(run()) == (True, False)
+    assert not reserved
+
+
+def test_control_token(monkeypatch):
+    request = SimpleNamespace(headers={"X-Bridge-Token": "s3cret"})
+    assert plivo_workers.control_token_ok(SimpleNamespace(headers={}))
+    monkeypatch.setattr(plivo_workers, "CONTROL_TOKEN", "s3cret")
+    assert plivo_workers.control_token_ok(request)
+    assert not plivo_workers.control_token_ok(SimpleNamespace(headers={"X-Bridge-Token": "guess"}))
+    assert not plivo_workers.control_token_ok(SimpleNamespace(headers={}))
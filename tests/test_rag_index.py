@@ -0,0 +1,88 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from conftest import build, vector_for
+
+try:
+    from agent.helper.rag_index import RagIndex, reciprocal_rank_fusion
+except Exception as e:  # agent.helper needs livekit-agents and the deployed /app config
+    pytest.skip(f"agent helpers not importable: {e}", allow_module_level=True)
+
+PARAGRAPHS = ["Exterior wash for sedans costs 40 AED.", "We cover Al Karamah and Deira.",
+              "Battery replacement takes 30 minutes."]
+
+
+def test_loads_and_queries_the_published_index(warm_up_rag):
+    build(warm_up_rag, PARAGRAPHS)
+    rag_index = RagIndex(warm_up_rag.index_path, check_interval=60)
+    snapshot = asyncio.run(rag_index.get())
+    assert len(snapshot.paragraphs) == 3 and snapshot.info["count"] == 3
+    assert snapshot.query(vector_for(PARAGRAPHS[1]), 1) == [PARAGRAPHS[1]]
+    assert rag_index.get_stats()["items"] == 3 and rag_index.stats["loads"] == 1
+
+
+def test_new_build_is_swapped_in_and_old_snapshot_keeps_working(warm_up_rag):
+    build(warm_up_rag, PARAGRAPHS)
+    rag_index = RagIndex(warm_up_rag.index_path, check_interval=0)
+    old = asyncio.run(rag_index.get())
+
+    build(warm_up_rag, PARAGRAPHS + ["Fujairah is outside our service area."])
+    new = asyncio.run(rag_index.get())
+    assert new is not old and len(new.paragraphs) == 4
+    assert rag_index.stats["reloads"] == 1
+    # Files of the previous build are unlinked, but the old mappings stay readable
+    assert old.texts([0, 1, 2]) == PARAGRAPHS
+    assert asyncio.run(rag_index.get()) is new
+
+
+def test_unchanged_manifest_is_not_reloaded(warm_up_rag):
+    build(warm_up_rag, PARAGRAPHS)
+    rag_index = RagIndex(warm_up_rag.index_path, check_interval=0)
+    first = asyncio.run(rag_index.get())
+    assert asyncio.run(rag_index.get()) is first
+    assert not rag_index.refresh()
+
+
+def test_broken_build_keeps_the_current_index(warm_up_rag):
+    info = build(warm_up_rag, PARAGRAPHS)
+    rag_index = RagIndex(warm_up_rag.index_path, check_interval=0)
+    current = asyncio.run(rag_index.get())
+
+    manifest = os.path.join(warm_up_rag.index_path, warm_up_rag.INDEX_INFO_FILE)
+    with open(manifest, "w") as f:
+        json.dump({**info, "count": 5}, f)
+    assert asyncio.run(rag_index.get()) is current
+    assert rag_index.stats["load_errors"] == 1
+
+
+def test_count_mismatch_reports_every_count(warm_up_rag):
+    info = build(warm_up_rag, PARAGRAPHS)
+    with open(os.path.join(warm_up_rag.index_path, warm_up_rag.INDEX_INFO_FILE), "w") as f:
+        json.dump({**info, "count": 5}, f)
+    with pytest.raises(ValueError, match="index has 3 items, paragraph store 3, lexical 3, manifest 5"):
+        RagIndex(warm_up_rag.index_path).refresh()
+
+
+def test_lexical_search_uses_the_same_item_ids(warm_up_rag):
+    build(warm_up_rag, PARAGRAPHS)
+    snapshot = asyncio.run(RagIndex(warm_up_rag.index_path).get())
+    ids, coverage = snapshot.lexical_search("battery replacement", 3)
+    assert snapshot.texts(ids) == [PARAGRAPHS[2]] and coverage == pytest.approx(1.0)
+
+
+def test_reciprocal_rank_fusion():
+    assert reciprocal_rank_fusion([[1, 2, 3], [3, 1]]) == [1, 3, 2]
+    # Agreement beats one list's top rank
+    assert reciprocal_rank_fusion([[7, 1, 2], [1, 2], [2, 1]])[:2] == [1, 2]
+    assert reciprocal_rank_fusion([[4, 5], []]) == [4, 5]
+    assert reciprocal_rank_fusion([]) == []
+
+
+def test_missing_index_returns_none(tmp_path):
+    rag_index = RagIndex(str(tmp_path / "missing"))
+    assert asyncio.run(rag_index.get()) is None
+    rag_index.warm()  # logs, doesn't raise
+    assert rag_index.get_stats()["items"] == 0
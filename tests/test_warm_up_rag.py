@@ -0,0 +1,98 @@
+import asyncio
+import socket
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from conftest import DIMENSIONS
+from rag.fake_embedding_server import create_app, fake_embedding
+
+PARAGRAPHS = ["Exterior wash for sedans costs 40 AED.", "We cover Al Karamah and Deira.",
+              "Battery replacement takes 30 minutes."]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _with_server(warm_up_rag, monkeypatch, run):
+    """Run coroutine function run(stats_url) against the fake embeddings server"""
+    port = _free_port()
+    runner = web.AppRunner(create_app(dimensions=DIMENSIONS))
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    monkeypatch.setattr(warm_up_rag, "embeddings_url", f"http://127.0.0.1:{port}/v1/embeddings")
+    try:
+        return await run(f"http://127.0.0.1:{port}/stats")
+    finally:
+        await runner.cleanup()
+
+
+async def _inputs(stats_url) -> int:
+    async with aiohttp.ClientSession() as session:
+        async with session.get(stats_url) as resp:
+            return (await resp.json())["inputs"]
+
+
+def _write(path, paragraphs):
+    path.write_text("\n\n".join(paragraphs) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_only_new_paragraphs_are_embedded(warm_up_rag, monkeypatch, tmp_path, capsys):
+    raw = tmp_path / "knowledge-base.txt"
+
+    async def run(stats_url):
+        await warm_up_rag.main(raw_paths=[_write(raw, PARAGRAPHS)], trees=5)
+        first = await _inputs(stats_url)
+        changed = [PARAGRAPHS[0], "We cover Al Karamah, Deira and Bur Dubai.", PARAGRAPHS[2],
+                   "Fujairah is outside our service area."]
+        await warm_up_rag.main(raw_paths=[_write(raw, changed)], trees=5)
+        second = await _inputs(stats_url)
+        await warm_up_rag.main(raw_paths=[str(raw)], trees=5)
+        await warm_up_rag.main(raw_paths=[str(raw)], trees=5, full=True)
+        return changed, first, second, await _inputs(stats_url)
+
+    changed, first, second, full = asyncio.run(_with_server(warm_up_rag, monkeypatch, run))
+    assert (first, second, full) == (3, 5, 9)
+    assert "nothing to do" in capsys.readouterr().out
+
+    info = warm_up_rag.read_index_info()
+    assert info["count"] == 4 and info["dimensions"] == DIMENSIONS
+    vectors = warm_up_rag.load_previous_vectors()
+    assert vectors.keys() == {warm_up_rag.paragraph_id(p) for p in changed}
+    for paragraph in changed:
+        assert vectors[warm_up_rag.paragraph_id(paragraph)] == pytest.approx(
+            fake_embedding(paragraph, DIMENSIONS).tolist(), abs=1e-6)
+
+
+def test_other_model_is_rebuilt_from_scratch(warm_up_rag, monkeypatch, tmp_path):
+    raw = _write(tmp_path / "knowledge-base.txt", PARAGRAPHS)
+
+    async def run(stats_url):
+        await warm_up_rag.main(raw_paths=[raw], trees=5)
+        monkeypatch.setattr(warm_up_rag, "embeddings_model", "text-embedding-3-large")
+        await warm_up_rag.main(raw_paths=[raw], trees=5)
+        return await _inputs(stats_url)
+
+    assert asyncio.run(_with_server(warm_up_rag, monkeypatch, run)) == 6
+    assert warm_up_rag.read_index_info()["model"] == "text-embedding-3-large"
+
+
+def test_batches_keep_paragraph_order(warm_up_rag, monkeypatch):
+    paragraphs = [f"paragraph number {i} about car wash slot {i * 7}" for i in range(11)]
+
+    async def run(stats_url):
+        async with aiohttp.ClientSession() as session:
+            vectors = await warm_up_rag.embed_paragraphs(paragraphs, session, batch_size=3, concurrency=2)
+        async with aiohttp.ClientSession() as session:
+            async with session.get(stats_url) as resp:
+                return vectors, await resp.json()
+
+    vectors, stats = asyncio.run(_with_server(warm_up_rag, monkeypatch, run))
+    assert stats == {"requests": 4, "inputs": 11}
+    for paragraph, vector in zip(paragraphs, vectors):
+        assert vector == pytest.approx(fake_embedding(paragraph, DIMENSIONS).tolist(), abs=1e-6)
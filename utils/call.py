@@ -1,39 +1,48 @@
-import subprocess
 import argparse
+import asyncio
 import json
+import os
 
-def run_livekit_dispatch(metadata, contact_number, agent_name):
-    """Run the LiveKit dispatch command with the provided inputs."""
+from utils.livekit_pool import LiveKitClientPool
+from utils.livekit_dispatch import AgentDispatchClient
+
+LIVEKIT_URL = os.environ.get("LIVEKIT_URL", "wss://setupforretell-hk7yl5xf.livekit.cloud")
+LIVEKIT_API_KEY = os.environ.get("LIVEKIT_API_KEY", "APIoLr2sRCRJWY5")
+LIVEKIT_API_SECRET = os.environ.get("LIVEKIT_API_SECRET", "yE3wUkoQxjWjhteMAed9ubm5mYg3iOfPT6qBQfffzgJC")
+
+_dispatcher = None
+
+
+def get_dispatcher() -> AgentDispatchClient:
+    """Process-wide dispatch client (keep-alive API session shared by all requests)"""
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = AgentDispatchClient(LiveKitClientPool(LIVEKIT_URL, LIVEKIT_API_KEY, LIVEKIT_API_SECRET))
+    return _dispatcher
+
+
+async def run_livekit_dispatch(metadata, contact_number, agent_name, wait_for_job=False):
+    """Dispatch the agent into a new room with the provided inputs."""
 
-    # print("Running LiveKit dispatch command...")
-    # print(f"Metadata: {metadata}")
     # Ensure contact number has "+" prefix
     if not contact_number.startswith('+'):
         contact_number = '+' + contact_number
-    
-    command = [
-        "lk",
-        "dispatch",
-        "create",
-        "--new-room",
-        "--agent-name",
-        agent_name,
-        "--metadata",
-        json.dumps(metadata),
-        # contact_number,
-        "--api-key",
-        "APIoLr2sRCRJWY5",
-        "--api-secret",
-        "yE3wUkoQxjWjhteMAed9ubm5mYg3iOfPT6qBQfffzgJC",
-        "--url",
-        "wss://setupforretell-hk7yl5xf.livekit.cloud",
-    ]
-    
+
+    result = await get_dispatcher().dispatch(agent_name, metadata=metadata, wait_for_job=wait_for_job)
+    if not result.success:
+        return {"success": False, "output": None, "error": result.error, "room": None, "dispatch_id": None}
+    # Same room:"..." form the lk CLI printed, for callers that parse the output
+    output = f'id:"{result.dispatch_id}" agent_name:"{agent_name}" room:"{result.room_name}"'
+    return {"success": True, "output": output, "error": None,
+            "room": result.room_name, "dispatch_id": result.dispatch_id}
+
+
+async def _main(args):
     try:
-        result = subprocess.run(command, capture_output=True, text=True, check=True)
-        return {"success": True, "output": result.stdout, "error": None}
-    except subprocess.CalledProcessError as e:
-        return {"success": False, "output": None, "error": e.stderr}
+        return await run_livekit_dispatch(json.loads(args.metadata), args.contact, args.agent, wait_for_job=args.wait)
+    finally:
+        await get_dispatcher().livekit_pool.aclose()
+
 
 if __name__ == "__main__":
     # Set up argument parser
@@ -41,15 +50,16 @@ if __name__ == "__main__":
     parser.add_argument('--metadata', required=True, help='Json metadata for the dispatch')
     parser.add_argument('--contact', required=True, help='Contact number with country code')
     parser.add_argument('--agent', required=True, help='Agent name')
-    
+    parser.add_argument('--wait', action='store_true', help='Wait until an agent worker picks up the job')
+
     # Parse arguments
     args = parser.parse_args()
-    
-    # Run the dispatch command
-    result = run_livekit_dispatch(args.name, args.contact, args.agent)
-    
+
+    # Run the dispatch
+    result = asyncio.run(_main(args))
+
     if result["success"]:
-        print("Command executed successfully!")
+        print("Dispatch created successfully!")
         print("Output:", result["output"])
     else:
-        print("Error executing command:", result["error"])
\ No newline at end of file
+        print("Error creating dispatch:", result["error"])
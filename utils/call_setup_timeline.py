@@ -0,0 +1,173 @@
+"""
+Call setup waterfall: when each setup phase of a call happened.
+
+A CallSetupTimeline stamps phases in milliseconds from the call's origin
+(answer XML served for Plivo calls, agent job start for outbound SIP calls).
+Finished timelines go into a SetupTimelineStore, which keeps the most recent
+ones and a mergeable histogram per phase, served as p50/p95/p99 on the
+bridge's /setup-timeline endpoint. Agent workers report their SIP timelines
+to that endpoint (SETUP_TIMELINE_URL).
+"""
+
+import collections
+import logging
+import math
+import os
+import time
+
+from utils.plivo_latency import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+PLIVO_SETUP_PHASES = (
+    "answer_xml", "ws_connected", "start_event", "livekit_connected", "track_published",
+    "agent_joined", "agent_track_subscribed", "first_agent_audio",
+)
+SIP_SETUP_PHASES = (
+    "job_started", "sip_participant_created", "participant_joined", "ringing", "active",
+    "session_started", "greeting_started",
+)
+SETUP_PHASES = {"plivo": PLIVO_SETUP_PHASES, "sip": SIP_SETUP_PHASES}
+# Histograms kept per phase: ms since the origin, and ms since the previous phase
+MEASURES = ("at", "step")
+# Bridge endpoint agent workers POST finished SIP timelines to (e.g. http://bridge:8080/setup-timeline),
+# authenticated with the bridge's control token
+SETUP_TIMELINE_URL = os.environ.get("SETUP_TIMELINE_URL", "")
+SETUP_TIMELINE_TOKEN = os.environ.get("PLIVO_CONTROL_TOKEN", "")
+SETUP_TIMELINE_KEEP = int(os.environ.get("SETUP_TIMELINE_KEEP", 200))
+
+
+class CallSetupTimeline:
+    """First time each setup phase of one call was reached, relative to the call's origin"""
+
+    def __init__(self, kind: str, call_id: str, origin: float = None, origin_phase: str = None):
+        """
+        Args:
+            kind: "plivo" or "sip" (selects the phase order)
+            call_id: room name
+            origin: time.time() of the first phase when it happened elsewhere (e.g. on the
+                node that served the answer XML); defaults to now
+            origin_phase: phase stamped at 0ms
+        """
+        self.kind = kind
+        self.call_id = call_id
+        self.started_at = time.time() if origin is None else origin
+        # Monotonic clock for every later phase; the wall-clock origin only anchors it
+        self._origin = time.monotonic() - max(0.0, time.time() - self.started_at)
+        self.phases = {origin_phase: 0.0} if origin_phase else {}
+        self.finished = False
+
+    def mark(self, phase: str):
+        """Stamp a phase (first occurrence wins)"""
+        if phase not in self.phases:
+            self.phases[phase] = round((time.monotonic() - self._origin) * 1000, 1)
+
+    def steps(self):
+        """Time from the previously reached phase to each phase (phases can arrive out of order, e.g. warm rooms)"""
+        steps = {}
+        previous = 0.0
+        for phase, ms in sorted(self.phases.items(), key=lambda item: item[1]):
+            steps[phase] = round(ms - previous, 1)
+            previous = ms
+        return steps
+
+    def to_dict(self):
+        return {
+            "kind": self.kind,
+            "call_id": self.call_id,
+            "started_at": self.started_at,
+            "phases": dict(self.phases),
+            "steps": self.steps(),
+        }
+
+
+class SetupTimelineStore:
+    """Recent finished timelines plus per-phase histograms (ms since origin and step durations)"""
+
+    def __init__(self, keep: int = SETUP_TIMELINE_KEEP):
+        self.recent = collections.deque(maxlen=keep)
+        self.histograms = {}  # (kind, "at"|"step", phase) -> LatencyHistogram
+
+    def _record(self, kind: str, measure: str, phase: str, ms: float):
+        if measure not in MEASURES or phase not in SETUP_PHASES.get(kind, ()):
+            return
+        key = (kind, measure, phase)
+        if key not in self.histograms:
+            self.histograms[key] = LatencyHistogram()
+        self.histograms[key].record(max(ms, 0.0))
+
+    def add(self, timeline):
+        """
+        Store a finished CallSetupTimeline (or its to_dict() form, e.g. reported by an agent).
+        Only known kinds and phases with finite times are kept, so a report can't add histograms;
+        an unknown kind raises ValueError.
+        """
+        data = timeline.to_dict() if isinstance(timeline, CallSetupTimeline) else timeline
+        kind = data.get("kind", "plivo")
+        if kind not in SETUP_PHASES:
+            raise ValueError(f"unknown timeline kind: {kind!r}")
+        clean = {"kind": kind, "call_id": str(data.get("call_id", ""))[:128],
+                 "started_at": _finite(data.get("started_at"))}
+        for measure, field in zip(MEASURES, ("phases", "steps")):
+            values = {phase: _finite(data.get(field, {}).get(phase)) for phase in SETUP_PHASES[kind]}
+            clean[field] = {phase: ms for phase, ms in values.items() if ms is not None}
+            for phase, ms in clean[field].items():
+                self._record(kind, measure, phase, ms)
+        self.recent.append(clean)
+
+    def finish(self, timeline: CallSetupTimeline):
+        """Store a live timeline once; later calls are no-ops"""
+        if not timeline.finished:
+            timeline.finished = True
+            self.add(timeline)
+
+    def export(self):
+        return {"|".join(key): histogram.export() for key, histogram in self.histograms.items()}
+
+    def summary(self):
+        return summarize_exports([self.export()])
+
+
+def _finite(value):
+    """value as a float, or None if it isn't a finite number"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        return None
+    return float(value)
+
+
+def summarize_exports(exports):
+    """Percentiles per kind and phase, in phase order, from several SetupTimelineStore.export() results"""
+    histograms = {}
+    for export in exports:
+        for key, data in (export or {}).items():
+            key = tuple(key.split("|"))
+            histograms.setdefault(key, LatencyHistogram()).merge(LatencyHistogram.from_export(data))
+
+    summary = {}
+    for kind, phases in SETUP_PHASES.items():
+        rows = {}
+        for phase in phases:
+            at = histograms.get((kind, "at", phase))
+            step = histograms.get((kind, "step", phase))
+            if at is not None and at.count:
+                rows[phase] = {"since_start": at.summary(), "step": step.summary() if step else None}
+        if rows:
+            summary[kind] = rows
+    return summary
+
+
+async def report_setup_timeline(timeline: CallSetupTimeline, url: str = SETUP_TIMELINE_URL):
+    """Log a finished timeline and POST it to the bridge's /setup-timeline (when configured)"""
+    data = timeline.to_dict()
+    logger.info(f"⏱️ Call setup ({timeline.kind}) {timeline.call_id}: {data['steps']}")
+    if not url:
+        return
+    try:
+        import aiohttp
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=2)) as session:
+            headers = {"X-Bridge-Token": SETUP_TIMELINE_TOKEN} if SETUP_TIMELINE_TOKEN else {}
+            async with session.post(url, json=data, headers=headers) as resp:
+                if resp.status >= 400:
+                    logger.warning(f"⚠️ Setup timeline report rejected ({resp.status})")
+    except Exception as e:
+        logger.warning(f"⚠️ Could not report setup timeline: {e}")
@@ -0,0 +1,201 @@
+"""
+In-process agent dispatch through the LiveKit AgentDispatch API.
+
+Replaces forking `lk dispatch create` once per call: dispatches go over the
+shared keep-alive API client, run concurrently under a concurrency limit,
+time out and retry on transient errors, and can optionally wait until a
+worker has actually picked up the job.
+
+CreateDispatch is not idempotent and a request that timed out may still
+have reached LiveKit, so only connection errors raised before the request
+was sent are retried blindly. After any other failure the room's dispatches
+are listed first: an existing one for the agent counts as success (a retry
+would put a second agent on the call), and when they can't be listed the
+dispatch is not retried.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+
+import aiohttp
+from livekit import api
+
+from utils.livekit_pool import LiveKitClientPool
+
+logger = logging.getLogger(__name__)
+
+DISPATCH_TIMEOUT = float(os.environ.get("LIVEKIT_DISPATCH_TIMEOUT", 5.0))
+DISPATCH_RETRIES = int(os.environ.get("LIVEKIT_DISPATCH_RETRIES", 2))
+DISPATCH_CONCURRENCY = int(os.environ.get("LIVEKIT_DISPATCH_CONCURRENCY", 50))
+
+# Twirp errors that will not succeed on retry
+_PERMANENT_ERRORS = {"invalid_argument", "malformed", "not_found", "permission_denied",
+                     "unauthenticated", "already_exists", "failed_precondition", "bad_route"}
+# Failures where the request never left this process, so a retry can't create a duplicate
+_NOT_SENT_ERRORS = (ConnectionRefusedError, aiohttp.ClientConnectorError)
+
+
+class DispatchResult:
+    """Outcome of one agent dispatch"""
+
+    def __init__(self, agent_name: str, room_name: str):
+        self.agent_name = agent_name
+        self.room_name = room_name
+        self.dispatch_id = None
+        self.success = False
+        self.confirmed = None  # None when confirmation was not requested
+        self.error = None
+        self.attempts = 0
+        self.elapsed = 0.0
+
+    def to_dict(self):
+        return {
+            "success": self.success,
+            "room": self.room_name,
+            "dispatch_id": self.dispatch_id,
+            "agent_name": self.agent_name,
+            "confirmed": self.confirmed,
+            "attempts": self.attempts,
+            "elapsed_ms": round(self.elapsed * 1000, 1),
+            "error": self.error,
+        }
+
+
+class AgentDispatchClient:
+    """Async agent dispatcher with timeouts, retries, batching and job confirmation"""
+
+    def __init__(self, livekit_pool: LiveKitClientPool, timeout: float = DISPATCH_TIMEOUT,
+                 retries: int = DISPATCH_RETRIES, retry_backoff: float = 0.25,
+                 max_concurrency: int = DISPATCH_CONCURRENCY):
+        """
+        Args:
+            livekit_pool: shared LiveKit API client
+            timeout: seconds allowed for each CreateDispatch request
+            retries: extra attempts after a timeout or transient error (after checking that
+                the failed attempt didn't create the dispatch)
+            retry_backoff: base delay between attempts (doubles each retry)
+            max_concurrency: dispatch requests allowed in flight at once
+        """
+        self.livekit_pool = livekit_pool
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.stats = {"dispatched": 0, "failed": 0, "retries": 0, "timeouts": 0, "recovered": 0,
+                      "confirmed": 0, "unconfirmed": 0}
+
+    async def dispatch(self, agent_name: str, room_name: str = None, metadata=None,
+                       wait_for_job: bool = False, confirm_timeout: float = 10.0) -> DispatchResult:
+        """
+        Dispatch an agent into a room (a new random room when room_name is None).
+        With wait_for_job, also wait until a worker is running the job.
+        """
+        room_name = room_name or f"room-{uuid.uuid4().hex[:12]}"
+        if metadata is not None and not isinstance(metadata, str):
+            metadata = json.dumps(metadata)
+        result = DispatchResult(agent_name, room_name)
+        request = api.CreateAgentDispatchRequest(agent_name=agent_name, room=room_name, metadata=metadata or "")
+        started = time.monotonic()
+
+        async with self._semaphore:
+            for attempt in range(self.retries + 1):
+                result.attempts = attempt + 1
+                try:
+                    dispatch = await asyncio.wait_for(
+                        self.livekit_pool.client.agent_dispatch.create_dispatch(request), timeout=self.timeout)
+                    result.dispatch_id = dispatch.id
+                    result.success = True
+                    result.error = None
+                    break
+                except asyncio.TimeoutError as e:
+                    self.stats["timeouts"] += 1
+                    result.error = f"dispatch timed out after {self.timeout}s"
+                    error = e
+                except api.TwirpError as e:
+                    result.error = f"{e.code}: {e.message}"
+                    if e.code in _PERMANENT_ERRORS:
+                        break
+                    error = e
+                except Exception as e:
+                    result.error = str(e)
+                    error = e
+                if attempt == self.retries:
+                    break
+                if not isinstance(error, _NOT_SENT_ERRORS):
+                    # The request may have been processed: never dispatch the agent twice
+                    try:
+                        existing = await self._find_dispatch(agent_name, room_name)
+                    except Exception as e:
+                        result.error += f" (not retried, could not check for an existing dispatch: {e})"
+                        break
+                    if existing is not None:
+                        self.stats["recovered"] += 1
+                        result.dispatch_id = existing.id
+                        result.success = True
+                        result.error = None
+                        break
+                self.stats["retries"] += 1
+                logger.warning(f"⚠️ Dispatch of {agent_name} to {room_name} failed ({result.error}), retrying")
+                await asyncio.sleep(self.retry_backoff * (2 ** attempt))
+
+        if result.success:
+            self.stats["dispatched"] += 1
+            logger.info(f"✅ Dispatched {agent_name} to {room_name} (id: {result.dispatch_id}, "
+                        f"{(time.monotonic() - started) * 1000:.0f}ms, attempts: {result.attempts})")
+            if wait_for_job:
+                result.confirmed = await self.wait_for_job(room_name, result.dispatch_id, confirm_timeout)
+        else:
+            self.stats["failed"] += 1
+            logger.error(f"❌ Dispatch of {agent_name} to {room_name} failed: {result.error}")
+        result.elapsed = time.monotonic() - started
+        return result
+
+    async def dispatch_many(self, requests, wait_for_job: bool = False, confirm_timeout: float = 10.0):
+        """
+        Dispatch a batch concurrently (bounded by max_concurrency).
+        requests: iterable of dicts with agent_name and optional room_name / metadata.
+        Returns DispatchResults in request order.
+        """
+        return await asyncio.gather(*(
+            self.dispatch(r["agent_name"], r.get("room_name"), r.get("metadata"),
+                          wait_for_job=wait_for_job, confirm_timeout=confirm_timeout)
+            for r in requests
+        ))
+
+    async def _find_dispatch(self, agent_name: str, room_name: str):
+        """The room's dispatch of agent_name, or None (raises if the dispatches can't be listed)"""
+        dispatches = await asyncio.wait_for(
+            self.livekit_pool.client.agent_dispatch.list_dispatch(room_name), timeout=self.timeout)
+        return next((d for d in dispatches if d.agent_name == agent_name), None)
+
+    async def wait_for_job(self, room_name: str, dispatch_id: str, timeout: float = 10.0,
+                           poll_interval: float = 0.25) -> bool:
+        """Poll the dispatch until one of its jobs is running; False on timeout or job failure"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                dispatches = await self.livekit_pool.client.agent_dispatch.list_dispatch(room_name)
+                for dispatch in dispatches:
+                    if dispatch.id != dispatch_id:
+                        continue
+                    statuses = [job.state.status for job in dispatch.state.jobs]
+                    if any(s in (api.JobStatus.JS_RUNNING, api.JobStatus.JS_SUCCESS) for s in statuses):
+                        self.stats["confirmed"] += 1
+                        return True
+                    if statuses and all(s == api.JobStatus.JS_FAILED for s in statuses):
+                        logger.error(f"❌ Agent job failed for dispatch {dispatch_id} in {room_name}")
+                        self.stats["unconfirmed"] += 1
+                        return False
+            except Exception as e:
+                logger.debug(f"Dispatch status check failed for {room_name}: {e}")
+            await asyncio.sleep(poll_interval)
+        logger.warning(f"⚠️ No agent job started for dispatch {dispatch_id} in {room_name} within {timeout}s")
+        self.stats["unconfirmed"] += 1
+        return False
+
+    def get_stats(self):
+        return dict(self.stats)
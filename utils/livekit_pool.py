@@ -0,0 +1,132 @@
+"""
+Process-wide LiveKit API client for the telephony bridge.
+
+One api.LiveKitAPI backed by a keep-alive aiohttp session is shared by every
+call in the process, rooms that were already created are remembered for a
+short TTL, and access tokens can be minted ahead of time (e.g. while Plivo
+fetches the answer XML) so call setup only pays for the room connection.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+
+import aiohttp
+from livekit import api
+
+logger = logging.getLogger(__name__)
+
+
+class LiveKitClientPool:
+    """Shared LiveKit API client with a created-room cache and pre-minted tokens"""
+
+    def __init__(self, url: str, api_key: str, api_secret: str, room_ttl: float = 60.0,
+                 token_ttl: float = 120.0, max_connections: int = 100):
+        self.url = url
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.room_ttl = room_ttl
+        self.token_ttl = token_ttl
+        self.max_connections = max_connections
+
+        self._session = None
+        self._client = None
+        self._rooms = {}       # room name -> time the room was known to exist
+        self._creating = {}    # room name -> in-flight create_room future
+        self._tokens = {}      # room name -> (identity, jwt, minted_at)
+        self.stats = {
+            "rooms_created": 0,
+            "room_cache_hits": 0,
+            "tokens_minted": 0,
+            "token_cache_hits": 0,
+        }
+
+    @property
+    def client(self) -> api.LiveKitAPI:
+        """The shared API client (created on first use inside the running loop)"""
+        if self._client is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=120,
+                                             ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector,
+                                                  timeout=aiohttp.ClientTimeout(total=10))
+            self._client = api.LiveKitAPI(self.url, self.api_key, self.api_secret, session=self._session)
+        return self._client
+
+    async def ensure_room(self, room_name: str, **room_options) -> bool:
+        """Create the room unless it was created recently; concurrent callers share one request"""
+        created_at = self._rooms.get(room_name)
+        if created_at and time.monotonic() - created_at < self.room_ttl:
+            self.stats["room_cache_hits"] += 1
+            return True
+
+        pending = self._creating.get(room_name)
+        if pending is None:
+            pending = asyncio.ensure_future(self._create_room(room_name, room_options))
+            self._creating[room_name] = pending
+            pending.add_done_callback(lambda _: self._creating.pop(room_name, None))
+        return await asyncio.shield(pending)
+
+    async def _create_room(self, room_name: str, room_options: dict) -> bool:
+        self._expire()
+        try:
+            await self.client.room.create_room(api.CreateRoomRequest(name=room_name, **room_options))
+            self.stats["rooms_created"] += 1
+            logger.info(f"✅ Created LiveKit room: {room_name}")
+        except Exception as e:
+            if "already exists" not in str(e).lower():
+                logger.warning(f"⚠️ Room creation failed for {room_name}: {e}")
+                return False
+        self._rooms[room_name] = time.monotonic()
+        return True
+
+    def forget_room(self, room_name: str):
+        """Drop cached state for a room that has been deleted or ended"""
+        self._rooms.pop(room_name, None)
+        self._tokens.pop(room_name, None)
+
+    def mint_token(self, room_name: str, identity: str, name: str) -> str:
+        """Mint a room-join JWT (synchronous; prefer prefetch_token off the hot path)"""
+        self.stats["tokens_minted"] += 1
+        return (api.AccessToken(self.api_key, self.api_secret)
+                .with_identity(identity)
+                .with_name(name)
+                .with_grants(api.VideoGrants(room_join=True, room=room_name))
+                .to_jwt())
+
+    def prefetch_token(self, room_name: str, name: str, identity_prefix: str = "telephony"):
+        """Mint and cache a token for an upcoming call in this room"""
+        identity = f"{identity_prefix}-{uuid.uuid4()}"
+        self._tokens[room_name] = (identity, self.mint_token(room_name, identity, name), time.monotonic())
+
+    def take_token(self, room_name: str, name: str, identity_prefix: str = "telephony"):
+        """Return (identity, jwt) for a room, using a pre-minted token when one is fresh"""
+        cached = self._tokens.pop(room_name, None)
+        if cached and time.monotonic() - cached[2] < self.token_ttl:
+            self.stats["token_cache_hits"] += 1
+            return cached[0], cached[1]
+        identity = f"{identity_prefix}-{uuid.uuid4()}"
+        return identity, self.mint_token(room_name, identity, name)
+
+    async def prepare_room(self, room_name: str, name: str):
+        """Create the room and pre-mint a token ahead of an expected connection"""
+        self.prefetch_token(room_name, name)
+        await self.ensure_room(room_name)
+
+    def _expire(self):
+        now = time.monotonic()
+        for room_name in [r for r, t in self._rooms.items() if now - t >= self.room_ttl]:
+            del self._rooms[room_name]
+        for room_name in [r for r, t in self._tokens.items() if now - t[2] >= self.token_ttl]:
+            del self._tokens[room_name]
+
+    def get_stats(self):
+        self._expire()
+        return {**self.stats, "cached_rooms": len(self._rooms), "cached_tokens": len(self._tokens)}
+
+    async def aclose(self):
+        # LiveKitAPI leaves a caller-provided session open, so close it here
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._client = None
+        self._session = None
@@ -0,0 +1,198 @@
+"""
+Admission control for the Plivo bridge.
+
+New calls are refused while this worker is over any configured limit
+(concurrent calls, event-loop lag, process CPU) so existing calls keep clean
+audio instead of everyone degrading together. /plivo-app/plivo.xml answers
+refused calls with hangup XML and the WebSocket server closes refused streams
+with 1013 (try again later). The current load is published on /health for
+upstream balancers.
+
+Limits and reservations are per worker process: with PLIVO_BRIDGE_WORKERS > 1
+each worker admits up to PLIVO_MAX_CALLS, and the kernel may hand a call's
+stream to a different worker (or node) than the one that answered it. The
+answer XML therefore carries a signed ticket: a stream presenting a valid one
+is always taken, since Plivo has already answered the call, and the slot is
+given back on the worker that reserved it (found through the call directory).
+"""
+
+import asyncio
+import collections
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+import time
+
+logger = logging.getLogger(__name__)
+
+# Limits per bridge worker; 0 disables a limit
+MAX_CALLS = int(os.environ.get("PLIVO_MAX_CALLS", 0))
+MAX_LOOP_LAG_MS = float(os.environ.get("PLIVO_MAX_LOOP_LAG_MS", 0))
+MAX_CPU_PERCENT = float(os.environ.get("PLIVO_MAX_CPU_PERCENT", 0))
+CLOSE_CODE_OVERLOADED = 1013  # RFC 6455 "Try Again Later"
+# Slot held for a call whose answer XML was served but whose stream has not connected yet
+# (released when the stream connects or the call hangs up, else after the TTL)
+RESERVATION_TTL = 10.0
+# Answer-time tickets are accepted for this long after they were issued
+TICKET_TTL = 60.0
+# Signs answer-time tickets. Set at import so workers spawned by the supervisor inherit it;
+# set it explicitly (the same on every node) when streams can land on another node
+ADMISSION_SECRET = os.environ.setdefault("PLIVO_ADMISSION_SECRET", secrets.token_hex(16))
+
+
+class AdmissionController:
+    """Tracks worker load and decides whether to take new calls"""
+
+    def __init__(self, registry, max_calls: int = MAX_CALLS, max_loop_lag_ms: float = MAX_LOOP_LAG_MS,
+                 max_cpu_percent: float = MAX_CPU_PERCENT, sample_interval: float = 0.1, smoothing: float = 0.2):
+        """
+        Args:
+            registry: HandlerRegistry of this worker's live calls
+            max_calls / max_loop_lag_ms / max_cpu_percent: limits (0 disables)
+            sample_interval: seconds between loop-lag samples
+            smoothing: EWMA weight of each new lag/CPU sample (a single spike doesn't shed load)
+        """
+        self.registry = registry
+        self.max_calls = max_calls
+        self.max_loop_lag_ms = max_loop_lag_ms
+        self.max_cpu_percent = max_cpu_percent
+        self.sample_interval = sample_interval
+        self.smoothing = smoothing
+
+        self.loop_lag_ms = 0.0
+        self.cpu_percent = 0.0
+        self._reservations = collections.OrderedDict()  # call key -> reserved at (oldest first)
+        self._task = None
+        self.stats = {"admitted": 0, "rejected_calls": 0, "rejected_loop_lag": 0, "rejected_cpu": 0}
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._monitor())
+        return self._task
+
+    async def _monitor(self):
+        cpu_last = time.process_time()
+        wall_last = time.monotonic()
+        try:
+            while True:
+                expected = time.monotonic() + self.sample_interval
+                await asyncio.sleep(self.sample_interval)
+                now = time.monotonic()
+                lag_ms = max(0.0, (now - expected) * 1000)
+                self.loop_lag_ms += self.smoothing * (lag_ms - self.loop_lag_ms)
+
+                cpu_now = time.process_time()
+                cpu = (cpu_now - cpu_last) / max(now - wall_last, 1e-6) * 100
+                self.cpu_percent += self.smoothing * (cpu - self.cpu_percent)
+                cpu_last, wall_last = cpu_now, now
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Admission monitor error: {e}")
+
+    @property
+    def pending_calls(self) -> int:
+        horizon = time.monotonic() - RESERVATION_TTL
+        while self._reservations and next(iter(self._reservations.values())) < horizon:
+            self._reservations.popitem(last=False)
+        return len(self._reservations)
+
+    def check(self, key: str = None):
+        """Return (admitted, reason); a call that already holds a reservation under key keeps its slot"""
+        reason = None
+        calls = len(self.registry) + self.pending_calls - (key is not None and key in self._reservations)
+        if self.max_calls and calls >= self.max_calls:
+            reason = "calls"
+        elif self.max_loop_lag_ms and self.loop_lag_ms >= self.max_loop_lag_ms:
+            reason = "loop_lag"
+        elif self.max_cpu_percent and self.cpu_percent >= self.max_cpu_percent:
+            reason = "cpu"
+
+        if reason:
+            self.stats[f"rejected_{reason}"] += 1
+            return False, reason
+        return True, None
+
+    def reserve(self, key: str):
+        """Hold a slot for an answered call (CallUUID or room) until its stream connects or it hangs up"""
+        self._reservations.pop(key, None)  # a repeated answer request refreshes, not duplicates, the slot
+        self._reservations[key] = time.monotonic()
+
+    def release(self, key: str) -> bool:
+        """Drop the reservation held under key; True if there was one"""
+        return self._reservations.pop(key, None) is not None
+
+    @staticmethod
+    def _sign(key: str, issued: int) -> str:
+        return hmac.new(ADMISSION_SECRET.encode(), f"{key}|{issued}".encode(), hashlib.sha256).hexdigest()[:32]
+
+    def ticket(self, key: str) -> str:
+        """Proof, forwarded on the stream URL, that this bridge answered and reserved the call under key"""
+        issued = int(time.time())
+        return f"{issued}.{self._sign(key, issued)}"
+
+    def valid_ticket(self, key: str, ticket: str) -> bool:
+        if not key or not ticket:
+            return False
+        issued, _, signature = ticket.partition(".")
+        try:
+            age = time.time() - int(issued)
+        except ValueError:
+            return False
+        return -5 <= age <= TICKET_TTL and hmac.compare_digest(signature, self._sign(key, int(issued)))
+
+    def admit_stream(self, key: str = None, ticket: str = None):
+        """
+        A stream connected. One with a valid ticket for key was answered (and reserved) by a
+        worker of this bridge and is always taken; the caller releases that reservation, wherever
+        it is. Otherwise a reservation held here under key is consumed, else the limits are checked.
+        """
+        if self.valid_ticket(key, ticket):
+            self.stats["admitted"] += 1
+            return True, None
+        if key is not None and self.release(key):
+            # Reserved at answer time; only refuse if the worker has since become unhealthy
+            if not ((self.max_loop_lag_ms and self.loop_lag_ms >= self.max_loop_lag_ms)
+                    or (self.max_cpu_percent and self.cpu_percent >= self.max_cpu_percent)):
+                self.stats["admitted"] += 1
+                return True, None
+        admitted, reason = self.check()
+        if admitted:
+            self.stats["admitted"] += 1
+        return admitted, reason
+
+    def load(self):
+        """Current load; `load` is the highest fraction of any enabled limit (>= 1 means refusing calls)"""
+        calls = len(self.registry) + self.pending_calls
+        fractions = []
+        if self.max_calls:
+            fractions.append(calls / self.max_calls)
+        if self.max_loop_lag_ms:
+            fractions.append(self.loop_lag_ms / self.max_loop_lag_ms)
+        if self.max_cpu_percent:
+            fractions.append(self.cpu_percent / self.max_cpu_percent)
+        load = max(fractions, default=0.0)
+        return {
+            "load": round(load, 3),
+            "accepting": load < 1.0,
+            "active_calls": len(self.registry),
+            "pending_calls": calls - len(self.registry),
+            "loop_lag_ms": round(self.loop_lag_ms, 1),
+            "cpu_percent": round(self.cpu_percent, 1),
+            "limits": {
+                "max_calls": self.max_calls,
+                "max_loop_lag_ms": self.max_loop_lag_ms,
+                "max_cpu_percent": self.max_cpu_percent,
+            },
+            **self.stats,
+        }
+
+    async def aclose(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
@@ -0,0 +1,78 @@
+"""
+Barge-in signals for the Plivo bridge.
+
+When the caller interrupts, the agent cancels its speech but audio already
+handed to Plivo keeps playing. The bridge watches for the interruption and
+then sends Plivo `clearAudio` and purges its own outbound queue. Two signals
+are supported:
+
+- "signal": the agent publishes a data packet on INTERRUPT_TOPIC when a speech
+  handle is interrupted (enable_barge_in_signal in agent/helper/agent_class.py)
+- "silence": the agent track drops from speech to silence for silence_ms
+  while the caller is speaking (same energy check as the silence gate), so
+  the agent's own pauses and end of turn don't clear audio
+"""
+
+import logging
+import os
+
+import numpy as np
+
+from utils.plivo_silence_gate import SilenceGate
+
+logger = logging.getLogger(__name__)
+
+INTERRUPT_TOPIC = "telephony.interrupt"
+BARGE_IN_MODES = {m.strip() for m in os.environ.get("PLIVO_BARGE_IN_MODES", "signal").split(",") if m.strip()}
+BARGE_IN_SILENCE_MS = int(os.environ.get("PLIVO_BARGE_IN_SILENCE_MS", 120))
+# Peak amplitude below which an agent frame counts as silence (decoded jitter-buffer silence is ~0)
+BARGE_IN_SILENCE_PEAK = int(os.environ.get("PLIVO_BARGE_IN_SILENCE_PEAK", 64))
+# Agent audio still in flight when the interrupt arrives is dropped for this long
+BARGE_IN_GUARD_MS = int(os.environ.get("PLIVO_BARGE_IN_GUARD_MS", 100))
+
+
+class AgentSilenceDetector:
+    """
+    Detects the agent track going from speech to silence (cancelled speech
+    stops its frames) while the caller talks. Agent frames go to process(),
+    decoded caller frames to caller_frame().
+    """
+
+    def __init__(self, silence_ms: int = BARGE_IN_SILENCE_MS, peak_threshold: int = BARGE_IN_SILENCE_PEAK,
+                 sample_rate: int = 8000, caller_gate: SilenceGate = None):
+        self.silence_samples = sample_rate * silence_ms // 1000
+        self.peak_threshold = peak_threshold
+        self.caller_gate = caller_gate or SilenceGate(mode="off", sample_rate=sample_rate)
+        self._speaking = False
+        self._silent_samples = 0
+        self._caller_spoke = False
+        self.stats = {"agent_gaps": 0, "barge_ins": 0}
+
+    def caller_frame(self, pcm: np.ndarray):
+        """Feed one decoded caller frame; speech during the agent's gap arms the detector"""
+        self.caller_gate.process(pcm)
+        if self._speaking and self.caller_gate.is_speech:
+            self._caller_spoke = True
+
+    def process(self, pcm: np.ndarray) -> bool:
+        """Feed one int16 agent frame; True once per speech -> silence transition the caller spoke in"""
+        if pcm.size and max(int(pcm.max()), -int(pcm.min())) >= self.peak_threshold:
+            self._speaking = True
+            self._silent_samples = 0
+            self._caller_spoke = self.caller_gate.is_speech
+            return False
+        if not self._speaking:
+            return False
+        self._silent_samples += pcm.size
+        if self._silent_samples >= self.silence_samples:
+            self._speaking = False
+            self.stats["agent_gaps"] += 1
+            if self._caller_spoke:
+                self.stats["barge_ins"] += 1
+                return True
+        return False
+
+    def reset(self):
+        self._speaking = False
+        self._silent_samples = 0
+        self._caller_spoke = False
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for the Plivo bridge hot paths.
+Usage: python -m utils.plivo_bench [--packet-ms 20] [--iterations 20000] [--call-seconds 30]
+"""
+
+import argparse
+import base64
+import json
+import os
+import time
+import timeit
+
+import numpy as np
+
+from utils.plivo_codec import MulawCodec
+from utils.plivo_messages import PlivoMessageTemplates, parse_media_payload
+
+TELEPHONY_SAMPLE_RATE = 8000
+
+
+def _report(name: str, baseline: float, optimized: float, iterations: int):
+    base_us = baseline / iterations * 1e6
+    opt_us = optimized / iterations * 1e6
+    print(f"{name:<28} legacy {base_us:8.2f} us/op   fast {opt_us:8.2f} us/op   speedup {base_us / opt_us:5.1f}x")
+
+
+def bench_serialization(packet_ms: int, iterations: int):
+    """playAudio build and media parse: dict + json vs pre-rendered template / payload slicing"""
+    audio = os.urandom(TELEPHONY_SAMPLE_RATE * packet_ms // 1000)
+    templates = PlivoMessageTemplates(stream_id="b7f5c7f4-1a2b-4c3d-9e8f-0123456789ab")
+
+    def legacy_play_audio():
+        encoded_audio = base64.b64encode(audio).decode('utf-8')
+        return json.dumps({
+            "event": "playAudio",
+            "media": {
+                "contentType": "audio/x-mulaw",
+                "sampleRate": TELEPHONY_SAMPLE_RATE,
+                "payload": encoded_audio
+            }
+        })
+
+    def fast_play_audio():
+        return templates.play_audio(audio)
+
+    assert json.loads(fast_play_audio()) == json.loads(legacy_play_audio())
+
+    media_message = json.dumps({
+        "event": "media",
+        "sequenceNumber": 1234,
+        "streamId": templates.stream_id,
+        "media": {
+            "track": "inbound",
+            "timestamp": "1719300000123",
+            "chunk": 1234,
+            "payload": base64.b64encode(audio).decode(),
+        },
+        "extra_headers": "{}",
+    }, separators=(",", ":"))
+
+    def legacy_parse_media():
+        # Same steps handle_messages/handle_telephony_event took per media event
+        event = json.loads(media_message)
+        if event.get("event") == "media":
+            return base64.b64decode(event.get("media", {}).get("payload"))
+
+    def fast_parse_media():
+        return parse_media_payload(media_message)
+
+    assert fast_parse_media() == legacy_parse_media() == audio
+
+    print(f"--- Serialization ({packet_ms}ms packets, {len(audio)} bytes μ-law) ---")
+    _report("playAudio build",
+            timeit.timeit(legacy_play_audio, number=iterations),
+            timeit.timeit(fast_play_audio, number=iterations),
+            iterations)
+    _report("media event parse",
+            timeit.timeit(legacy_parse_media, number=iterations),
+            timeit.timeit(fast_parse_media, number=iterations),
+            iterations)
+
+
+def bench_resampling(call_seconds: int, modes=(48000, 16000, 8000), qualities=("HIGH", "MEDIUM")):
+    """CPU per call for each bridge sample-rate mode: decode + resample in, resample + encode out"""
+    from livekit import rtc
+
+    codec = MulawCodec()
+    rng = np.random.default_rng(1)
+    inbound_packet = codec.encode(rng.integers(-8000, 8000, 160, dtype=np.int16)).tobytes()
+
+    print(f"--- Resampling (CPU per simulated call, {call_seconds}s of audio each way) ---")
+    for rate in modes:
+        for quality in (qualities if rate != TELEPHONY_SAMPLE_RATE else ("n/a",)):
+            def resampler(input_rate, output_rate):
+                if input_rate == output_rate:
+                    return None
+                return rtc.AudioResampler(input_rate=input_rate, output_rate=output_rate, num_channels=1,
+                                          quality=getattr(rtc.AudioResamplerQuality, quality))
+
+            inbound = resampler(TELEPHONY_SAMPLE_RATE, rate)
+            outbound = resampler(rate, TELEPHONY_SAMPLE_RATE)
+            # LiveKit delivers 10ms frames at the subscribed rate
+            agent_samples = rate // 100
+            agent_frame = rtc.AudioFrame(rng.integers(-8000, 8000, agent_samples, dtype=np.int16).tobytes(),
+                                         rate, 1, agent_samples)
+
+            cpu_start = time.process_time()
+            # Caller -> LiveKit: 20ms μ-law packets
+            for _ in range(call_seconds * 50):
+                frame = rtc.AudioFrame.create(TELEPHONY_SAMPLE_RATE, 1, 160)
+                codec.decode(inbound_packet, np.frombuffer(frame.data, dtype=np.int16))
+                if inbound:
+                    inbound.push(frame)
+            cpu_in = time.process_time() - cpu_start
+
+            cpu_start = time.process_time()
+            # Agent -> caller: 10ms frames
+            for _ in range(call_seconds * 100):
+                for out_frame in (outbound.push(agent_frame) if outbound else [agent_frame]):
+                    codec.encode(np.frombuffer(out_frame.data, dtype=np.int16, count=out_frame.samples_per_channel))
+            cpu_out = time.process_time() - cpu_start
+
+            per_second_ms = (cpu_in + cpu_out) / call_seconds * 1000
+            print(f"{rate:>6}Hz quality={quality:<7} inbound {cpu_in / call_seconds * 1000:6.3f} ms/s   "
+                  f"outbound {cpu_out / call_seconds * 1000:6.3f} ms/s   "
+                  f"total {per_second_ms:6.3f} ms CPU per call-second (~{1000 / per_second_ms:,.0f} calls/core)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plivo bridge microbenchmarks")
+    parser.add_argument("--packet-ms", type=int, default=20, help="Packet duration in ms")
+    parser.add_argument("--iterations", type=int, default=20000, help="Iterations per measurement")
+    parser.add_argument("--call-seconds", type=int, default=30, help="Simulated audio per call for resampling")
+    args = parser.parse_args()
+
+    bench_serialization(args.packet_ms, args.iterations)
+    bench_resampling(args.call_seconds)
+
+
+if __name__ == "__main__":
+    main()
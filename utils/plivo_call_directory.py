@@ -0,0 +1,323 @@
+"""
+Call directory for running the Plivo bridge on several nodes.
+
+The WebSocket of a call lives in one bridge worker, but Plivo's hangup and
+stream-status callbacks go through the load balancer and can land on any
+node. Every worker registers its calls (room, CallUUID, StreamId) with the
+address of its control server; a callback that reaches the wrong worker
+looks up the owner and forwards the teardown there.
+
+Backends (PLIVO_CALL_DIRECTORY):
+
+- "memory" (default): process-local, for a single bridge process
+- "redis://host:port/db": any Redis-compatible server. The bridge speaks
+  the few RESP commands it needs itself, so no client library is required;
+  `python -m utils.plivo_call_directory --serve` runs a local stand-in.
+"""
+
+import abc
+import argparse
+import asyncio
+import logging
+import os
+import time
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+CALL_DIRECTORY_URL = os.environ.get("PLIVO_CALL_DIRECTORY", "memory")
+# Entries outlive the longest stream (Plivo streamTimeout is 3600s) in case a node dies mid-call
+CALL_DIRECTORY_TTL = int(os.environ.get("PLIVO_CALL_DIRECTORY_TTL", 4000))
+CALL_DIRECTORY_TIMEOUT = 0.5
+KEY_PREFIX = "plivo:call:"
+
+
+class CallDirectory(abc.ABC):
+    """Maps call keys (room, CallUUID, StreamId) to the control address of the owning worker"""
+
+    backend = "base"
+
+    def __init__(self):
+        self._tasks = set()
+        self.stats = {"registered": 0, "lookups": 0, "hits": 0, "errors": 0}
+
+    @abc.abstractmethod
+    async def register(self, owner: str, keys, ttl: int = CALL_DIRECTORY_TTL):
+        """Record owner for every key, expiring after ttl seconds"""
+
+    @abc.abstractmethod
+    async def lookup(self, *keys):
+        """Owner address of the first registered key, or None"""
+
+    @abc.abstractmethod
+    async def unregister(self, keys):
+        """Forget keys"""
+
+    @property
+    def shared(self) -> bool:
+        """True when other processes see this directory's entries"""
+        return False
+
+    def soon(self, coro):
+        """Run a directory update in the background (never on the audio path)"""
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def get_stats(self):
+        return {"backend": self.backend, **self.stats}
+
+    async def aclose(self):
+        if self._tasks:
+            await asyncio.wait(list(self._tasks), timeout=CALL_DIRECTORY_TIMEOUT)
+
+
+class MemoryCallDirectory(CallDirectory):
+    """Process-local directory (single bridge process)"""
+
+    backend = "memory"
+
+    def __init__(self):
+        super().__init__()
+        self._entries = {}  # key -> (owner, expires_at)
+
+    async def register(self, owner: str, keys, ttl: int = CALL_DIRECTORY_TTL):
+        expires_at = time.monotonic() + ttl
+        for key in keys:
+            if key:
+                self._entries[key] = (owner, expires_at)
+        self.stats["registered"] += 1
+
+    async def lookup(self, *keys):
+        self.stats["lookups"] += 1
+        now = time.monotonic()
+        for key in keys:
+            entry = self._entries.get(key) if key else None
+            if entry is not None:
+                if entry[1] > now:
+                    self.stats["hits"] += 1
+                    return entry[0]
+                del self._entries[key]
+        return None
+
+    async def unregister(self, keys):
+        for key in keys:
+            if key:
+                self._entries.pop(key, None)
+
+
+def _encode_command(*args) -> bytes:
+    parts = [f"*{len(args)}\r\n".encode()]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+async def _read_reply(reader: asyncio.StreamReader):
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("connection closed")
+    kind, payload = line[:1], line[1:-2]
+    if kind == b"+":
+        return payload.decode()
+    if kind == b"-":
+        raise RuntimeError(payload.decode())
+    if kind == b":":
+        return int(payload)
+    if kind == b"$":
+        length = int(payload)
+        if length < 0:
+            return None
+        data = await reader.readexactly(length + 2)
+        return data[:-2].decode()
+    if kind == b"*":
+        count = int(payload)
+        return None if count < 0 else [await _read_reply(reader) for _ in range(count)]
+    raise RuntimeError(f"unexpected reply: {line!r}")
+
+
+class RedisCallDirectory(CallDirectory):
+    """Directory in a Redis-compatible server, shared by every bridge node"""
+
+    backend = "redis"
+
+    def __init__(self, url: str, timeout: float = CALL_DIRECTORY_TIMEOUT):
+        super().__init__()
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._reader = None
+        self._writer = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def shared(self) -> bool:
+        return True
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        if setup:
+            await self._pipeline(setup)
+
+    async def _pipeline(self, commands):
+        self._writer.write(b"".join(_encode_command(*command) for command in commands))
+        await self._writer.drain()
+        return [await _read_reply(self._reader) for _ in commands]
+
+    async def execute(self, commands):
+        """Send commands in one round trip; reconnects once if the connection dropped"""
+        async with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._writer is None:
+                        await asyncio.wait_for(self._connect(), timeout=self.timeout)
+                    return await asyncio.wait_for(self._pipeline(commands), timeout=self.timeout)
+                except (ConnectionError, OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+                    self._close_connection()
+                    if attempt:
+                        raise ConnectionError(f"call directory {self.host}:{self.port} unavailable: {e}") from e
+
+    def _close_connection(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    async def register(self, owner: str, keys, ttl: int = CALL_DIRECTORY_TTL):
+        commands = [("SET", KEY_PREFIX + key, owner, "EX", ttl) for key in keys if key]
+        try:
+            await self.execute(commands)
+            self.stats["registered"] += 1
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"❌ Call directory register failed: {e}")
+
+    async def lookup(self, *keys):
+        keys = [key for key in keys if key]
+        if not keys:
+            return None
+        self.stats["lookups"] += 1
+        try:
+            (owners,) = await self.execute([("MGET", *(KEY_PREFIX + key for key in keys))])
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"❌ Call directory lookup failed: {e}")
+            return None
+        owner = next((o for o in owners if o), None)
+        if owner:
+            self.stats["hits"] += 1
+        return owner
+
+    async def unregister(self, keys):
+        keys = [KEY_PREFIX + key for key in keys if key]
+        if not keys:
+            return
+        try:
+            await self.execute([("DEL", *keys)])
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"❌ Call directory unregister failed: {e}")
+
+    async def aclose(self):
+        await super().aclose()
+        self._close_connection()
+
+
+def create_call_directory(url: str = CALL_DIRECTORY_URL) -> CallDirectory:
+    if url.startswith(("redis://", "rediss://")):
+        if url.startswith("rediss://"):
+            raise ValueError("TLS Redis is not supported by the call directory; use a local TLS proxy")
+        return RedisCallDirectory(url)
+    if url == "memory":
+        return MemoryCallDirectory()
+    raise ValueError(f"Unknown call directory: {url}")
+
+
+async def serve_stand_in(host: str = "127.0.0.1", port: int = 6379):
+    """Minimal Redis-compatible server (PING/SET/GET/MGET/DEL/EXPIRE) for local multi-node tests"""
+    store = {}  # key -> (value, expires_at or None)
+
+    def get(key):
+        entry = store.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= time.monotonic():
+            del store[key]
+            return None
+        return entry[0]
+
+    def bulk(value):
+        if value is None:
+            return b"$-1\r\n"
+        data = value.encode()
+        return b"$%d\r\n%s\r\n" % (len(data), data)
+
+    async def handle(reader, writer):
+        try:
+            while True:
+                header = await reader.readline()
+                if not header:
+                    break
+                args = []
+                for _ in range(int(header[1:-2])):
+                    length = int((await reader.readline())[1:-2])
+                    args.append((await reader.readexactly(length + 2))[:-2].decode())
+                command = args[0].upper()
+                if command == "PING":
+                    reply = b"+PONG\r\n"
+                elif command in ("AUTH", "SELECT"):
+                    reply = b"+OK\r\n"
+                elif command == "SET":
+                    ttl = int(args[4]) if len(args) >= 5 and args[3].upper() == "EX" else None
+                    store[args[1]] = (args[2], time.monotonic() + ttl if ttl else None)
+                    reply = b"+OK\r\n"
+                elif command == "GET":
+                    reply = bulk(get(args[1]))
+                elif command == "MGET":
+                    reply = b"*%d\r\n" % (len(args) - 1) + b"".join(bulk(get(k)) for k in args[1:])
+                elif command == "DEL":
+                    removed = sum(1 for k in args[1:] if store.pop(k, None) is not None)
+                    reply = b":%d\r\n" % removed
+                elif command == "EXPIRE":
+                    value = get(args[1])
+                    if value is not None:
+                        store[args[1]] = (value, time.monotonic() + int(args[2]))
+                    reply = b":%d\r\n" % (value is not None)
+                else:
+                    reply = f"-ERR unknown command '{args[0]}'\r\n".encode()
+                writer.write(reply)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    logger.info(f"🗂️ Call directory stand-in listening on {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Local Redis-compatible stand-in for the bridge call directory")
+    parser.add_argument("--serve", action="store_true", help="Run the stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    args = parser.parse_args()
+    if args.serve:
+        try:
+            asyncio.run(serve_stand_in(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+    else:
+        parser.print_help()
@@ -0,0 +1,104 @@
+"""
+G.711 μ-law codec for the Plivo bridge.
+
+Lookup-table NumPy replacement for audioop.ulaw2lin / audioop.lin2ulaw
+(audioop is removed in Python 3.13). Both directions can write into
+caller-owned buffers so the per-frame audio path does not allocate.
+"""
+
+import numpy as np
+
+BIAS = 0x84
+CLIP = 8159
+_SEG_UEND = np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF], dtype=np.int32)
+
+
+def _build_decode_table() -> np.ndarray:
+    """256-entry μ-law -> int16 table (same values as audioop.ulaw2lin)"""
+    u_val = ~np.arange(256, dtype=np.int32) & 0xFF
+    t = ((u_val & 0x0F) << 3) + BIAS
+    t <<= (u_val & 0x70) >> 4
+    return np.where(u_val & 0x80, BIAS - t, t - BIAS).astype(np.int16)
+
+
+def _build_encode_table() -> np.ndarray:
+    """65536-entry table indexed by the uint16 view of an int16 sample"""
+    pcm = np.arange(65536, dtype=np.uint16).view(np.int16).astype(np.int32) >> 2
+    mask = np.where(pcm < 0, 0x7F, 0xFF)
+    pcm = np.minimum(np.abs(pcm), CLIP) + (BIAS >> 2)
+    seg = np.searchsorted(_SEG_UEND, pcm, side="left")
+    uval = (np.minimum(seg, 7) << 4) | ((pcm >> (seg + 1)) & 0x0F)
+    uval = np.where(seg >= 8, 0x7F, uval)
+    return (uval ^ mask).astype(np.uint8)
+
+
+ULAW_DECODE_TABLE = _build_decode_table()
+ULAW_ENCODE_TABLE = _build_encode_table()
+
+
+def ulaw_to_pcm(mulaw_data, out: np.ndarray = None) -> np.ndarray:
+    """
+    Decode μ-law bytes to int16 PCM.
+
+    Args:
+        mulaw_data: bytes, bytearray, memoryview or uint8 array (not copied)
+        out: optional int16 array of at least len(mulaw_data) samples to write into
+
+    Returns:
+        int16 array of decoded samples (a view of `out` when given)
+    """
+    src = np.frombuffer(mulaw_data, dtype=np.uint8)
+    if out is None:
+        return ULAW_DECODE_TABLE[src]
+    dst = out[:src.size]
+    np.take(ULAW_DECODE_TABLE, src, out=dst)
+    return dst
+
+
+def pcm_to_ulaw(pcm_data, out: np.ndarray = None) -> np.ndarray:
+    """
+    Encode int16 PCM to μ-law.
+
+    Args:
+        pcm_data: int16 array, or any buffer of native-endian 16-bit samples (not copied)
+        out: optional uint8 array of at least as many samples to write into
+
+    Returns:
+        uint8 array of μ-law bytes (a view of `out` when given)
+    """
+    if isinstance(pcm_data, np.ndarray):
+        src = pcm_data.view(np.uint16)
+    else:
+        src = np.frombuffer(pcm_data, dtype=np.uint16)
+    if out is None:
+        return ULAW_ENCODE_TABLE[src]
+    dst = out[:src.size]
+    np.take(ULAW_ENCODE_TABLE, src, out=dst)
+    return dst
+
+
+class MulawCodec:
+    """Per-call μ-law codec with preallocated scratch buffers for both directions"""
+
+    def __init__(self, max_samples: int = 1600):
+        # 1600 samples = 200ms at 8kHz; grown on demand for oversized packets
+        self._pcm = np.empty(max_samples, dtype=np.int16)
+        self._ulaw = np.empty(max_samples, dtype=np.uint8)
+
+    def _ensure_capacity(self, n: int):
+        if n > self._pcm.size:
+            self._pcm = np.empty(n, dtype=np.int16)
+            self._ulaw = np.empty(n, dtype=np.uint8)
+
+    def decode(self, mulaw_data, out: np.ndarray = None) -> np.ndarray:
+        """Decode into `out` (e.g. an AudioFrame buffer) or the internal PCM scratch buffer"""
+        if out is None:
+            self._ensure_capacity(len(mulaw_data))
+            out = self._pcm
+        return ulaw_to_pcm(mulaw_data, out)
+
+    def encode(self, pcm_data) -> memoryview:
+        """Encode into the internal μ-law scratch buffer; valid until the next encode() call"""
+        n = pcm_data.size if isinstance(pcm_data, np.ndarray) else len(memoryview(pcm_data).cast("B")) // 2
+        self._ensure_capacity(n)
+        return memoryview(pcm_to_ulaw(pcm_data, self._ulaw))
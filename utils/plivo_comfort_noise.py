@@ -0,0 +1,140 @@
+"""
+Comfort-noise engine for outbound telephony audio.
+
+Noise loops are generated once per process for each (noise type, volume)
+and mixed into outbound 8kHz PCM with saturating integer adds and a rolling
+offset, instead of calling np.random.normal for every frame.
+"""
+
+import functools
+import logging
+import math
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+NOISE_SAMPLE_RATE = 8000
+NOISE_LOOP_SECONDS = 12
+# RMS of the noise at noise_volume=1 (matches the previous normal(0, 0.01) * 32767 * 0.1)
+BASE_NOISE_RMS = 32.767
+# Extra samples past the loop end so any frame up to this size is one contiguous slice
+_LOOP_PAD = 1600
+_INT16_MAX = np.int32(32767)
+_INT16_MIN = np.int32(-32768)
+NOISE_TYPES = ("white", "pink", "brown", "call-center")
+
+
+def _normalize(noise: np.ndarray) -> np.ndarray:
+    noise = noise - noise.mean()
+    return noise / max(float(np.sqrt(np.mean(noise ** 2))), 1e-9)
+
+
+def _shaped_noise(rng: np.random.Generator, n: int, exponent: float) -> np.ndarray:
+    """Gaussian noise with a 1/f^exponent power spectrum"""
+    spectrum = np.fft.rfft(rng.standard_normal(n))
+    freqs = np.fft.rfftfreq(n, d=1.0 / NOISE_SAMPLE_RATE)
+    freqs[0] = freqs[1]
+    spectrum /= freqs ** (exponent / 2.0)
+    return np.fft.irfft(spectrum, n)
+
+
+def _generate(noise_type: str, n: int) -> np.ndarray:
+    """Unit-RMS float noise loop whose end wraps smoothly into its start"""
+    rng = np.random.default_rng(0x5EED)
+    if noise_type == "white":
+        noise = rng.standard_normal(n)
+    elif noise_type == "pink":
+        noise = _shaped_noise(rng, n, 1.0)
+    elif noise_type == "brown":
+        noise = _shaped_noise(rng, n, 2.0)
+    elif noise_type == "call-center":
+        # Room tone plus a slowly swelling band of murmur in the speech range
+        room = _shaped_noise(rng, n, 1.0)
+        spectrum = np.fft.rfft(rng.standard_normal(n))
+        freqs = np.fft.rfftfreq(n, d=1.0 / NOISE_SAMPLE_RATE)
+        spectrum[(freqs < 200) | (freqs > 2500)] = 0
+        murmur = _normalize(np.fft.irfft(spectrum, n))
+        t = np.arange(n) / NOISE_SAMPLE_RATE
+        # Periods divide the loop length so the envelope is continuous across the wrap
+        envelope = 0.6 + 0.4 * np.sin(2 * np.pi * t / 4.0) * np.sin(2 * np.pi * t / 3.0)
+        noise = _normalize(room) + 0.8 * murmur * envelope
+    else:
+        raise ValueError(f"Unknown noise type: {noise_type}")
+    return _normalize(noise)
+
+
+@functools.lru_cache(maxsize=32)
+def get_noise_loop(noise_type: str = "call-center", volume: float = 1.0) -> np.ndarray:
+    """
+    Shared read-only noise loop for a noise type and volume.
+    Values are int16-range but stored as int32 so mixing needs no dtype casts.
+    The array is NOISE_LOOP_SECONDS long plus a wrap-around pad.
+    """
+    n = NOISE_SAMPLE_RATE * NOISE_LOOP_SECONDS
+    scaled = np.round(_generate(noise_type, n) * BASE_NOISE_RMS * volume)
+    loop = np.clip(scaled, -32768, 32767).astype(np.int32)
+    loop = np.concatenate((loop, loop[:_LOOP_PAD]))
+    loop.flags.writeable = False
+    logger.info(f"🔈 Generated comfort-noise loop: {noise_type} @ volume {volume} ({n} samples)")
+    return loop
+
+
+class ComfortNoiseMixer:
+    """Per-call mixer reading a shared noise loop at a rolling offset"""
+
+    def __init__(self, noise_type: str = "call-center", volume: float = 1.0, max_samples: int = _LOOP_PAD):
+        self.noise_type = noise_type
+        self.volume = volume
+        self._loop = get_noise_loop(noise_type, volume)
+        self._loop_len = self._loop.size - _LOOP_PAD
+        # Start calls at different points so concurrent calls don't share a pattern
+        self._offset = int(np.random.randint(self._loop_len))
+        self._acc = np.empty(max_samples, dtype=np.int32)
+        self._out = np.empty(max_samples, dtype=np.int16)
+
+    def mix(self, pcm: np.ndarray) -> np.ndarray:
+        """Return pcm + noise (saturated to int16); valid until the next mix() call"""
+        n = pcm.size
+        if n > self._out.size:
+            self._acc = np.empty(n, dtype=np.int32)
+            self._out = np.empty(n, dtype=np.int16)
+        done = 0
+        while done < n:
+            chunk = min(n - done, _LOOP_PAD)
+            np.add(pcm[done:done + chunk], self._loop[self._offset:self._offset + chunk],
+                   out=self._acc[done:done + chunk])
+            self._offset = (self._offset + chunk) % self._loop_len
+            done += chunk
+        acc = self._acc[:n]
+        # Saturate (np.minimum/np.maximum are much cheaper than np.clip on short frames)
+        np.minimum(acc, _INT16_MAX, out=acc)
+        np.maximum(acc, _INT16_MIN, out=acc)
+        out = self._out[:n]
+        np.copyto(out, acc, casting="unsafe")
+        return out
+
+    @classmethod
+    def from_params(cls, params: dict):
+        """
+        Build a mixer from answer-URL style parameters
+        (bg_noise=true&noise_type=call-center&noise_volume=1); None when disabled.
+        """
+        if str(params.get("bg_noise", "false")).lower() not in ("true", "1", "yes"):
+            return None
+        noise_type = params.get("noise_type") or "call-center"
+        if noise_type not in NOISE_TYPES:
+            logger.warning(f"⚠️ Unknown noise type '{noise_type}', using call-center")
+            noise_type = "call-center"
+        try:
+            volume = float(params.get("noise_volume", 1))
+        except (TypeError, ValueError):
+            volume = 1.0
+        if not math.isfinite(volume):
+            logger.warning(f"⚠️ Invalid noise volume '{params.get('noise_volume')}', using 1")
+            volume = 1.0
+        # Quantize so arbitrary values still share a small set of cached loops
+        volume = round(min(max(volume, 0.0), 10.0), 1)
+        if volume <= 0:
+            return None
+        return cls(noise_type, volume)
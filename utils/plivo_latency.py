@@ -0,0 +1,160 @@
+"""
+Latency probes for the Plivo bridge.
+
+Streaming log-bucketed histograms (fixed memory, mergeable across calls and
+worker processes) for:
+
+- response_ms: end of caller speech -> first agent audio frame of the reply
+- inbound_queue_ms: Plivo media message received -> frame accepted by the
+  LiveKit AudioSource, plus audio still queued in the source
+- outbound_send_ms: agent packet queued -> playAudio send completed
+
+Every call keeps its own LatencyProbes and feeds the process-wide
+`process_latency` as well.
+"""
+
+import bisect
+import math
+import os
+
+LATENCY_PROBES = ("response_ms", "inbound_queue_ms", "outbound_send_ms")
+# Frames whose peak amplitude reaches this count as speech for the response probe
+SPEECH_PEAK = int(os.environ.get("PLIVO_SPEECH_PEAK", 800))
+# The agent must have been quiet this long for a voiced frame to start a new reply
+RESPONSE_MIN_AGENT_GAP = float(os.environ.get("PLIVO_RESPONSE_MIN_AGENT_GAP", 0.3))
+
+# Bucket upper bounds: 0.1ms .. ~120s, 8% apart (percentiles are accurate to that resolution)
+_GROWTH = 1.08
+_BOUNDS = [0.1 * _GROWTH ** i for i in range(int(math.log(1.2e6) / math.log(_GROWTH)) + 1)]
+
+
+def frame_peak(pcm) -> int:
+    """Peak absolute amplitude of an int16 frame"""
+    if not pcm.size:
+        return 0
+    return max(int(pcm.max()), -int(pcm.min()))
+
+
+class LatencyHistogram:
+    """Fixed-bucket streaming histogram of millisecond values"""
+
+    def __init__(self):
+        self.counts = [0] * (len(_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, ms: float):
+        self.counts[bisect.bisect_left(_BOUNDS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def merge(self, other: "LatencyHistogram"):
+        for i, n in enumerate(other.counts):
+            if n:
+                self.counts[i] += n
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th percentile (capped at the observed max)"""
+        if not self.count:
+            return 0.0
+        rank = q / 100.0 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(_BOUNDS[i] if i < len(_BOUNDS) else self.max, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 1) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50), 1),
+            "p95_ms": round(self.percentile(95), 1),
+            "p99_ms": round(self.percentile(99), 1),
+            "max_ms": round(self.max, 1),
+        }
+
+    def export(self):
+        """Sparse JSON-serializable form for combining histograms from other processes"""
+        return {
+            "buckets": {str(i): n for i, n in enumerate(self.counts) if n},
+            "count": self.count,
+            "total": self.total,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_export(cls, data: dict) -> "LatencyHistogram":
+        histogram = cls()
+        for i, n in data.get("buckets", {}).items():
+            histogram.counts[int(i)] = n
+        histogram.count = data.get("count", 0)
+        histogram.total = data.get("total", 0.0)
+        histogram.max = data.get("max", 0.0)
+        return histogram
+
+
+class LatencyProbes:
+    """One histogram per probe; values also feed the parent (process-wide) probes"""
+
+    def __init__(self, parent: "LatencyProbes" = None):
+        self.parent = parent
+        self.histograms = {name: LatencyHistogram() for name in LATENCY_PROBES}
+
+    def record(self, name: str, ms: float):
+        self.histograms[name].record(ms)
+        if self.parent is not None:
+            self.parent.record(name, ms)
+
+    def summary(self):
+        return {name: histogram.summary() for name, histogram in self.histograms.items()}
+
+    def export(self):
+        return {name: histogram.export() for name, histogram in self.histograms.items()}
+
+
+def merge_exports(exports):
+    """Summary of several LatencyProbes.export() results (one per worker)"""
+    merged = {name: LatencyHistogram() for name in LATENCY_PROBES}
+    for export in exports:
+        for name, data in (export or {}).items():
+            if name in merged:
+                merged[name].merge(LatencyHistogram.from_export(data))
+    return {name: histogram.summary() for name, histogram in merged.items()}
+
+
+class ResponseLatencyTracker:
+    """Pairs the end of caller speech with the first voiced agent frame of the reply"""
+
+    def __init__(self, probes: LatencyProbes, min_agent_gap: float = RESPONSE_MIN_AGENT_GAP):
+        self.probes = probes
+        self.min_agent_gap = min_agent_gap
+        self._caller_voiced_at = None
+        self._agent_voiced_at = None
+        self._awaiting_reply = False
+
+    def caller_frame(self, peak: int, now: float):
+        if peak >= SPEECH_PEAK:
+            self._caller_voiced_at = now
+            self._awaiting_reply = True
+
+    def agent_frame(self, peak: int, now: float):
+        if peak < SPEECH_PEAK:
+            return
+        agent_was_quiet = (self._agent_voiced_at is None
+                           or now - self._agent_voiced_at >= self.min_agent_gap)
+        if (self._awaiting_reply and agent_was_quiet
+                and (self._agent_voiced_at is None or self._caller_voiced_at > self._agent_voiced_at)):
+            self.probes.record("response_ms", (now - self._caller_voiced_at) * 1000)
+        self._awaiting_reply = False
+        self._agent_voiced_at = now
+
+
+process_latency = LatencyProbes()
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+Synthetic Plivo load generator for the telephony bridge.
+
+Opens N concurrent fake Plivo audio streams against the bridge WebSocket and
+sends μ-law audio at real-time pace as start/media/stop events. By default a
+local echo bridge is started: the real plivo_ws WebSocket handler with its
+LiveKit room replaced by a loopback track, so caller audio comes back as
+"agent" audio through the whole decode/resample/AudioStream/packetizer path
+without a LiveKit server.
+
+Reports bridge CPU per call, memory per call, event-loop lag and the pacing
+jitter of outbound playAudio packets.
+
+Usage:
+  python -m utils.plivo_loadgen --calls 50 --seconds 30 [--audio caller.wav] [--ramp 5]
+  python -m utils.plivo_loadgen --url ws://bridge:8765/ --bridge-pid 1234 --calls 20
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import types
+import uuid
+import wave
+
+import numpy as np
+import websockets
+
+from utils.plivo_codec import pcm_to_ulaw
+from utils.plivo_latency import LatencyHistogram
+
+TELEPHONY_SAMPLE_RATE = 8000
+LOOP_LAG_INTERVAL = 0.05
+
+
+def load_audio(path: str) -> bytes:
+    """Caller audio as μ-law: 8kHz mono 16-bit WAV, or raw μ-law (.ulaw/.mulaw/.raw)"""
+    if path.lower().endswith(".wav"):
+        with wave.open(path, "rb") as wav:
+            if wav.getframerate() != TELEPHONY_SAMPLE_RATE or wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+                raise ValueError("WAV input must be 8kHz mono 16-bit PCM")
+            pcm = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+        return pcm_to_ulaw(pcm).tobytes()
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def synthesize_audio(seconds: float = 10.0) -> bytes:
+    """Talk spurts (1.2s of modulated harmonics, 0.8s of line noise) as μ-law"""
+    rng = np.random.default_rng(7)
+    t = np.arange(int(seconds * TELEPHONY_SAMPLE_RATE)) / TELEPHONY_SAMPLE_RATE
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / TELEPHONY_SAMPLE_RATE
+    voice = sum(np.sin(k * phase) / k for k in range(1, 8))
+    voice *= 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t) ** 2  # syllable envelope
+    talking = (t % 2.0) < 1.2
+    pcm = np.where(talking, voice * 4000, 0) + rng.normal(0, 30, t.size)
+    return pcm_to_ulaw(np.clip(pcm, -32768, 32767).astype(np.int16)).tobytes()
+
+
+class StreamResults:
+    """Measurements of all fake streams"""
+
+    def __init__(self):
+        self.send_lag = LatencyHistogram()
+        self.jitter = LatencyHistogram()
+        self.packets_sent = 0
+        self.packets_received = 0
+        self.streams_completed = 0
+        self.errors = []
+
+
+async def run_stream(index: int, url: str, audio: bytes, seconds: float, packet_ms: int,
+                     results: StreamResults):
+    """One fake Plivo call: start event, real-time media events, stop event"""
+    stream_id = str(uuid.uuid4())
+    call_id = str(uuid.uuid4())
+    separator = "&" if "?" in url else "?"
+    room = f"loadgen-{index}-{uuid.uuid4().hex[:8]}"
+    packet_bytes = TELEPHONY_SAMPLE_RATE * packet_ms // 1000
+    packets = int(seconds * 1000 / packet_ms)
+
+    try:
+        async with websockets.connect(f"{url}{separator}room={room}&warm=1", max_queue=None) as ws:
+
+            async def receive():
+                last_arrival = None
+                async for message in ws:
+                    now = time.monotonic()
+                    event = json.loads(message)
+                    if event.get("event") != "playAudio":
+                        continue
+                    results.packets_received += 1
+                    payload_ms = len(base64.b64decode(event["media"]["payload"])) * 1000 / TELEPHONY_SAMPLE_RATE
+                    if last_arrival is not None:
+                        results.jitter.record(abs((now - last_arrival) * 1000 - payload_ms))
+                    last_arrival = now
+
+            receiver = asyncio.create_task(receive())
+            await ws.send(json.dumps({
+                "event": "start",
+                "sequenceNumber": 0,
+                "start": {
+                    "callId": call_id,
+                    "streamId": stream_id,
+                    "accountId": "LOADGEN",
+                    "tracks": ["inbound"],
+                    "mediaFormat": {"encoding": "audio/x-mulaw", "sampleRate": TELEPHONY_SAMPLE_RATE},
+                },
+                "extra_headers": "{}",
+            }))
+
+            started = time.monotonic()
+            for seq in range(packets):
+                due = started + seq * packet_ms / 1000
+                delay = due - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                results.send_lag.record(max(0.0, (time.monotonic() - due) * 1000))
+                offset = (seq * packet_bytes) % max(1, len(audio) - packet_bytes)
+                await ws.send(json.dumps({
+                    "event": "media",
+                    "sequenceNumber": seq + 1,
+                    "streamId": stream_id,
+                    "media": {
+                        "track": "inbound",
+                        "timestamp": str(int((seq * packet_ms))),
+                        "chunk": seq + 1,
+                        "payload": base64.b64encode(audio[offset:offset + packet_bytes]).decode(),
+                    },
+                    "extra_headers": "{}",
+                }, separators=(",", ":")))
+                results.packets_sent += 1
+
+            await ws.send(json.dumps({
+                "event": "stop",
+                "sequenceNumber": packets + 1,
+                "streamId": stream_id,
+                "stop": {"callId": call_id, "streamId": stream_id},
+            }))
+            # Let the tail of the echoed audio arrive before hanging up
+            await asyncio.sleep(0.5)
+            receiver.cancel()
+            results.streams_completed += 1
+    except Exception as e:
+        results.errors.append(f"stream {index}: {e}")
+
+
+def _make_echo_handler(bridge):
+    from livekit import rtc
+
+    class EchoTelephonyHandler(bridge.TelephonyWebSocketHandler):
+        """Bridge handler whose 'agent' is a loopback of the caller's own published track"""
+
+        async def connect_to_livekit(self):
+            self.audio_source = bridge.TelephonyAudioSource()
+            self.audio_track = rtc.LocalAudioTrack.create_audio_track("telephony-audio", self.audio_source)
+            self.connected = True
+            self.agent_participant = types.SimpleNamespace(identity="agent-echo")
+            self._start_agent_audio_stream(self.agent_participant, self.audio_track)
+            await self._flush_preconnect_buffer()
+            return True
+
+    return EchoTelephonyHandler
+
+
+async def serve_echo_bridge(port: int, stats_port: int):
+    """Run the bridge WebSocket handler with the echo stand-in, plus a loop-lag stats endpoint"""
+    from aiohttp import web
+    from utils import plivo_ws as bridge
+    from utils.plivo_workers import registry
+
+    handler_cls = _make_echo_handler(bridge)
+    loop_lag = LatencyHistogram()
+
+    async def monitor_loop_lag():
+        while True:
+            expected = time.monotonic() + LOOP_LAG_INTERVAL
+            await asyncio.sleep(LOOP_LAG_INTERVAL)
+            loop_lag.record(max(0.0, (time.monotonic() - expected) * 1000))
+
+    async def handle_stats(request):
+        snapshot = registry.snapshot()
+        return web.json_response({
+            "pid": os.getpid(),
+            "active_calls": snapshot["active_calls"],
+            "totals": snapshot["totals"],
+            "loop_lag": loop_lag.summary(),
+            "latency": bridge.process_latency.summary(),
+        })
+
+    async def handle_reset(request):
+        nonlocal loop_lag
+        loop_lag = LatencyHistogram()
+        return web.json_response({"status": "ok"})
+
+    async def websocket_handler(websocket):
+        await bridge.handle_telephony_websocket(websocket, websocket.request.path, handler_cls=handler_cls)
+
+    app = web.Application()
+    app.router.add_get("/loadgen/stats", handle_stats)
+    app.router.add_post("/loadgen/reset", handle_reset)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", stats_port).start()
+
+    lag_task = asyncio.create_task(monitor_loop_lag())
+    async with websockets.serve(websocket_handler, "127.0.0.1", port, max_size=None):
+        await asyncio.Future()
+    lag_task.cancel()
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _process_cpu_seconds(pid: int) -> float:
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def _process_rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+async def _wait_for_port(port: int, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"echo bridge did not start listening on port {port}")
+
+
+async def _fetch_json(method: str, url: str):
+    import aiohttp
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=5)) as session:
+        async with session.request(method, url) as resp:
+            return await resp.json()
+
+
+def _fmt(summary: dict) -> str:
+    return (f"p50 {summary['p50_ms']:7.1f}   p95 {summary['p95_ms']:7.1f}   p99 {summary['p99_ms']:7.1f}   "
+            f"max {summary['max_ms']:7.1f} ms   (n={summary['count']})")
+
+
+async def run_load(args):
+    audio = load_audio(args.audio) if args.audio else synthesize_audio()
+    echo_process = None
+    stats_url = None
+    pid = args.bridge_pid
+    url = args.url
+
+    if url is None:
+        port, stats_port = _free_port(), _free_port()
+        echo_process = subprocess.Popen(
+            [sys.executable, "-m", "utils.plivo_loadgen", "--serve-echo",
+             "--port", str(port), "--stats-port", str(stats_port)],
+            stdout=subprocess.DEVNULL, stderr=None if args.verbose else subprocess.DEVNULL)
+        pid = echo_process.pid
+        url = f"ws://127.0.0.1:{port}/"
+        stats_url = f"http://127.0.0.1:{stats_port}"
+        await _wait_for_port(stats_port)
+        await _wait_for_port(port)
+
+    try:
+        await asyncio.sleep(1.0)  # let the bridge settle before the idle baseline
+        rss_idle = _process_rss_mb(pid) if pid else None
+        rss_peak = rss_idle
+        cpu_start = _process_cpu_seconds(pid) if pid else None
+        if stats_url:
+            await _fetch_json("POST", f"{stats_url}/loadgen/reset")
+
+        results = StreamResults()
+        wall_start = time.monotonic()
+
+        async def start_stream(i):
+            await asyncio.sleep(args.ramp * i / max(1, args.calls))
+            await run_stream(i, url, audio, args.seconds, args.packet_ms, results)
+
+        load = asyncio.gather(*(start_stream(i) for i in range(args.calls)))
+        while not load.done():
+            await asyncio.sleep(0.5)
+            if pid:
+                rss_peak = max(rss_peak, _process_rss_mb(pid))
+        await load
+
+        wall = time.monotonic() - wall_start
+        cpu = _process_cpu_seconds(pid) - cpu_start if pid else None
+        bridge_stats = await _fetch_json("GET", f"{stats_url}/loadgen/stats") if stats_url else None
+    finally:
+        if echo_process:
+            echo_process.terminate()
+            try:
+                echo_process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                echo_process.kill()
+
+    call_seconds = args.calls * args.seconds
+    report = {
+        "calls": args.calls,
+        "seconds_per_call": args.seconds,
+        "packet_ms": args.packet_ms,
+        "wall_seconds": round(wall, 1),
+        "streams_completed": results.streams_completed,
+        "errors": results.errors,
+        "packets_sent": results.packets_sent,
+        "packets_received": results.packets_received,
+        "outbound_pacing_jitter": results.jitter.summary(),
+        "generator_send_lag": results.send_lag.summary(),
+    }
+    if cpu is not None:
+        report["bridge_cpu_ms_per_call_second"] = round(cpu / call_seconds * 1000, 3)
+        report["bridge_cpu_percent_of_core"] = round(cpu / wall * 100, 1)
+        report["bridge_rss_idle_mb"] = round(rss_idle, 1)
+        report["bridge_rss_peak_mb"] = round(rss_peak, 1)
+        report["bridge_rss_mb_per_call"] = round((rss_peak - rss_idle) / args.calls, 2)
+    if bridge_stats:
+        report["bridge_loop_lag"] = bridge_stats["loop_lag"]
+        report["bridge_latency"] = bridge_stats["latency"]
+    return report
+
+
+def print_report(report: dict):
+    print(f"--- Plivo bridge load: {report['calls']} calls x {report['seconds_per_call']}s, "
+          f"{report['packet_ms']}ms packets ({report['wall_seconds']}s wall) ---")
+    print(f"streams completed      {report['streams_completed']}/{report['calls']}   "
+          f"packets sent {report['packets_sent']}   playAudio received {report['packets_received']}")
+    if "bridge_cpu_ms_per_call_second" in report:
+        per_call = report["bridge_cpu_ms_per_call_second"]
+        print(f"bridge CPU             {per_call:.3f} ms per call-second   "
+              f"{report['bridge_cpu_percent_of_core']}% of one core   (~{1000 / max(per_call, 1e-6):,.0f} calls/core)")
+        print(f"bridge memory          idle {report['bridge_rss_idle_mb']} MB   peak {report['bridge_rss_peak_mb']} MB   "
+              f"~{report['bridge_rss_mb_per_call']} MB per call")
+    if "bridge_loop_lag" in report:
+        print(f"bridge loop lag        {_fmt(report['bridge_loop_lag'])}")
+        for name, summary in report["bridge_latency"].items():
+            print(f"bridge {name:<16} {_fmt(summary)}")
+    print(f"outbound pacing jitter {_fmt(report['outbound_pacing_jitter'])}")
+    print(f"generator send lag     {_fmt(report['generator_send_lag'])}")
+    for error in report["errors"][:10]:
+        print(f"error: {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic Plivo load generator for the telephony bridge")
+    parser.add_argument("--calls", type=int, default=10, help="Concurrent fake Plivo streams")
+    parser.add_argument("--seconds", type=float, default=20, help="Audio sent per call")
+    parser.add_argument("--ramp", type=float, default=2.0, help="Seconds over which call starts are spread")
+    parser.add_argument("--packet-ms", type=int, default=20, help="Inbound media packet duration")
+    parser.add_argument("--audio", help="Caller audio (8kHz mono 16-bit WAV or raw μ-law); synthetic if omitted")
+    parser.add_argument("--url", help="Bridge WebSocket URL; a local echo bridge is started if omitted")
+    parser.add_argument("--bridge-pid", type=int, help="PID of an external bridge for CPU/memory sampling")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Show echo bridge logs")
+    parser.add_argument("--serve-echo", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--stats-port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_echo:
+        asyncio.run(serve_echo_bridge(args.port, args.stats_port))
+        return
+
+    report = asyncio.run(run_load(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
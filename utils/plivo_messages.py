@@ -0,0 +1,63 @@
+"""
+Fast serialization for Plivo audio-stream messages.
+
+Outbound playAudio messages only differ in their payload, so they are built
+by splicing base64 bytes between a pre-rendered prefix and suffix instead of
+json.dumps on a nested dict. Inbound media events are parsed by slicing out
+the payload without a full json.loads; anything else falls back to JSON.
+"""
+
+import binascii
+import json
+
+
+class PlivoMessageTemplates:
+    """Pre-rendered Plivo stream messages for one call"""
+
+    def __init__(self, stream_id: str = None, content_type: str = "audio/x-mulaw", sample_rate: int = 8000):
+        self.stream_id = stream_id
+        self.content_type = content_type
+        self.sample_rate = sample_rate
+        self._play_prefix = (
+            '{"event":"playAudio","media":{"contentType":%s,"sampleRate":%d,"payload":"'
+            % (json.dumps(content_type), sample_rate)
+        ).encode()
+        self._play_suffix = b'"}}'
+        self.clear_audio = json.dumps({"event": "clearAudio", "streamId": stream_id}).encode()
+
+    def play_audio(self, audio_data) -> bytes:
+        """Render a playAudio message (UTF-8 JSON bytes) for raw audio bytes"""
+        return b"".join((
+            self._play_prefix,
+            binascii.b2a_base64(audio_data, newline=False),
+            self._play_suffix,
+        ))
+
+
+_EVENT_MEDIA = '"event":"media"'
+_PAYLOAD_KEY = '"payload":"'
+
+
+def parse_media_payload(message):
+    """
+    Extract and decode the audio payload of a Plivo `media` event.
+
+    Base64 never contains quotes, so the payload ends at the next '"'.
+    Returns None when the message is not a compact media event; the caller
+    should then fall back to json.loads.
+    """
+    if isinstance(message, (bytes, bytearray)):
+        message = message.decode("utf-8", "replace")
+    if _EVENT_MEDIA not in message:
+        return None
+    start = message.find(_PAYLOAD_KEY)
+    if start < 0:
+        return None
+    start += len(_PAYLOAD_KEY)
+    end = message.find('"', start)
+    if end < 0:
+        return None
+    try:
+        return binascii.a2b_base64(message[start:end])
+    except binascii.Error:
+        return None
@@ -12,12 +12,14 @@ import os
 import sys
 import time
 import uuid
-import subprocess
 from typing import Optional, Dict, Any
 
 import requests
 from livekit import api
 
+from utils.livekit_pool import LiveKitClientPool
+from utils.livekit_dispatch import AgentDispatchClient
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -42,6 +44,8 @@ class OutboundCallManager:
     
     def __init__(self):
         self.lk_api = None
+        self.livekit_pool = None
+        self.dispatcher = None
         self.validate_environment()
     
     def validate_environment(self):
@@ -69,37 +73,29 @@ class OutboundCallManager:
         try:
             logger.info(f"🏠 Creating LiveKit room: {room_name}")
             
-            # Initialize LiveKit API
-            self.lk_api = api.LiveKitAPI(LIVEKIT_URL, LIVEKIT_API_KEY, LIVEKIT_API_SECRET)
+            # Initialize LiveKit API (one keep-alive client for room, dispatch and participant calls)
+            if self.livekit_pool is None:
+                self.livekit_pool = LiveKitClientPool(LIVEKIT_URL, LIVEKIT_API_KEY, LIVEKIT_API_SECRET)
+                self.dispatcher = AgentDispatchClient(self.livekit_pool)
+            self.lk_api = self.livekit_pool.client
             
             # Step 1: Create room
-            try:
-                await self.lk_api.room.create_room(api.CreateRoomRequest(name=room_name))
-                logger.info(f"✅ LiveKit room created: {room_name}")
-            except Exception as e:
-                if "already exists" in str(e).lower():
-                    logger.info(f"ℹ️ Room already exists: {room_name}")
-                else:
-                    logger.error(f"❌ Error creating room: {e}")
-                    return False
+            if not await self.livekit_pool.ensure_room(room_name):
+                logger.error(f"❌ Error creating room: {room_name}")
+                return False
             
-            # Step 2: Dispatch agent immediately (don't wait)
+            # Step 2: Dispatch agent immediately
             logger.info(f"🤖 Dispatching agent to room: {room_name}")
-            metadata_json = json.dumps(metadata)
-            
-            # Use subprocess.Popen for non-blocking agent dispatch
-            agent_process = subprocess.Popen([
-                "lk", "dispatch", "create",
-                "--room", room_name,
-                "--agent-name", AGENT_NAME,
-                "--metadata", metadata_json
-            ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            dispatch = await self.dispatcher.dispatch(AGENT_NAME, room_name, metadata)
+            if not dispatch.success:
+                logger.error(f"❌ Agent dispatch failed: {dispatch.error}")
+                return False
             
-            logger.info(f"✅ Agent dispatch initiated (PID: {agent_process.pid})")
+            logger.info(f"✅ Agent dispatched (id: {dispatch.dispatch_id})")
             
-            # Step 3: Wait for agent to be ready (but with timeout)
+            # Step 3: Wait for the agent job to start (but with timeout)
             logger.info("⏰ Waiting for agent to join room...")
-            agent_ready = await self.wait_for_agent_ready(room_name, timeout=10)
+            agent_ready = await self.dispatcher.wait_for_job(room_name, dispatch.dispatch_id, timeout=10)
             
             if agent_ready:
                 logger.info("🤖 Agent is ready in room!")
@@ -205,9 +201,9 @@ class OutboundCallManager:
     
     async def cleanup(self):
         """Clean up resources"""
-        if self.lk_api:
+        if self.livekit_pool:
             try:
-                await self.lk_api.aclose()
+                await self.livekit_pool.aclose()
             except Exception as e:
                 logger.error(f"❌ Error cleaning up LiveKit API: {e}")
 
@@ -0,0 +1,198 @@
+"""
+Outbound packetizer for agent -> Plivo audio.
+
+Collects 8kHz μ-law produced by the return resampler into fixed-duration
+packets and sends them from a paced loop, so Plivo receives one playAudio
+message per packet instead of one per resampled LiveKit frame.
+
+The queue is a bounded ring between the LiveKit stream (producer) and the
+WebSocket send (consumer): a slow carrier socket never stalls reading from
+LiveKit, and once the high-water mark is reached packets are dropped by the
+configured policy instead of building unbounded latency.
+"""
+
+import asyncio
+import collections
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+MULAW_SILENCE = 0xFF
+DROP_OLDEST = "drop-oldest"
+DROP_NEWEST = "drop-newest"
+DROP_POLICIES = (DROP_OLDEST, DROP_NEWEST)
+
+
+class PlayAudioPacketizer:
+    """Fixed-size μ-law packets sent at real-time pace from a bounded queue"""
+
+    def __init__(self, send_fn, packet_ms: int = 20, max_queue_ms: int = 1000,
+                 lead_packets: int = 2, sample_rate: int = 8000, drop_policy: str = DROP_OLDEST,
+                 late_ms: int = 200, on_sent=None):
+        """
+        Args:
+            send_fn: async callable taking one packet (bytes) and returning True on success
+            packet_ms: duration of each outbound packet
+            max_queue_ms: high-water mark; audio beyond this is dropped by drop_policy
+            lead_packets: how far (in packets) the loop may fall behind its schedule with audio
+                queued (event-loop stall) and still catch up by sending back-to-back
+            sample_rate: telephony sample rate (1 byte per μ-law sample)
+            drop_policy: DROP_OLDEST discards the head of the queue (keeps the freshest audio),
+                DROP_NEWEST rejects incoming packets (keeps the utterance contiguous)
+            late_ms: packets that waited longer than this before being sent are counted as late
+            on_sent: optional callable receiving each sent packet's queue + send time in ms
+        """
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy: {drop_policy}")
+        self.send_fn = send_fn
+        self.packet_ms = packet_ms
+        self.packet_bytes = sample_rate * packet_ms // 1000
+        self.packet_duration = packet_ms / 1000.0
+        self.lead = lead_packets * self.packet_duration
+        self.max_packets = max(1, max_queue_ms // packet_ms)
+        self.drop_policy = drop_policy
+        self.late_after = late_ms / 1000.0
+        self.on_sent = on_sent
+
+        self._pending = bytearray()
+        self._queue = collections.deque()  # (packet, enqueued_at)
+        self._ready = asyncio.Event()
+        self._task = None
+
+        self.stats = {
+            "packets_queued": 0,
+            "packets_sent": 0,
+            "packets_dropped": 0,
+            "packets_cleared": 0,
+            "packets_late": 0,
+            "packets_failed": 0,
+            "flushes": 0,
+            "clears": 0,
+            "underruns": 0,
+            "max_queued_ms": 0,
+            "max_wait_ms": 0,
+        }
+
+    def start(self):
+        """Start the paced send loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._send_loop())
+        return self._task
+
+    async def stop(self, flush: bool = True):
+        """Stop the send loop, optionally draining what is already buffered"""
+        if flush:
+            self.flush()
+            while self._queue and self._task and not self._task.done():
+                await asyncio.sleep(self.packet_duration)
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def push(self, mulaw_data):
+        """Append μ-law bytes; every complete packet is moved to the send queue"""
+        self._pending += mulaw_data
+        while len(self._pending) >= self.packet_bytes:
+            self._enqueue(bytes(self._pending[:self.packet_bytes]))
+            del self._pending[:self.packet_bytes]
+
+    def flush(self):
+        """Pad the partial packet with μ-law silence and queue it (end of an utterance)"""
+        if self._pending:
+            self._pending += bytes([MULAW_SILENCE]) * (self.packet_bytes - len(self._pending))
+            self._enqueue(bytes(self._pending))
+            self._pending.clear()
+            self.stats["flushes"] += 1
+
+    def clear(self) -> int:
+        """Drop everything not yet sent (interruption); returns the number of packets dropped"""
+        dropped = len(self._queue) + (1 if self._pending else 0)
+        self._queue.clear()
+        self._pending.clear()
+        self._ready.clear()
+        self.stats["clears"] += 1
+        self.stats["packets_cleared"] += dropped
+        return dropped
+
+    @property
+    def queued_ms(self) -> int:
+        return len(self._queue) * self.packet_ms + len(self._pending) * self.packet_ms // self.packet_bytes
+
+    def _enqueue(self, packet: bytes):
+        if len(self._queue) >= self.max_packets:
+            self.stats["packets_dropped"] += 1
+            if self.drop_policy == DROP_NEWEST:
+                return
+            self._queue.popleft()
+        self._queue.append((packet, time.monotonic()))
+        self.stats["packets_queued"] += 1
+        queued_ms = len(self._queue) * self.packet_ms
+        if queued_ms > self.stats["max_queued_ms"]:
+            self.stats["max_queued_ms"] = queued_ms
+        self._ready.set()
+
+    async def _send_loop(self):
+        # Absolute deadline of the next packet: sends are scheduled on a fixed grid
+        # (next_due += packet_duration), never relative to when the last send finished
+        next_due = None
+        starved = False
+        while True:
+            if not self._queue:
+                self._ready.clear()
+                await self._ready.wait()
+                starved = True
+                # Re-check: clear() may have emptied the queue between set() and this wakeup
+                continue
+
+            now = time.monotonic()
+            if next_due is None or now > next_due + (0 if starved else self.lead):
+                # First packet, audio arrived after its slot (underrun), or the loop fell
+                # behind by more than the lead (slow socket): restart the grid from now
+                # instead of bursting to catch up
+                if next_due is not None:
+                    self.stats["underruns"] += 1
+                next_due = now
+            starved = False
+            delay = next_due - now
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+
+            packet, enqueued_at = self._queue.popleft()
+            next_due += self.packet_duration
+            try:
+                await self._send_packet(packet, enqueued_at)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["packets_failed"] += 1
+                logger.error(f"❌ Packetizer send error: {e}")
+
+    async def _send_packet(self, packet: bytes, enqueued_at: float):
+        wait = time.monotonic() - enqueued_at
+        if wait > self.late_after:
+            self.stats["packets_late"] += 1
+        wait_ms = int(wait * 1000)
+        if wait_ms > self.stats["max_wait_ms"]:
+            self.stats["max_wait_ms"] = wait_ms
+        if await self.send_fn(packet):
+            self.stats["packets_sent"] += 1
+            if self.on_sent is not None:
+                self.on_sent((time.monotonic() - enqueued_at) * 1000)
+        else:
+            self.stats["packets_failed"] += 1
+
+    def get_stats(self):
+        """Packetizer statistics"""
+        return {
+            **self.stats,
+            "packet_ms": self.packet_ms,
+            "queued_ms": self.queued_ms,
+            "high_water_ms": self.max_packets * self.packet_ms,
+            "drop_policy": self.drop_policy,
+        }
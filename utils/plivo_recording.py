@@ -0,0 +1,208 @@
+"""
+Dual-channel call recording tap for the Plivo bridge.
+
+Both directions of μ-law audio are written into a per-call memory-mapped
+file (caller on the left channel, agent on the right), so a write is a
+couple of page-cache stores on the audio path and never a syscall or an
+allocation that grows with the call. Each channel is placed on the call's
+wall clock, so the agent's pauses stay silent and the two sides line up.
+
+At hangup the file is finalized as a WAV (16-bit PCM or μ-law) in a thread
+and uploaded to the S3 key /api/stream/{call_id} serves, replacing
+room-composite egress for bridged calls. The key uses the id the backend
+stored for the call (Plivo's RequestUUID for API calls), which is only
+known once the stream has started, so it is passed to finish().
+"""
+
+import asyncio
+import hashlib
+import logging
+import mmap
+import os
+import re
+import struct
+import tempfile
+import time
+
+import numpy as np
+
+from utils.plivo_codec import ulaw_to_pcm
+
+logger = logging.getLogger(__name__)
+
+# Recording is off unless enabled here or per call with ?record=1 on the stream URL
+RECORD_CALLS = os.environ.get("PLIVO_RECORD_CALLS", "0") == "1"
+RECORDING_DIR = os.environ.get("PLIVO_RECORDING_DIR", tempfile.gettempdir())
+RECORDING_MAX_SECONDS = int(os.environ.get("PLIVO_RECORDING_MAX_SECONDS", 3600))
+RECORDING_FORMAT = os.environ.get("PLIVO_RECORDING_FORMAT", "pcm16")  # or "ulaw" (half the size)
+RECORDING_FORMATS = ("pcm16", "ulaw")
+# Same key backend/api.py streams recordings from
+RECORDING_S3_KEY = os.environ.get("PLIVO_RECORDING_S3_KEY", "mp3/{call_id}.mp3")
+RECORDING_KEEP_LOCAL = os.environ.get("PLIVO_RECORDING_KEEP_LOCAL", "0") == "1"
+
+CALLER, AGENT = 0, 1
+# A channel that falls further behind the wall clock than this skips ahead (the gap stays silent)
+_MAX_DRIFT_SAMPLES = 1600
+_WAV_FORMAT_PCM = 1
+_WAV_FORMAT_MULAW = 7
+# Room names come from the stream URL: only these are used verbatim as file names
+_SAFE_NAME = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+# Uploads still running; awaited on shutdown so the last calls' recordings aren't lost
+_pending_uploads = set()
+
+
+def recording_enabled(params: dict) -> bool:
+    """Per-call switch from the stream URL query (?record=1/0), defaulting to PLIVO_RECORD_CALLS"""
+    value = params.get("record")
+    if value is None:
+        return RECORD_CALLS
+    return value.lower() in ("1", "true", "yes")
+
+
+def recording_file_stem(call_id: str) -> str:
+    """File name (without extension) for a call's recording, safe for any call_id"""
+    if _SAFE_NAME.fullmatch(call_id):
+        return call_id
+    readable = re.sub(r"[^A-Za-z0-9_-]+", "_", call_id)[:32].strip("_")
+    digest = hashlib.sha256(call_id.encode("utf-8", "surrogatepass")).hexdigest()[:16]
+    return f"{readable}-{digest}" if readable else digest
+
+
+def _wav_header(format_tag: int, bits: int, channels: int, sample_rate: int, data_len: int) -> bytes:
+    block_align = channels * bits // 8
+    fmt = struct.pack("<HHIIHHH", format_tag, channels, sample_rate, sample_rate * block_align,
+                      block_align, bits, 0)
+    chunks = b"fmt " + struct.pack("<I", len(fmt)) + fmt
+    if format_tag != _WAV_FORMAT_PCM:
+        # Non-PCM WAV carries a fact chunk with the sample-frame count
+        chunks += b"fact" + struct.pack("<II", 4, data_len // block_align)
+    return b"RIFF" + struct.pack("<I", 4 + len(chunks) + 8 + data_len) + b"WAVE" + chunks + \
+        b"data" + struct.pack("<I", data_len)
+
+
+class CallRecorder:
+    """Append-only stereo μ-law recording of one call in a memory-mapped file"""
+
+    def __init__(self, call_id: str, directory: str = RECORDING_DIR, max_seconds: int = RECORDING_MAX_SECONDS,
+                 sample_rate: int = 8000, audio_format: str = RECORDING_FORMAT):
+        if audio_format not in RECORDING_FORMATS:
+            raise ValueError(f"Unknown recording format: {audio_format}")
+        self.call_id = call_id
+        self.sample_rate = sample_rate
+        self.audio_format = audio_format
+        self.capacity = max_seconds * sample_rate
+        directory = os.path.realpath(directory)
+        stem = recording_file_stem(call_id)
+        self.raw_path = os.path.realpath(os.path.join(directory, f"{stem}.ulaw2"))
+        self.wav_path = os.path.realpath(os.path.join(directory, f"{stem}.wav"))
+        for path in (self.raw_path, self.wav_path):
+            if os.path.dirname(path) != directory:
+                raise ValueError(f"Recording path for {call_id!r} escapes {directory}")
+
+        # Sparse file: only pages that are written take memory or disk. Bytes are stored
+        # inverted (μ-law silence 0xFF -> 0x00) so unwritten gaps read back as silence.
+        self._file = open(self.raw_path, "w+b")
+        self._file.truncate(self.capacity * 2)
+        self._mmap = mmap.mmap(self._file.fileno(), self.capacity * 2)
+        self._frames = np.frombuffer(self._mmap, dtype=np.uint8).reshape(-1, 2)
+
+        self.started_at = time.monotonic()
+        self._cursors = [0, 0]
+        self.closed = False
+        self.stats = {"caller_ms": 0, "agent_ms": 0, "gaps": 0, "truncated_ms": 0}
+
+    def write(self, channel: int, mulaw_data):
+        """Tap a chunk of μ-law that has just been received (CALLER) or sent (AGENT)"""
+        if self.closed or not mulaw_data:
+            return
+        data = np.frombuffer(mulaw_data, dtype=np.uint8)
+        n = data.size
+        pos = self._cursors[channel]
+        clock = int((time.monotonic() - self.started_at) * self.sample_rate) - n
+        if clock - pos > _MAX_DRIFT_SAMPLES:
+            pos = clock
+            self.stats["gaps"] += 1
+        end = min(pos + n, self.capacity)
+        if end - pos < n:
+            self.stats["truncated_ms"] += (n - max(end - pos, 0)) * 1000 // self.sample_rate
+        if end > pos:
+            np.bitwise_xor(data[:end - pos], 0xFF, out=self._frames[pos:end, channel])
+            self.stats["caller_ms" if channel == CALLER else "agent_ms"] += (end - pos) * 1000 // self.sample_rate
+            self._cursors[channel] = end
+
+    def _finalize(self) -> str:
+        """Write the recorded span as a WAV file and release the mapping (blocking; runs in a thread)"""
+        length = max(self._cursors)
+        mulaw = np.bitwise_xor(self._frames[:length].reshape(-1), 0xFF)
+        if self.audio_format == "pcm16":
+            payload = ulaw_to_pcm(mulaw).astype("<i2", copy=False).tobytes()
+            header = _wav_header(_WAV_FORMAT_PCM, 16, 2, self.sample_rate, len(payload))
+        else:
+            payload = mulaw.tobytes()
+            header = _wav_header(_WAV_FORMAT_MULAW, 8, 2, self.sample_rate, len(payload))
+        with open(self.wav_path, "wb") as f:
+            f.write(header)
+            f.write(payload)
+        self._release()
+        return self.wav_path
+
+    def _release(self):
+        del self._frames
+        self._mmap.close()
+        self._file.close()
+        try:
+            os.unlink(self.raw_path)
+        except OSError:
+            pass
+
+    async def finalize_and_upload(self, bucket: str = None, call_id: str = None):
+        """
+        Finalize the WAV off the event loop and upload it under call_id (default: the
+        recorder's own id); returns the S3 URL (None if not uploaded)
+        """
+        call_id = call_id or self.call_id
+        if self.closed:
+            return None
+        self.closed = True
+        try:
+            wav_path = await asyncio.to_thread(self._finalize)
+        except Exception as e:
+            logger.error(f"❌ Error finalizing recording for {self.call_id}: {e}")
+            return None
+
+        bucket = bucket or os.getenv("AWS_BUCKET")
+        if not bucket:
+            logger.warning(f"⚠️ AWS_BUCKET not set, recording kept at {wav_path}")
+            return None
+        url = None
+        try:
+            from database.connectors.s3 import S3Connector
+            url = await S3Connector(bucket).upload_file_async(wav_path, RECORDING_S3_KEY.format(call_id=call_id))
+            if url:
+                logger.info(f"🎙️ Recording uploaded for {call_id}: {url} ({self.stats})")
+        except Exception as e:
+            logger.error(f"❌ Error uploading recording for {call_id}: {e}")
+        if url and not RECORDING_KEEP_LOCAL:
+            try:
+                os.unlink(wav_path)
+            except OSError:
+                pass
+        return url
+
+    def finish(self, call_id: str = None):
+        """Finalize and upload under call_id in the background (tracked so shutdown can wait for it)"""
+        task = asyncio.create_task(self.finalize_and_upload(call_id=call_id))
+        _pending_uploads.add(task)
+        task.add_done_callback(_pending_uploads.discard)
+        return task
+
+    def get_stats(self):
+        return {**self.stats, "format": self.audio_format, "duration_ms": max(self._cursors) * 1000 // self.sample_rate}
+
+
+async def wait_for_uploads(timeout: float = 30.0):
+    """Wait for in-flight recording uploads (called on bridge shutdown)"""
+    if _pending_uploads:
+        logger.info(f"🎙️ Waiting for {len(_pending_uploads)} recording uploads...")
+        await asyncio.wait(list(_pending_uploads), timeout=timeout)
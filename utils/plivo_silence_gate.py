@@ -0,0 +1,93 @@
+"""
+Silence suppression for the inbound (caller -> LiveKit) telephony track.
+
+Callers are silent for most of a call, yet every 20ms Plivo frame is
+resampled and pushed upstream. SilenceGate classifies each decoded frame by
+energy against an adaptive noise floor and keeps the gate open for a
+hangover period after speech, so word endings and short pauses pass
+through untouched. Frames behind a closed gate are:
+
+- "comfort": replaced by cached digital-silence frames at the published
+  rate (no resampling; Opus DTX then sends almost nothing), batched to
+  comfort_ms because each capture costs more than resampling a frame. The
+  track timeline keeps moving, so the agent's VAD still sees end of speech.
+- "pause": not captured at all. Cheapest, but only suitable for agents
+  that don't rely on receiving silence to end a turn.
+
+Speech is detected on the frame it starts in, so onsets are never delayed.
+"""
+
+import os
+
+import numpy as np
+
+SILENCE_GATE_MODES = ("off", "comfort", "pause")
+SILENCE_GATE_MODE = os.environ.get("PLIVO_SILENCE_GATE", "off")
+# Frames quieter than this RMS (int16) are never speech, whatever the noise floor
+SILENCE_GATE_MIN_RMS = float(os.environ.get("PLIVO_SILENCE_GATE_RMS", 150))
+# Speech must also be this many times louder than the tracked line-noise floor
+SILENCE_GATE_FLOOR_RATIO = float(os.environ.get("PLIVO_SILENCE_GATE_FLOOR_RATIO", 3.0))
+SILENCE_GATE_HANGOVER_MS = int(os.environ.get("PLIVO_SILENCE_GATE_HANGOVER_MS", 400))
+# Suppressed audio sent as one comfort frame per this many ms (delays end-of-turn by at most this)
+SILENCE_GATE_COMFORT_MS = int(os.environ.get("PLIVO_SILENCE_GATE_COMFORT_MS", 100))
+
+
+def frame_rms(pcm: np.ndarray) -> float:
+    """RMS of an int16 frame"""
+    if not pcm.size:
+        return 0.0
+    samples = pcm.astype(np.float32)
+    return float(np.sqrt(np.dot(samples, samples) / pcm.size))
+
+
+class SilenceGate:
+    """Energy gate with an adaptive noise floor and hangover"""
+
+    def __init__(self, mode: str = SILENCE_GATE_MODE, min_rms: float = SILENCE_GATE_MIN_RMS,
+                 floor_ratio: float = SILENCE_GATE_FLOOR_RATIO, hangover_ms: int = SILENCE_GATE_HANGOVER_MS,
+                 comfort_ms: int = SILENCE_GATE_COMFORT_MS, sample_rate: int = 8000):
+        if mode not in SILENCE_GATE_MODES:
+            raise ValueError(f"Unknown silence gate mode: {mode}")
+        self.mode = mode
+        self.min_rms = min_rms
+        self.floor_ratio = floor_ratio
+        self.hangover_samples = sample_rate * hangover_ms // 1000
+        self.comfort_samples = max(1, sample_rate * comfort_ms // 1000)
+        self.sample_rate = sample_rate
+        self.noise_floor = min_rms / floor_ratio
+        self.is_open = False
+        self.is_speech = False  # last frame was above the speech threshold (not just hangover)
+        self._hangover_left = 0
+        self.stats = {"frames": 0, "frames_suppressed": 0, "speech_onsets": 0}
+
+    def process(self, pcm: np.ndarray) -> bool:
+        """Feed one decoded frame; True if it should be passed through"""
+        self.stats["frames"] += 1
+        rms = frame_rms(pcm)
+        self.is_speech = rms >= max(self.min_rms, self.noise_floor * self.floor_ratio)
+        if self.is_speech:
+            if not self.is_open:
+                self.stats["speech_onsets"] += 1
+            self.is_open = True
+            self._hangover_left = self.hangover_samples
+            return True
+
+        # Track the line noise while nobody speaks (falls fast, rises slowly)
+        weight = 0.2 if rms < self.noise_floor else 0.02
+        self.noise_floor += weight * (rms - self.noise_floor)
+
+        if self._hangover_left > 0:
+            self._hangover_left -= pcm.size
+            return True
+        self.is_open = False
+        self.stats["frames_suppressed"] += 1
+        return False
+
+    def get_stats(self):
+        frames = self.stats["frames"]
+        return {
+            **self.stats,
+            "mode": self.mode,
+            "suppression_ratio": round(self.stats["frames_suppressed"] / frames, 3) if frames else 0.0,
+            "noise_floor_rms": round(self.noise_floor, 1),
+        }
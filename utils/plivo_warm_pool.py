@@ -0,0 +1,187 @@
+"""
+Warm room pool for inbound Plivo calls.
+
+Keeps rooms ready per agent name, each with the agent already dispatched
+(metadata "warm_pool": true makes the agent build its session and open its
+STT/TTS/LLM connections before anyone joins). /plivo-app/plivo.xml claims a
+ready room for an inbound call and the pool refills in the background. The
+target size follows the recent call arrival rate between a min and max.
+"""
+
+import asyncio
+import collections
+import json
+import logging
+import math
+import time
+import uuid
+
+from livekit import api
+
+logger = logging.getLogger(__name__)
+
+
+class WarmRoom:
+    """A pre-created room with an agent dispatched into it"""
+
+    def __init__(self, room_name: str, agent_name: str, dispatch_id: str = None):
+        self.room_name = room_name
+        self.agent_name = agent_name
+        self.dispatch_id = dispatch_id
+        self.created_at = time.monotonic()
+
+
+class WarmRoomPool:
+    """Per-agent pools of warm rooms sized from the recent arrival rate"""
+
+    def __init__(self, livekit_pool, agent_names, min_size: int = 1, max_size: int = 10,
+                 setup_seconds: float = 5.0, rate_window: float = 300.0, max_room_age: float = 600.0,
+                 refill_interval: float = 1.0):
+        """
+        Args:
+            livekit_pool: LiveKitClientPool used to create rooms and dispatch agents
+            agent_names: agent names to keep warm rooms for
+            min_size / max_size: bounds for the per-agent pool size
+            setup_seconds: time a new warm room needs before its agent is ready
+            rate_window: seconds of claim history used to estimate the arrival rate
+            max_room_age: warm rooms older than this are recycled so agent connections stay fresh
+            refill_interval: seconds between refill passes
+        """
+        self.livekit_pool = livekit_pool
+        self.agent_names = list(agent_names)
+        self.min_size = min_size
+        self.max_size = max_size
+        self.setup_seconds = setup_seconds
+        self.rate_window = rate_window
+        self.max_room_age = max_room_age
+        self.refill_interval = refill_interval
+
+        self._ready = {name: collections.deque() for name in self.agent_names}
+        self._pending = {name: 0 for name in self.agent_names}
+        self._claims = {name: collections.deque() for name in self.agent_names}
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self.stats = {"claims": 0, "misses": 0, "rooms_warmed": 0, "rooms_recycled": 0, "warm_failures": 0}
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refill_loop())
+        return self._task
+
+    def claim(self, agent_name: str):
+        """Take a ready room for a new call; returns the room name or None when the pool is empty"""
+        if agent_name not in self._ready:
+            return None
+        self._claims[agent_name].append(time.monotonic())
+        ready = self._ready[agent_name]
+        while ready:
+            room = ready.popleft()
+            if time.monotonic() - room.created_at < self.max_room_age:
+                self.stats["claims"] += 1
+                self._wakeup.set()
+                logger.info(f"♨️ Claimed warm room {room.room_name} for {agent_name} ({len(ready)} left)")
+                return room.room_name
+            asyncio.create_task(self._recycle(room))
+        self.stats["misses"] += 1
+        self._wakeup.set()
+        return None
+
+    def arrival_rate(self, agent_name: str) -> float:
+        """Claims per second over the rate window"""
+        claims = self._claims[agent_name]
+        horizon = time.monotonic() - self.rate_window
+        while claims and claims[0] < horizon:
+            claims.popleft()
+        return len(claims) / self.rate_window
+
+    def target_size(self, agent_name: str) -> int:
+        """Enough rooms to cover arrivals during one room setup time, with 2x headroom"""
+        expected = self.arrival_rate(agent_name) * self.setup_seconds * 2
+        return max(self.min_size, min(self.max_size, math.ceil(expected)))
+
+    async def _refill_loop(self):
+        try:
+            while True:
+                for agent_name in self.agent_names:
+                    self._recycle_stale(agent_name)
+                    missing = (self.target_size(agent_name) - len(self._ready[agent_name])
+                               - self._pending[agent_name])
+                    for _ in range(max(0, missing)):
+                        self._pending[agent_name] += 1
+                        asyncio.create_task(self._warm_room(agent_name))
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.refill_interval)
+                except asyncio.TimeoutError:
+                    pass
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Warm pool refill loop error: {e}")
+
+    async def _warm_room(self, agent_name: str):
+        room_name = f"warm-{agent_name.lower().replace(' ', '-')}-{uuid.uuid4().hex[:12]}"
+        try:
+            if not await self.livekit_pool.ensure_room(room_name, empty_timeout=int(self.max_room_age + 60)):
+                raise RuntimeError("room creation failed")
+            dispatch = await self.livekit_pool.client.agent_dispatch.create_dispatch(
+                api.CreateAgentDispatchRequest(
+                    agent_name=agent_name,
+                    room=room_name,
+                    metadata=json.dumps({"call_type": "inbound", "warm_pool": True}),
+                )
+            )
+            self._ready[agent_name].append(WarmRoom(room_name, agent_name, dispatch.id))
+            self.stats["rooms_warmed"] += 1
+            logger.info(f"♨️ Warm room ready: {room_name} ({len(self._ready[agent_name])} ready for {agent_name})")
+        except Exception as e:
+            self.stats["warm_failures"] += 1
+            logger.error(f"❌ Failed to warm room for {agent_name}: {e}")
+            await self._delete_room(room_name)
+            # Back off so a LiveKit outage doesn't turn into a create/delete storm
+            await asyncio.sleep(self.setup_seconds)
+        finally:
+            self._pending[agent_name] -= 1
+
+    def _recycle_stale(self, agent_name: str):
+        ready = self._ready[agent_name]
+        while ready and time.monotonic() - ready[0].created_at >= self.max_room_age:
+            asyncio.create_task(self._recycle(ready.popleft()))
+
+    async def _recycle(self, room: WarmRoom):
+        self.stats["rooms_recycled"] += 1
+        await self._delete_room(room.room_name)
+
+    async def _delete_room(self, room_name: str):
+        self.livekit_pool.forget_room(room_name)
+        try:
+            await self.livekit_pool.client.room.delete_room(api.DeleteRoomRequest(room=room_name))
+        except Exception as e:
+            logger.debug(f"Warm room delete failed for {room_name}: {e}")
+
+    def get_stats(self):
+        return {
+            **self.stats,
+            "agents": {
+                name: {
+                    "ready": len(self._ready[name]),
+                    "pending": self._pending[name],
+                    "target": self.target_size(name),
+                    "arrivals_per_min": round(self.arrival_rate(name) * 60, 2),
+                }
+                for name in self.agent_names
+            },
+        }
+
+    async def aclose(self):
+        """Stop refilling and delete rooms nobody claimed"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        rooms = [room for ready in self._ready.values() for room in ready]
+        for ready in self._ready.values():
+            ready.clear()
+        await asyncio.gather(*(self._delete_room(room.room_name) for room in rooms), return_exceptions=True)
@@ -0,0 +1,314 @@
+"""
+Multi-process sharding for the Plivo bridge.
+
+A supervisor spawns N worker processes that each run their own asyncio loop
+and bind the public WebSocket/HTTP ports with SO_REUSEPORT, so the kernel
+spreads calls across cores. Every worker keeps a HandlerRegistry of its live
+calls and serves it on a localhost control port, which the supervisor and
+the /health endpoint of any worker query to build a combined view.
+
+With several bridge nodes, control servers listen on PLIVO_CONTROL_HOST and
+each worker is addressed as http://PLIVO_NODE_ADDRESS:<control port>; the
+call directory (utils/plivo_call_directory.py) maps calls to that address.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import time
+
+import aiohttp
+from aiohttp import web
+
+from utils.plivo_latency import process_latency, merge_exports
+
+logger = logging.getLogger(__name__)
+
+BRIDGE_WORKERS = int(os.environ.get("PLIVO_BRIDGE_WORKERS", 1))
+WORKER_CONTROL_BASE_PORT = int(os.environ.get("PLIVO_WORKER_CONTROL_PORT", 9100))
+# Bind 0.0.0.0 (with PLIVO_CONTROL_TOKEN set) when other nodes must reach this one
+CONTROL_HOST = os.environ.get("PLIVO_CONTROL_HOST", "127.0.0.1")
+NODE_ADDRESS = os.environ.get("PLIVO_NODE_ADDRESS", "127.0.0.1")  # how other nodes reach this node
+CONTROL_TOKEN = os.environ.get("PLIVO_CONTROL_TOKEN", "")
+STATS_TIMEOUT = 0.5
+
+
+class HandlerRegistry:
+    """Live TelephonyWebSocketHandlers of one worker process, keyed by room name (and Plivo call/stream IDs)"""
+
+    def __init__(self, worker_id: int = 0):
+        self.worker_id = worker_id
+        self.started_at = time.time()
+        self._handlers = {}
+        self._call_index = {}  # Plivo CallUUID / StreamId -> handler
+        self.total_calls = 0
+        # name -> callable returning extra JSON-serializable worker state (e.g. admission load)
+        self.stats_providers = {}
+
+    def add(self, handler):
+        self._handlers[handler.room_name] = handler
+        self.total_calls += 1
+
+    def remove(self, handler):
+        if self._handlers.get(handler.room_name) is handler:
+            del self._handlers[handler.room_name]
+        for key in [k for k, h in self._call_index.items() if h is handler]:
+            del self._call_index[key]
+
+    def get(self, room_name: str):
+        return self._handlers.get(room_name)
+
+    def index(self, handler, *keys):
+        """Make a handler findable by Plivo identifiers (CallUUID, StreamId)"""
+        for key in keys:
+            if key:
+                self._call_index[key] = handler
+
+    def find(self, *keys):
+        """Handler for the first known CallUUID / StreamId / room name, or None"""
+        for key in keys:
+            if key:
+                handler = self._call_index.get(key) or self._handlers.get(key)
+                if handler is not None:
+                    return handler
+        return None
+
+    def handlers(self):
+        return list(self._handlers.values())
+
+    def __len__(self):
+        return len(self._handlers)
+
+    def __contains__(self, handler):
+        return self._handlers.get(handler.room_name) is handler
+
+    def snapshot(self):
+        """JSON-serializable stats for this worker"""
+        calls = []
+        totals = {}
+        for handler in self._handlers.values():
+            call_stats = handler.get_stats()
+            calls.append(call_stats)
+            for key, value in call_stats.get("stats", {}).items():
+                if isinstance(value, (int, float)):
+                    totals[key] = totals.get(key, 0) + value
+        return {
+            "worker_id": self.worker_id,
+            "pid": os.getpid(),
+            "status": "healthy",
+            "uptime": time.time() - self.started_at,
+            "active_calls": len(self._handlers),
+            "total_calls": self.total_calls,
+            "totals": totals,
+            "latency": process_latency.export(),
+            **{name: provider() for name, provider in self.stats_providers.items()},
+            "calls": calls,
+        }
+
+
+registry = HandlerRegistry()
+
+
+def control_port(worker_id: int) -> int:
+    return WORKER_CONTROL_BASE_PORT + worker_id
+
+
+def worker_address(worker_id: int = None) -> str:
+    """Control URL other nodes use to reach a worker of this node (this worker by default)"""
+    worker_id = registry.worker_id if worker_id is None else worker_id
+    return f"http://{NODE_ADDRESS}:{control_port(worker_id)}"
+
+
+def _local_control_url(worker_id: int) -> str:
+    host = "127.0.0.1" if CONTROL_HOST in ("", "0.0.0.0", "::") else CONTROL_HOST
+    return f"http://{host}:{control_port(worker_id)}"
+
+
+def _control_headers():
+    return {"X-Bridge-Token": CONTROL_TOKEN} if CONTROL_TOKEN else {}
+
+
+def control_token_ok(request) -> bool:
+    """Whether a control request carries PLIVO_CONTROL_TOKEN (always true when no token is set)"""
+    return not CONTROL_TOKEN or request.headers.get("X-Bridge-Token") == CONTROL_TOKEN
+
+
+async def start_control_server(worker_registry: HandlerRegistry, teardown_fnc=None, release_fnc=None):
+    """
+    Serve this worker's registry on its localhost control port.
+    teardown_fnc(keys) -> bool tears down a local call found by CallUUID/StreamId/room (forwarded hangups).
+    release_fnc(key) -> bool gives back an admission slot this worker reserved (stream taken elsewhere).
+    """
+
+    async def handle_worker_stats(request):
+        return web.json_response(worker_registry.snapshot())
+
+    async def handle_worker_teardown(request):
+        keys = [request.query.get(k) for k in ("call_uuid", "stream_id", "room")]
+        found = bool(teardown_fnc) and await teardown_fnc(keys, request.query.get("reason", "forwarded"))
+        return web.json_response({"worker_id": worker_registry.worker_id, "found": found})
+
+    async def handle_worker_release(request):
+        found = bool(release_fnc) and bool(release_fnc(request.query.get("key")))
+        return web.json_response({"worker_id": worker_registry.worker_id, "found": found})
+
+    @web.middleware
+    async def check_token(request, handler):
+        if not control_token_ok(request):
+            return web.json_response({"error": "forbidden"}, status=403)
+        return await handler(request)
+
+    app = web.Application(middlewares=[check_token])
+    app.router.add_get("/worker/stats", handle_worker_stats)
+    app.router.add_post("/worker/teardown", handle_worker_teardown)
+    app.router.add_post("/worker/release", handle_worker_release)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, CONTROL_HOST, control_port(worker_registry.worker_id))
+    await site.start()
+    logger.info(f"🛠️ Worker {worker_registry.worker_id} control server on {CONTROL_HOST}:{control_port(worker_registry.worker_id)}")
+    return runner
+
+
+async def query_workers(num_workers: int = None, path: str = "/worker/stats"):
+    """Fetch a control endpoint from every worker; unreachable workers are reported, not raised"""
+    num_workers = BRIDGE_WORKERS if num_workers is None else num_workers
+    timeout = aiohttp.ClientTimeout(total=STATS_TIMEOUT)
+
+    async with aiohttp.ClientSession(timeout=timeout, headers=_control_headers()) as session:
+        async def fetch(worker_id):
+            try:
+                async with session.get(f"{_local_control_url(worker_id)}{path}") as resp:
+                    return await resp.json()
+            except Exception as e:
+                return {"worker_id": worker_id, "status": "unreachable", "error": str(e)}
+
+        return await asyncio.gather(*(fetch(i) for i in range(num_workers)))
+
+
+async def _forward(path: str, params: dict, owner: str = None) -> bool:
+    """POST a control request to owner, or to every other worker of this node; True if one found the call"""
+    timeout = aiohttp.ClientTimeout(total=STATS_TIMEOUT)
+    async with aiohttp.ClientSession(timeout=timeout, headers=_control_headers()) as session:
+        async def post(base_url):
+            try:
+                async with session.post(f"{base_url}{path}", params=params) as resp:
+                    return (await resp.json()).get("found", False)
+            except Exception as e:
+                if owner:
+                    logger.error(f"❌ Forward of {path} to {owner} failed: {e}")
+                return False
+
+        if owner:
+            return await post(owner)
+        others = [_local_control_url(i) for i in range(BRIDGE_WORKERS) if i != registry.worker_id]
+        return any(await asyncio.gather(*(post(url) for url in others)))
+
+
+async def forward_teardown(call_uuid: str = None, stream_id: str = None, room: str = None,
+                           reason: str = "forwarded", owner: str = None) -> bool:
+    """
+    Ask another worker to tear down a call this worker doesn't own; True if one did.
+    owner is the worker's control URL from the call directory; without it every
+    other worker of this node is asked.
+    """
+    params = {k: v for k, v in (("call_uuid", call_uuid), ("stream_id", stream_id), ("room", room),
+                                ("reason", reason)) if v}
+    return await _forward("/worker/teardown", params, owner)
+
+
+async def forward_release(key: str, owner: str = None) -> bool:
+    """Ask the worker that answered a call (owner, else every other local worker) to give back its slot"""
+    return await _forward("/worker/release", {"key": key}, owner)
+
+
+async def collect_worker_stats():
+    """Combined stats for /health: local registry in single-process mode, all workers otherwise"""
+    if BRIDGE_WORKERS <= 1:
+        workers = [registry.snapshot()]
+    else:
+        workers = await query_workers()
+
+    totals = {}
+    for worker in workers:
+        for key, value in worker.get("totals", {}).items():
+            totals[key] = totals.get(key, 0) + value
+    loads = [w["load"] for w in workers if isinstance(w.get("load"), dict)]
+    return {
+        "workers": len(workers),
+        "load": max((l["load"] for l in loads), default=None),
+        "accepting": any(l["accepting"] for l in loads) if loads else None,
+        "healthy_workers": sum(1 for w in workers if w.get("status") == "healthy"),
+        "active_calls": sum(w.get("active_calls", 0) for w in workers),
+        "total_calls": sum(w.get("total_calls", 0) for w in workers),
+        "totals": totals,
+        "latency": merge_exports(w.get("latency") for w in workers),
+        "per_worker": [{k: v for k, v in w.items() if k not in ("calls", "latency", "setup")} for w in workers],
+    }
+
+
+def _worker_main(worker_id: int, serve_fnc):
+    """Entry point of a spawned worker process"""
+    registry.worker_id = worker_id
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # supervisor handles Ctrl+C
+    try:
+        asyncio.run(serve_fnc(worker_id))
+    except KeyboardInterrupt:
+        pass
+
+
+async def run_supervisor(serve_fnc, num_workers: int = None, stats_interval: float = 60.0):
+    """
+    Spawn `num_workers` processes running `serve_fnc(worker_id)` and keep them alive.
+
+    serve_fnc must be a module-level coroutine function that binds its public
+    sockets with reuse_port=True and starts the control server.
+    """
+    num_workers = BRIDGE_WORKERS if num_workers is None else num_workers
+    # spawn, not fork: LiveKit's FFI runtime threads must not be inherited
+    ctx = multiprocessing.get_context("spawn")
+    processes = {}
+
+    def start_worker(worker_id):
+        process = ctx.Process(target=_worker_main, args=(worker_id, serve_fnc),
+                              name=f"plivo-bridge-worker-{worker_id}", daemon=False)
+        process.start()
+        processes[worker_id] = process
+        logger.info(f"👷 Started bridge worker {worker_id} (PID: {process.pid})")
+
+    for worker_id in range(num_workers):
+        start_worker(worker_id)
+
+    stop = asyncio.Event()
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+    except (NotImplementedError, RuntimeError):
+        pass
+
+    last_stats = time.monotonic()
+    try:
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=1.0)
+                break
+            except asyncio.TimeoutError:
+                pass
+            for worker_id, process in list(processes.items()):
+                if not process.is_alive():
+                    logger.error(f"❌ Bridge worker {worker_id} exited (code {process.exitcode}), restarting")
+                    start_worker(worker_id)
+
+            if time.monotonic() - last_stats >= stats_interval:
+                last_stats = time.monotonic()
+                workers = await query_workers(num_workers)
+                active = [w.get("active_calls", 0) for w in workers]
+                logger.info(f"📊 Bridge workers: {sum(active)} active calls, per worker: {active}")
+    finally:
+        logger.info("🧹 Stopping bridge workers...")
+        for process in processes.values():
+            if process.is_alive():
+                process.terminate()
+        for process in processes.values():
+            process.join(timeout=5)
@@ -5,15 +5,39 @@ import logging
 import uuid
 import os
 import requests
-from urllib.parse import urlparse, parse_qs
+from urllib.parse import urlparse, parse_qs, urlencode
+from xml.sax.saxutils import escape as xml_escape
 from aiohttp import web
 import base64
 from livekit import rtc, api
-import subprocess
 import time
 import struct
-import audioop
+import inspect
+import signal
+import collections
 import numpy as np
+import sys
+if not __package__:
+    # Started as a script (python utils/plivo_ws.py): make the repo root importable for utils.*
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.plivo_codec import MulawCodec, ulaw_to_pcm
+from utils.plivo_packetizer import PlayAudioPacketizer, DROP_POLICIES
+from utils.plivo_messages import PlivoMessageTemplates, parse_media_payload
+from utils.plivo_comfort_noise import ComfortNoiseMixer
+from utils.plivo_barge_in import (AgentSilenceDetector, INTERRUPT_TOPIC, BARGE_IN_MODES,
+                                  BARGE_IN_GUARD_MS)
+from utils.plivo_latency import LatencyProbes, ResponseLatencyTracker, frame_peak, process_latency, SPEECH_PEAK
+from utils.livekit_pool import LiveKitClientPool
+from utils.livekit_dispatch import AgentDispatchClient
+from utils.plivo_warm_pool import WarmRoomPool
+from utils.plivo_silence_gate import SilenceGate, SILENCE_GATE_MODE, SILENCE_GATE_MODES
+from utils.plivo_recording import CallRecorder, recording_enabled, wait_for_uploads, CALLER, AGENT
+from utils.plivo_admission import AdmissionController, CLOSE_CODE_OVERLOADED, RESERVATION_TTL
+from utils.plivo_workers import (registry, BRIDGE_WORKERS, start_control_server, query_workers,
+                                 collect_worker_stats, run_supervisor, forward_teardown, forward_release,
+                                 worker_address, control_token_ok)
+from utils.call_setup_timeline import CallSetupTimeline, SetupTimelineStore, summarize_exports
+from utils.plivo_call_directory import create_call_directory
 
 # Environment variables
 LIVEKIT_URL = os.environ.get("LIVEKIT_URL", "wss://setupforretell-hk7yl5xf.livekit.cloud")
@@ -21,9 +45,41 @@ LIVEKIT_API_KEY = os.environ.get("LIVEKIT_API_KEY", "APIoLr2sRCRJWY5")
 LIVEKIT_API_SECRET = os.environ.get("LIVEKIT_API_SECRET", "yE3wUkoQxjWjhteMAed9ubm5mYg3iOfPT6qBQfffzgJC")
 PARTICIPANT_NAME = "Telephony Caller"
 TELEPHONY_SAMPLE_RATE = 8000
-LIVEKIT_SAMPLE_RATE = 48000
+# Rate published to / subscribed from LiveKit: 16000 (wideband STT input), 8000 (native, no
+# resampling) or 48000 (legacy). Resampler quality is set per direction.
+LIVEKIT_SAMPLE_RATE = int(os.environ.get("PLIVO_BRIDGE_SAMPLE_RATE", 16000))
+INBOUND_RESAMPLE_QUALITY = os.environ.get("PLIVO_INBOUND_RESAMPLE_QUALITY", "HIGH")
+OUTBOUND_RESAMPLE_QUALITY = os.environ.get("PLIVO_OUTBOUND_RESAMPLE_QUALITY", "HIGH")
 CALLBACK_WS_URL = os.environ.get("CALLBACK_WS_URL", "ws://0.0.0.0:8765")
+PLIVO_PACKET_MS = int(os.environ.get("PLIVO_PACKET_MS", 20))  # 20/40/100ms playAudio packets
+PLIVO_MAX_QUEUED_MS = int(os.environ.get("PLIVO_MAX_QUEUED_MS", 1000))  # outbound queue high-water mark
+PLIVO_QUEUE_DROP_POLICY = os.environ.get("PLIVO_QUEUE_DROP_POLICY", "drop-oldest")  # or drop-newest
+PLIVO_LATE_PACKET_MS = int(os.environ.get("PLIVO_LATE_PACKET_MS", 200))  # queue wait counted as late
+# Caller audio held while LiveKit connects; on publish, leading silence is trimmed to a short pre-roll
+PRECONNECT_BUFFER_MS = int(os.environ.get("PLIVO_PRECONNECT_BUFFER_MS", 5000))
+PRECONNECT_PREROLL_MS = int(os.environ.get("PLIVO_PRECONNECT_PREROLL_MS", 200))
+# After a flush, silent caller frames are skipped until the AudioSource backlog drains below this
+PRECONNECT_CATCH_UP_MS = int(os.environ.get("PLIVO_PRECONNECT_CATCH_UP_MS", 60))
 agent_name = "Earkart" #outbound-caller / Mysyara Agent
+# Warm room pool for inbound calls (disabled while PLIVO_WARM_POOL_MAX is 0)
+WARM_POOL_MIN = int(os.environ.get("PLIVO_WARM_POOL_MIN", 1))
+WARM_POOL_MAX = int(os.environ.get("PLIVO_WARM_POOL_MAX", 0))
+WARM_POOL_AGENTS = [a.strip() for a in os.environ.get("PLIVO_WARM_POOL_AGENTS", agent_name).split(",") if a.strip()]
+
+# One keep-alive LiveKit API client per process, shared by all calls
+livekit_pool = LiveKitClientPool(LIVEKIT_URL, LIVEKIT_API_KEY, LIVEKIT_API_SECRET)
+agent_dispatcher = AgentDispatchClient(livekit_pool)
+# Per-worker capacity limits for new calls
+admission = AdmissionController(registry)
+registry.stats_providers["load"] = admission.load
+# Call -> owning worker, so control callbacks reaching another node are forwarded
+call_directory = create_call_directory()
+registry.stats_providers["call_directory"] = call_directory.get_stats
+# Setup waterfalls of this worker's calls (plus SIP timelines reported by agents)
+setup_timelines = SetupTimelineStore()
+registry.stats_providers["setup"] = setup_timelines.export
+warm_pool = (WarmRoomPool(livekit_pool, WARM_POOL_AGENTS, min_size=WARM_POOL_MIN, max_size=WARM_POOL_MAX)
+             if WARM_POOL_MAX > 0 else None)
 
 # Configure detailed logging
 logging.basicConfig(
@@ -32,26 +88,44 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def create_resampler(input_rate, output_rate, quality):
+    """Create a mono resampler, or None when the rates already match"""
+    if input_rate == output_rate:
+        return None
+    return rtc.AudioResampler(
+        input_rate=input_rate,
+        output_rate=output_rate,
+        num_channels=1,
+        quality=getattr(rtc.AudioResamplerQuality, str(quality).upper(), rtc.AudioResamplerQuality.MEDIUM)
+    )
+
 class TelephonyAudioSource(rtc.AudioSource):
     """Audio source for processing telephony μ-law audio"""
     
-    def __init__(self):
+    def __init__(self, sample_rate=LIVEKIT_SAMPLE_RATE, quality=INBOUND_RESAMPLE_QUALITY, silence_gate=None):
         super().__init__(
-            sample_rate=LIVEKIT_SAMPLE_RATE,
+            sample_rate=sample_rate,
             num_channels=1
         )
         
-        self.resampler = rtc.AudioResampler(
-            input_rate=TELEPHONY_SAMPLE_RATE,
-            output_rate=LIVEKIT_SAMPLE_RATE,
-            num_channels=1,
-            quality=rtc.AudioResamplerQuality.HIGH
-        )
+        # sample_rate is a read-only property of rtc.AudioSource
+        self.resampler = create_resampler(TELEPHONY_SAMPLE_RATE, sample_rate, quality)
+        self.codec = MulawCodec()
         self.frame_count = 0
         self.total_bytes_processed = 0
         self.last_audio_time = time.time()
+        # Peak amplitude of the last decoded frame (caller speech detection for latency probes)
+        self.last_peak = 0
+        self.last_samples = None  # last decoded caller frame (barge-in detection)
+        # Optional SilenceGate (PLIVO_SILENCE_GATE); suppressed frames skip resampling
+        if silence_gate is None and SILENCE_GATE_MODE != "off":
+            silence_gate = SilenceGate()
+        self.silence_gate = silence_gate
+        self._comfort_frames = {}
+        self._comfort_pending = 0  # suppressed telephony samples not yet sent as comfort audio
         
-        logger.info(f"🎤 Audio Source initialized: {TELEPHONY_SAMPLE_RATE}Hz -> {LIVEKIT_SAMPLE_RATE}Hz")
+        logger.info(f"🎤 Audio Source initialized: {TELEPHONY_SAMPLE_RATE}Hz -> {sample_rate}Hz"
+                   f"{'' if self.resampler else ' (no resampling)'}")
 
     async def push_audio_data(self, mulaw_data):
         """Process μ-law audio data from telephony system"""
@@ -69,38 +143,44 @@ class TelephonyAudioSource(rtc.AudioSource):
                 logger.info(f"🎵 [INCOMING] Frame #{self.frame_count}: {len(mulaw_data)} bytes μ-law, "
                            f"Total: {self.total_bytes_processed} bytes")
 
-            # Convert μ-law to 16-bit PCM
+            input_samples = len(mulaw_data)
+
+            # Decode μ-law straight into the input frame buffer (no intermediate copies)
+            input_frame = rtc.AudioFrame.create(
+                sample_rate=TELEPHONY_SAMPLE_RATE,
+                num_channels=1,
+                samples_per_channel=input_samples
+            )
             try:
-                pcm_data = audioop.ulaw2lin(mulaw_data, 2)  # 2 bytes per sample (16-bit)
+                samples = self.codec.decode(mulaw_data, np.frombuffer(input_frame.data, dtype=np.int16))
             except Exception as e:
                 logger.error(f"❌ μ-law conversion error: {e}, data size: {len(mulaw_data)}")
                 return
-            
-            # Convert to samples array
-            import array
-            samples = array.array("h")  # signed short (16-bit)
-            samples.frombytes(pcm_data)
-
-            input_samples = len(samples)
-            if input_samples == 0:
-                logger.warning("⚠️ No samples after PCM conversion")
-                return
+            self.last_peak = frame_peak(samples)
+            self.last_samples = samples
+
+            # Caller silent: send cached silent frames (or nothing) instead of resampling.
+            # The resampler keeps its state; its buffered tail is only the hangover's silence.
+            if self.silence_gate:
+                if not self.silence_gate.process(samples):
+                    if self.silence_gate.mode == "comfort":
+                        self._comfort_pending += input_samples
+                        if self._comfort_pending >= self.silence_gate.comfort_samples:
+                            await self.capture_frame(self._comfort_frame(self._comfort_pending))
+                            self._comfort_pending = 0
+                    return
+                if self._comfort_pending:
+                    # Keep the timeline: silence still owed goes out ahead of the speech
+                    await self.capture_frame(self._comfort_frame(self._comfort_pending))
+                    self._comfort_pending = 0
 
             # Log sample info for first few frames only
             if self.frame_count <= 5:
                 logger.info(f"🔍 Frame {self.frame_count}: {input_samples} samples, "
-                           f"first few: {samples[:min(5, len(samples))]}")
-
-            # Create input frame for resampling
-            input_frame = rtc.AudioFrame.create(
-                sample_rate=TELEPHONY_SAMPLE_RATE,
-                num_channels=1,
-                samples_per_channel=input_samples
-            )
-            input_frame.data[:input_samples] = samples
+                           f"first few: {samples[:min(5, input_samples)].tolist()}")
 
-            # Resample to LiveKit's sample rate
-            resampled_frames = self.resampler.push(input_frame)
+            # Resample to the published sample rate (8kHz mode publishes the frame as-is)
+            resampled_frames = self.resampler.push(input_frame) if self.resampler else [input_frame]
 
             # Push each resampled frame to LiveKit
             for i, resampled_frame in enumerate(resampled_frames):
@@ -114,13 +194,26 @@ class TelephonyAudioSource(rtc.AudioSource):
             import traceback
             traceback.print_exc()
 
+    def _comfort_frame(self, input_samples):
+        """Digital-silence frame at the published rate for input_samples of telephony audio"""
+        frame = self._comfort_frames.get(input_samples)
+        if frame is None:
+            frame = rtc.AudioFrame.create(
+                sample_rate=self.sample_rate,
+                num_channels=1,
+                samples_per_channel=input_samples * self.sample_rate // TELEPHONY_SAMPLE_RATE
+            )
+            self._comfort_frames[input_samples] = frame
+        return frame
+
     def get_stats(self):
         """Get audio processing statistics"""
         return {
             "frames_processed": self.frame_count,
             "total_bytes": self.total_bytes_processed,
             "last_audio_ago": time.time() - self.last_audio_time,
-            "avg_bytes_per_frame": self.total_bytes_processed / max(1, self.frame_count)
+            "avg_bytes_per_frame": self.total_bytes_processed / max(1, self.frame_count),
+            "silence_gate": self.silence_gate.get_stats() if self.silence_gate else None,
         }
 
     async def cleanup(self):
@@ -129,7 +222,9 @@ class TelephonyAudioSource(rtc.AudioSource):
             stats = self.get_stats()
             logger.info(f"🧹 Audio source cleanup - Stats: {stats}")
             
-            if hasattr(self.resampler, 'aclose'):
+            if self.resampler is None:
+                pass
+            elif hasattr(self.resampler, 'aclose'):
                 await self.resampler.aclose()
             elif hasattr(self.resampler, 'close'):
                 self.resampler.close()
@@ -141,32 +236,72 @@ class TelephonyAudioSource(rtc.AudioSource):
 class TelephonyWebSocketHandler:
     """WebSocket handler for telephony system integration"""
     
-    def __init__(self, room_name, websocket):
+    def __init__(self, room_name, websocket, comfort_noise=None, recorder=None, setup_timeline=None,
+                 plivo_call_id=None):
         self.room_name = room_name
+        # Plivo's id for the call from the answer request (RequestUUID for API calls, else CallUUID)
+        self.plivo_call_id = plivo_call_id
         self.websocket = websocket
+        # Setup waterfall, started at answer time when /plivo.xml passed its timestamp
+        self.setup_timeline = setup_timeline or CallSetupTimeline("plivo", room_name)
+        self.setup_timeline.mark("ws_connected")
+        # Optional ComfortNoiseMixer for agent audio (bg_noise/noise_type/noise_volume)
+        self.comfort_noise = comfort_noise
+        # Optional CallRecorder tapping both directions (uploaded at hangup)
+        self.recorder = recorder
         self.room = None
         self.audio_source = None
         self.audio_track = None
         self.connected = False
         self.agent_participant = None
+        # Call in progress until Plivo's stop event or cleanup (the agent track can subscribe before start)
+        self.call_active = True
         self.connection_start_time = time.time()
         self.messages_received = 0
         self.messages_sent = 0
         self.audio_stream_task = None
         # WebSocket handler variable to store stream ID for Plivo
         self.stream_sid = None
+        self.call_uuid = None
+        self._cleanup_started = False
+        # Caller audio that arrives before the track is published: (μ-law bytes, peak)
+        self.preconnect_buffer = collections.deque()
+        self._preconnect_bytes = 0
+        self.track_published = False
+        self._catching_up = False
+        # Pre-rendered Plivo messages, rebuilt once the stream ID is known
+        self.templates = PlivoMessageTemplates(content_type="audio/x-mulaw", sample_rate=TELEPHONY_SAMPLE_RATE)
+        # New websockets API can send pre-encoded JSON bytes as a text frame
+        try:
+            self._send_bytes_as_text = "text" in inspect.signature(websocket.send).parameters
+        except (TypeError, ValueError):
+            self._send_bytes_as_text = False
         
         # Track participants and their audio tracks
         self.participants = {}
         self.audio_tracks = {}
         
-        # Audio conversion for return path
-        self.return_resampler = rtc.AudioResampler(
-            input_rate=LIVEKIT_SAMPLE_RATE,
-            output_rate=TELEPHONY_SAMPLE_RATE,
-            num_channels=1,
-            quality=rtc.AudioResamplerQuality.HIGH
+        # Audio conversion for return path (None when subscribing at 8kHz)
+        self.return_resampler = create_resampler(LIVEKIT_SAMPLE_RATE, TELEPHONY_SAMPLE_RATE,
+                                                 OUTBOUND_RESAMPLE_QUALITY)
+        self.return_codec = MulawCodec()
+        self.packetizer = PlayAudioPacketizer(
+            self.send_audio_to_telephony,
+            packet_ms=PLIVO_PACKET_MS,
+            max_queue_ms=PLIVO_MAX_QUEUED_MS,
+            sample_rate=TELEPHONY_SAMPLE_RATE,
+            drop_policy=PLIVO_QUEUE_DROP_POLICY,
+            late_ms=PLIVO_LATE_PACKET_MS,
+            on_sent=lambda ms: self.latency.record("outbound_send_ms", ms)
         )
+        # Latency probes (per call, also feeding the process-wide histograms)
+        self.latency = LatencyProbes(parent=process_latency)
+        self.response_tracker = ResponseLatencyTracker(self.latency)
+        # Barge-in: purge queued agent audio and tell Plivo to drop what it has buffered
+        self.silence_detector = (AgentSilenceDetector(sample_rate=TELEPHONY_SAMPLE_RATE)
+                                 if "silence" in BARGE_IN_MODES else None)
+        self._audio_since_clear = False
+        self._barge_in_guard_until = 0.0
         
         # Statistics
         self.stats = {
@@ -174,33 +309,26 @@ class TelephonyWebSocketHandler:
             "audio_frames_received_from_agent": 0,
             "bytes_from_telephony": 0,
             "bytes_to_telephony": 0,
+            "barge_ins": 0,
+            "barge_in_packets_purged": 0,
+            "preconnect_buffered_ms": 0,
+            "preconnect_flushed_ms": 0,
+            "preconnect_trimmed_ms": 0,
+            "catch_up_skipped_ms": 0,
         }
         
         logger.info(f"🆕 Created telephony WebSocket handler for room: {room_name}")
         
     async def connect_to_livekit(self):
         """Connect to LiveKit room and setup audio track"""
-        identity = f"telephony-{uuid.uuid4()}"
-        
         try:
             logger.info(f"🔗 Connecting to LiveKit room: {self.room_name}")
             
-            # Create room if it doesn't exist
-            lkapi = api.LiveKitAPI(LIVEKIT_URL, LIVEKIT_API_KEY, LIVEKIT_API_SECRET)
-            try:
-                await lkapi.room.create_room(api.CreateRoomRequest(name=self.room_name))
-                logger.info(f"✅ Created LiveKit room: {self.room_name}")
-            except Exception as e:
-                logger.info(f"ℹ️ Room creation result (may already exist): {e}")
+            # Create room if it doesn't exist (no-op when /plivo.xml already prepared it)
+            await livekit_pool.ensure_room(self.room_name)
             
-            # Create access token
-            token = (api.AccessToken(LIVEKIT_API_KEY, LIVEKIT_API_SECRET)
-                    .with_identity(identity)
-                    .with_name(PARTICIPANT_NAME)
-                    .with_grants(api.VideoGrants(
-                        room_join=True,
-                        room=self.room_name,
-                    ))) 
+            # Access token, pre-minted at answer time when available
+            identity, token = livekit_pool.take_token(self.room_name, PARTICIPANT_NAME)
             
             # Connect to room
             self.room = rtc.Room()
@@ -211,10 +339,11 @@ class TelephonyWebSocketHandler:
             # Connect to room with timeout
             logger.info(f"⏰ Connecting to LiveKit room with 10s timeout...")
             await asyncio.wait_for(
-                self.room.connect(LIVEKIT_URL, token.to_jwt()), 
+                self.room.connect(LIVEKIT_URL, token), 
                 timeout=10.0
             )
             logger.info(f"✅ LiveKit room connection successful!")
+            self.setup_timeline.mark("livekit_connected")
             
             # Mark as connected immediately
             self.connected = True
@@ -229,15 +358,18 @@ class TelephonyWebSocketHandler:
             # Publish with microphone source
             options = rtc.TrackPublishOptions()
             options.source = rtc.TrackSource.SOURCE_MICROPHONE
+            # Gated silence is digital zero; let Opus DTX stop sending it
+            options.dtx = self.audio_source.silence_gate is not None
             
             publication = await self.room.local_participant.publish_track(
                 self.audio_track,
                 options
             )
             logger.info(f"✅ Telephony audio track published: {publication.sid}")
+            self.setup_timeline.mark("track_published")
+            await self._flush_preconnect_buffer()
             logger.info(f"🎯 LiveKit connection complete - ready for audio!")
             
-            await lkapi.aclose()
             return True
             
         except asyncio.TimeoutError:
@@ -315,6 +447,14 @@ class TelephonyWebSocketHandler:
                     logger.info(f"🤖 AGENT AUDIO TRACK CONFIRMED! Starting stream to telephony...")
                     self._start_agent_audio_stream(participant, track)
 
+        @self.room.on("data_received")
+        def on_data_received(packet):
+            if packet.topic == INTERRUPT_TOPIC and "signal" in BARGE_IN_MODES:
+                # Purge now; only the clearAudio send runs in the background
+                clear_audio = self.barge_in("signal")
+                if clear_audio:
+                    asyncio.create_task(clear_audio)
+
         @self.room.on("track_unsubscribed")
         def on_track_unsubscribed(track, publication, participant):
             logger.info(f"🔇 Track unsubscribed from {participant.identity}: {track.kind}")
@@ -336,6 +476,7 @@ class TelephonyWebSocketHandler:
         
         if is_agent:
             self.agent_participant = participant
+            self.setup_timeline.mark("agent_joined")
             logger.info(f"🤖 AGENT DETECTED: {participant.identity}")
             logger.info(f"🤖 Detection reasons: {', '.join(reasons)}")
             
@@ -390,6 +531,7 @@ class TelephonyWebSocketHandler:
             self.audio_stream_task.cancel()
         
         # Start new audio streaming task
+        self.setup_timeline.mark("agent_track_subscribed")
         logger.info("🚀 Creating new audio stream task")
         self.audio_stream_task = asyncio.create_task(
             self.stream_agent_audio_to_telephony(track, participant.identity)
@@ -404,10 +546,13 @@ class TelephonyWebSocketHandler:
         bytes_sent = 0
         
         try:
-            # Create audio stream
-            audio_stream = rtc.AudioStream(audio_track)
+            # Create audio stream at the bridge rate rather than the 48kHz default
+            audio_stream = rtc.AudioStream(audio_track, sample_rate=LIVEKIT_SAMPLE_RATE, num_channels=1)
             logger.info("✅ AudioStream created successfully")
             
+            # Paced sender for fixed-size playAudio packets
+            self.packetizer.start()
+            
             async for audio_frame_event in audio_stream:
                 current_time = time.time()
                 
@@ -428,43 +573,66 @@ class TelephonyWebSocketHandler:
                     logger.info(f"🔊 [OUTGOING] Agent audio: {frame_count} frames, {bytes_sent} bytes sent")
                     last_log_time = current_time
                 
+                # Agent audio still in flight from before an interruption
+                if self._barge_in_guard_until and time.monotonic() < self._barge_in_guard_until:
+                    continue
+                
                 try:
                     # Get the audio frame
                     frame = audio_frame_event.frame
                     
-                    # Resample from 48kHz to 8kHz for telephony
-                    resampled_frames = self.return_resampler.push(frame)
+                    # Resample to 8kHz for telephony
+                    resampled_frames = self.return_resampler.push(frame) if self.return_resampler else [frame]
                     
                     for resampled_frame in resampled_frames:
-                        # Convert to PCM bytes
-                        pcm_bytes = bytes(resampled_frame.data[:resampled_frame.samples_per_channel * 2])
+                        # Zero-copy view over the resampled PCM
+                        pcm_array = np.frombuffer(resampled_frame.data, dtype=np.int16,
+                                                  count=resampled_frame.samples_per_channel)
+                        peak = frame_peak(pcm_array)
+                        self.response_tracker.agent_frame(peak, time.monotonic())
+                        # First voiced agent audio (the greeting) completes the setup waterfall
+                        if peak >= SPEECH_PEAK and not self.setup_timeline.finished:
+                            self.setup_timeline.mark("first_agent_audio")
+                            setup_timelines.finish(self.setup_timeline)
+                            logger.info(f"⏱️ Call setup: {self.setup_timeline.steps()}")
                         
-                        # ADD NOISE HERE - before μ-law conversion
-                        pcm_array = np.frombuffer(pcm_bytes, dtype=np.int16)
-                        noise = np.random.normal(0, 0.01, len(pcm_array))
-                        noisy_pcm = (pcm_array + noise * 32767 * 0.1).astype(np.int16)
-
-                        # Convert PCM to μ-law for telephony
-                        mulaw_bytes = audioop.lin2ulaw(pcm_bytes, 2)
+                        # Agent speech cut off -> flush what is already queued downstream, in
+                        # sequence with push() so nothing queued before it goes out after clearAudio
+                        if self.silence_detector and self.silence_detector.process(pcm_array):
+                            clear_audio = self.barge_in("silence")
+                            if clear_audio:
+                                await clear_audio
+                            continue
                         
-                        # Send to telephony
-                        success = await self.send_audio_to_telephony(mulaw_bytes)
+                        # Mix precomputed background noise before μ-law conversion
+                        if self.comfort_noise:
+                            pcm_array = self.comfort_noise.mix(pcm_array)
+
+                        # Convert PCM to μ-law for telephony (reuses the codec's output buffer)
+                        mulaw_bytes = self.return_codec.encode(pcm_array)
                         
-                        if success:
-                            bytes_sent += len(mulaw_bytes)
-                            self.stats["audio_frames_received_from_agent"] += 1
-                            self.stats["bytes_to_telephony"] += len(mulaw_bytes)
+                        # Queue for the paced packet sender
+                        self.packetizer.push(mulaw_bytes)
+                        bytes_sent += len(mulaw_bytes)
+                        self.stats["audio_frames_received_from_agent"] += 1
                         
                 except Exception as e:
                     logger.error(f"❌ Error processing audio frame {frame_count}: {e}")
                     continue
                     
+        except asyncio.CancelledError:
+            # Stream replaced or agent gone - queued agent speech is stale
+            self.packetizer.clear()
+            raise
         except Exception as e:
             logger.error(f"❌ Error in agent audio stream: {e}")
             import traceback
             traceback.print_exc()
         finally:
-            logger.info(f"🔇 Agent audio stream ended. Frames: {frame_count}, Bytes: {bytes_sent}")
+            # Let the partial tail packet play out (no-op after a clear)
+            self.packetizer.flush()
+            logger.info(f"🔇 Agent audio stream ended. Frames: {frame_count}, Bytes: {bytes_sent}, "
+                        f"Packetizer: {self.packetizer.get_stats()}")
 
     async def send_audio_to_telephony(self, audio_data):
         """Send audio data back to Plivo via WebSocket"""
@@ -488,21 +656,18 @@ class TelephonyWebSocketHandler:
                 logger.error(f"❌ Audio data size: {len(audio_data)} bytes - DROPPED")
                 return False
                 
-            # Encode audio as base64 for Plivo
-            encoded_audio = base64.b64encode(audio_data).decode('utf-8')
-            
-            # Create Plivo playAudio message format
-            media_message = {
-                "event": "playAudio",
-                "media": {
-                    "contentType": "audio/x-mulaw",
-                    "sampleRate": TELEPHONY_SAMPLE_RATE,
-                    "payload": encoded_audio
-                }
-            }
+            # Splice base64 payload into the pre-rendered playAudio message
+            media_message = self.templates.play_audio(audio_data)
             
-            await self.websocket.send(json.dumps(media_message))
+            if self._send_bytes_as_text:
+                await self.websocket.send(media_message, text=True)
+            else:
+                await self.websocket.send(media_message.decode())
             self.messages_sent += 1
+            self.stats["bytes_to_telephony"] += len(audio_data)
+            if self.recorder:
+                self.recorder.write(AGENT, audio_data)
+            self._audio_since_clear = True
             
             # Log success for first few messages
             if self.messages_sent <= 5:
@@ -517,6 +682,32 @@ class TelephonyWebSocketHandler:
             logger.error(f"❌ Error sending audio to Plivo: {e}")
             return False
         
+    def barge_in(self, source: str):
+        """
+        Caller interrupted the agent: purge the outbound queue right away (in sequence with
+        push(), not from a task that runs later) and return the clearAudio send to await,
+        or None when Plivo has no agent audio buffered
+        """
+        purged = self.packetizer.clear()
+        if source == "signal":
+            self._barge_in_guard_until = time.monotonic() + BARGE_IN_GUARD_MS / 1000.0
+        if not self._audio_since_clear or not self.stream_sid:
+            return None
+        self._audio_since_clear = False
+        self.stats["barge_ins"] += 1
+        self.stats["barge_in_packets_purged"] += purged
+        return self._send_clear_audio(source, purged)
+
+    async def _send_clear_audio(self, source: str, purged: int):
+        try:
+            if self._send_bytes_as_text:
+                await self.websocket.send(self.templates.clear_audio, text=True)
+            else:
+                await self.websocket.send(self.templates.clear_audio.decode())
+            logger.info(f"✋ Barge-in ({source}): sent clearAudio, purged {purged} queued packets")
+        except Exception as e:
+            logger.error(f"❌ Error sending clearAudio to Plivo: {e}")
+
     async def handle_messages(self):
         """Handle incoming WebSocket messages from Plivo"""
         logger.info(f"👂 Starting to listen for Plivo WebSocket messages...")
@@ -547,6 +738,11 @@ class TelephonyWebSocketHandler:
                 
                 try:
                     if isinstance(message, str):
+                        # Fast path: media events skip the full JSON parse
+                        payload = parse_media_payload(message)
+                        if payload is not None:
+                            await self.handle_media_payload(payload, received_at=time.monotonic())
+                            continue
                         event = json.loads(message)
                         await self.handle_telephony_event(event)
                     else:
@@ -577,6 +773,17 @@ class TelephonyWebSocketHandler:
             start_data = event.get("start", {})
             self.stream_sid = start_data.get("streamId")
             call_id = start_data.get("callId")
+            self.call_uuid = call_id
+            # Hangup / stream-status callbacks find this handler by CallUUID or StreamId
+            registry.index(self, self.call_uuid, self.stream_sid)
+            self.setup_timeline.mark("start_event")
+            call_directory.soon(call_directory.register(worker_address(),
+                                                        [self.room_name, self.call_uuid, self.stream_sid]))
+            self.templates = PlivoMessageTemplates(
+                stream_id=self.stream_sid,
+                content_type="audio/x-mulaw",
+                sample_rate=TELEPHONY_SAMPLE_RATE
+            )
             
             logger.info(f"📊 Stream ID: {self.stream_sid}")
             logger.info(f"📊 Call ID: {call_id}")
@@ -599,41 +806,14 @@ class TelephonyWebSocketHandler:
             # Handle base64 encoded audio from Plivo (μ-law format)
             media_data = event.get("media", {})
             payload = media_data.get("payload")
-            track = media_data.get("track", "inbound")
             
-            if payload and self.audio_source:
-                if not self.connected:
-                    # Log connection issue but continue trying to connect
-                    if self.messages_received % 250 == 0:  # Much less frequent
-                        logger.warning(f"⚠️ LiveKit not connected yet (msg #{self.messages_received})")
-                
-                try:
-                    # Decode base64 audio data (μ-law format from Plivo)
-                    decoded_audio = base64.b64decode(payload)
-                    
-                    # Only process if we have a connected audio source
-                    if self.connected:
-                        await self.audio_source.push_audio_data(decoded_audio)
-                        self.stats["audio_frames_sent_to_livekit"] += 1
-                        self.stats["bytes_from_telephony"] += len(decoded_audio)
-                        
-                        # Log much less frequently
-                        if self.stats["audio_frames_sent_to_livekit"] % 250 == 0:
-                            logger.info(f"🎵 Processed {self.stats['audio_frames_sent_to_livekit']} audio frames from Plivo")
-                    else:
-                        # Count dropped frames
-                        if not hasattr(self, 'dropped_frames'):
-                            self.dropped_frames = 0
-                        self.dropped_frames += 1
-                        
-                except Exception as e:
-                    logger.error(f"❌ Error processing Plivo media: {e}")
-            elif not payload:
-                if self.messages_received <= 10:
-                    logger.warning("⚠️ Media event without payload")
-            elif not self.audio_source:
-                if self.messages_received <= 10:
-                    logger.warning("⚠️ Audio source not initialized")
+            try:
+                # Decode base64 audio data (μ-law format from Plivo)
+                decoded_audio = base64.b64decode(payload) if payload else b""
+            except Exception as e:
+                logger.error(f"❌ Error processing Plivo media: {e}")
+                return
+            await self.handle_media_payload(decoded_audio)
                     
         elif event_type == "stop":
             logger.info("🔴 CALL ENDED")
@@ -645,29 +825,122 @@ class TelephonyWebSocketHandler:
             logger.info(f"❓ Unknown Plivo event: {event_type}")
             logger.info(f"📄 Event data: {json.dumps(event, indent=2)}")
 
-    async def handle_binary_audio(self, audio_data):
-        """Handle binary audio data directly"""
-        if self.audio_source and self.connected:
+    def _buffer_preconnect_audio(self, mulaw_data):
+        """Hold caller audio until the track is published (oldest audio dropped beyond the bound)"""
+        peak = frame_peak(ulaw_to_pcm(mulaw_data))
+        self.preconnect_buffer.append((bytes(mulaw_data), peak))
+        self._preconnect_bytes += len(mulaw_data)
+        self.stats["preconnect_buffered_ms"] += len(mulaw_data) // 8
+        limit = PRECONNECT_BUFFER_MS * TELEPHONY_SAMPLE_RATE // 1000
+        while self._preconnect_bytes > limit:
+            dropped, _ = self.preconnect_buffer.popleft()
+            self._preconnect_bytes -= len(dropped)
+            self.stats["preconnect_trimmed_ms"] += len(dropped) // 8
+
+    async def _flush_preconnect_buffer(self):
+        """Send buffered caller audio from just before the first speech, then switch to live audio"""
+        # Leading silence is only latency for the agent; keep a short pre-roll before speech
+        voiced = [i for i, (_, peak) in enumerate(self.preconnect_buffer) if peak >= SPEECH_PEAK]
+        preroll_bytes = PRECONNECT_PREROLL_MS * TELEPHONY_SAMPLE_RATE // 1000
+        if voiced:
+            start = voiced[0]
+            kept = 0
+            while start > 0 and kept < preroll_bytes:
+                start -= 1
+                kept += len(self.preconnect_buffer[start][0])
+        else:
+            start = len(self.preconnect_buffer)
+        for _ in range(start):
+            trimmed, _ = self.preconnect_buffer.popleft()
+            self._preconnect_bytes -= len(trimmed)
+            self.stats["preconnect_trimmed_ms"] += len(trimmed) // 8
+
+        # Media keeps arriving while capture_frame awaits, so drain until empty before going live
+        flushed = 0
+        while self.preconnect_buffer:
+            mulaw_data, _ = self.preconnect_buffer.popleft()
+            self._preconnect_bytes -= len(mulaw_data)
+            await self.audio_source.push_audio_data(mulaw_data)
+            flushed += len(mulaw_data)
+        self.track_published = True
+        self._catching_up = flushed > 0
+        self.stats["preconnect_flushed_ms"] += flushed // 8
+        if self.stats["preconnect_buffered_ms"]:
+            logger.info(f"⏪ Pre-connect audio: {self.stats['preconnect_buffered_ms']}ms buffered, "
+                        f"{flushed // 8}ms flushed, {self.stats['preconnect_trimmed_ms']}ms trimmed")
+
+    async def handle_media_payload(self, decoded_audio, received_at=None):
+        """Push decoded μ-law audio from a Plivo media event to LiveKit"""
+        if decoded_audio and self.recorder:
+            self.recorder.write(CALLER, decoded_audio)
+        if decoded_audio and not self.track_published:
+            # LiveKit still connecting: keep the caller's first words for the flush
+            self._buffer_preconnect_audio(decoded_audio)
+        elif decoded_audio and self.audio_source:
             try:
-                await self.audio_source.push_audio_data(audio_data)
-                self.stats["audio_frames_sent_to_livekit"] += 1
-                self.stats["bytes_from_telephony"] += len(audio_data)
+                # Skip silence while the flushed backlog drains so the agent hears the caller live again
+                if self._catching_up:
+                    if self.audio_source.queued_duration * 1000 <= PRECONNECT_CATCH_UP_MS:
+                        self._catching_up = False
+                    elif frame_peak(ulaw_to_pcm(decoded_audio)) < SPEECH_PEAK:
+                        self.stats["catch_up_skipped_ms"] += len(decoded_audio) // 8
+                        return
+                
+                if self.connected:
+                    await self.audio_source.push_audio_data(decoded_audio)
+                    if self.silence_detector and self.audio_source.last_samples is not None:
+                        self.silence_detector.caller_frame(self.audio_source.last_samples)
+                    if received_at is not None:
+                        now = time.monotonic()
+                        self.response_tracker.caller_frame(self.audio_source.last_peak, received_at)
+                        self.latency.record("inbound_queue_ms",
+                                            (now - received_at + self.audio_source.queued_duration) * 1000)
+                    self.stats["audio_frames_sent_to_livekit"] += 1
+                    self.stats["bytes_from_telephony"] += len(decoded_audio)
+                    
+                    # Log much less frequently
+                    if self.stats["audio_frames_sent_to_livekit"] % 250 == 0:
+                        logger.info(f"🎵 Processed {self.stats['audio_frames_sent_to_livekit']} audio frames from Plivo")
+                else:
+                    # Count dropped frames
+                    if not hasattr(self, 'dropped_frames'):
+                        self.dropped_frames = 0
+                    self.dropped_frames += 1
+                    
             except Exception as e:
-                logger.error(f"❌ Error processing binary audio: {e}")
+                logger.error(f"❌ Error processing Plivo media: {e}")
+        elif not decoded_audio:
+            if self.messages_received <= 10:
+                logger.warning("⚠️ Media event without payload")
+
+    async def handle_binary_audio(self, audio_data):
+        """Handle binary audio data directly"""
+        await self.handle_media_payload(audio_data)
             
-    async def cleanup(self):
-        """Clean up resources"""
+    async def teardown(self, reason: str):
+        """Plivo reported the call over: free everything now instead of waiting for the socket to close"""
+        logger.info(f"⚡ Fast teardown for room {self.room_name} ({reason})")
+        await self.cleanup(delete_room=True)
+        try:
+            await self.websocket.close()
+        except Exception as e:
+            logger.debug(f"WebSocket close during teardown failed: {e}")
+
+    async def cleanup(self, delete_room: bool = False):
+        """Clean up resources; delete_room also removes the LiveKit room (call known to be over)"""
+        if self._cleanup_started:
+            return
+        self._cleanup_started = True
         logger.info("🧹 Starting cleanup...")
         
         self.call_active = False
         
-        # Remove from global tracking
-        try:
-            import __main__
-            if hasattr(__main__, 'active_handlers') and self in __main__.active_handlers:
-                __main__.active_handlers.remove(self)
-        except:
-            pass
+        # Remove from this worker's registry and the call directory
+        registry.remove(self)
+        # Calls that never heard the agent still show how far setup got
+        setup_timelines.finish(self.setup_timeline)
+        if self.call_uuid or self.stream_sid:
+            call_directory.soon(call_directory.unregister([self.room_name, self.call_uuid, self.stream_sid]))
         
         # Cancel audio streaming task
         if self.audio_stream_task and not self.audio_stream_task.done():
@@ -678,6 +951,14 @@ class TelephonyWebSocketHandler:
             except (asyncio.CancelledError, asyncio.TimeoutError):
                 pass
         
+        # Stop the paced sender; the call is gone so nothing left is worth sending
+        self.packetizer.clear()
+        await self.packetizer.stop(flush=False)
+        
+        # Finalize and upload the recording in the background, under the id the backend stored
+        if self.recorder:
+            self.recorder.finish(self.plivo_call_id or self.call_uuid or self.room_name)
+        
         # Cleanup audio source
         if self.audio_source:
             try:
@@ -708,16 +989,23 @@ class TelephonyWebSocketHandler:
         logger.info(f"   Dropped frames (no LiveKit): {dropped_frames}")
         logger.info(f"   Agent: {'Found' if self.agent_participant else 'Not found'}")
         
+        # Hung up: delete the room so the agent job ends and no LiveKit minutes are left running
+        if delete_room and self.room_name and self.room is not None:
+            livekit_pool.forget_room(self.room_name)
+            try:
+                await livekit_pool.client.room.delete_room(api.DeleteRoomRequest(room=self.room_name))
+                logger.info(f"🗑️ Deleted LiveKit room: {self.room_name}")
+            except Exception as e:
+                logger.error(f"❌ Error deleting room {self.room_name}: {e}")
+        
         # Clean up room after call ends - try to end the room nicely
-        if self.room_name:
+        elif self.room_name and self.room is not None:
             logger.info(f"🧹 Notifying room cleanup: {self.room_name}")
+            livekit_pool.forget_room(self.room_name)
             try:
-                # Create API instance to clean up room
-                lkapi = api.LiveKitAPI(LIVEKIT_URL, LIVEKIT_API_KEY, LIVEKIT_API_SECRET)
-                
-                # List participants to see if room is empty
+                # List participants to see if room is empty (shared API client)
                 try:
-                    participants = await lkapi.room.list_participants(api.ListParticipantsRequest(room=self.room_name))
+                    participants = await livekit_pool.client.room.list_participants(api.ListParticipantsRequest(room=self.room_name))
                     logger.info(f"📊 Room {self.room_name} has {len(participants.participants)} participants remaining")
                     
                     # If only the agent is left, we could disconnect it
@@ -730,13 +1018,29 @@ class TelephonyWebSocketHandler:
                 except Exception as e:
                     logger.error(f"❌ Error checking room participants: {e}")
                 
-                await lkapi.aclose()
-                
             except Exception as e:
                 logger.error(f"❌ Error during room cleanup: {e}")
             
         logger.info("✅ Handler cleanup complete")
     
+    def get_stats(self):
+        """Get per-call statistics"""
+        return {
+            "room": self.room_name,
+            "stream_id": self.stream_sid,
+            "connected": self.connected,
+            "agent": self.agent_participant.identity if self.agent_participant else None,
+            "duration": time.time() - self.connection_start_time,
+            "messages_received": self.messages_received,
+            "messages_sent": self.messages_sent,
+            "stats": dict(self.stats),
+            "packetizer": self.packetizer.get_stats(),
+            "latency": self.latency.summary(),
+            "audio_source": self.audio_source.get_stats() if self.audio_source else None,
+            "recording": self.recorder.get_stats() if self.recorder else None,
+            "setup": self.setup_timeline.to_dict(),
+        }
+
     def _is_agent_participant_identity(self, identity: str) -> bool:
         """Check if identity string belongs to an agent"""
         identity = identity.lower()
@@ -745,40 +1049,60 @@ class TelephonyWebSocketHandler:
 
 
 #New Changes
-async def trigger_agent(room_name: str):
-    """Launch agent in the specified LiveKit room - OPTIMIZED VERSION"""
-    logger.info(f"🚀 Triggering agent for room: {room_name}")
-    try:
-        # NO DELAY - start agent immediately
-        logger.info(f"�� Dispatching agent to room: {room_name}")
-        
-        # Use Popen for non-blocking execution
-        result = subprocess.Popen([
-            "lk", "dispatch", "create",
-            "--room", room_name,
-            "--agent-name", agent_name
-        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        
-        logger.info(f"✅ Agent dispatch command executed immediately (PID: {result.pid})")
-        
-        # Optional: Check if command started successfully
-        # Give it a moment to start, but don't wait for completion
-        await asyncio.sleep(0.1)  # Just 100ms to let process start
-        
-        if result.poll() is None:  # Process is still running
-            logger.info(f"✅ Agent process started successfully")
+async def teardown_call(keys, reason: str) -> bool:
+    """Tear down the local call matching any of keys (CallUUID, StreamId, room); False if not on this worker"""
+    handler = registry.find(*keys)
+    if handler is None:
+        return False
+    asyncio.create_task(handler.teardown(reason))
+    return True
+
+async def route_teardown(call_uuid: str, stream_id: str, reason: str) -> bool:
+    """Tear down a call wherever its WebSocket lives: here, its owner in the call directory, or a sibling worker"""
+    if await teardown_call([call_uuid, stream_id], reason):
+        return True
+    owner = await call_directory.lookup(call_uuid, stream_id)
+    if owner and owner != worker_address():
+        return await forward_teardown(call_uuid=call_uuid, stream_id=stream_id, reason=reason, owner=owner)
+    if BRIDGE_WORKERS > 1:
+        return await forward_teardown(call_uuid=call_uuid, stream_id=stream_id, reason=reason)
+    return False
+
+def reserve_call(key: str):
+    """Reserve an admission slot for an answered call and record which worker holds it"""
+    admission.reserve(key)
+    call_directory.soon(call_directory.register(worker_address(), [f"admission:{key}"], ttl=int(RESERVATION_TTL)))
+
+def release_reserved_slot(key: str) -> bool:
+    """Control-server hook: give back a slot this worker reserved for a call taken elsewhere"""
+    return bool(key) and admission.release(key)
+
+async def release_reservation(key: str) -> bool:
+    """Give back the slot reserved for key on whichever worker answered the call (here, its owner, or a sibling)"""
+    if admission.release(key):
+        released = True
+    else:
+        owner = await call_directory.lookup(f"admission:{key}")
+        if owner and owner != worker_address():
+            released = await forward_release(key, owner=owner)
+        elif BRIDGE_WORKERS > 1:
+            released = await forward_release(key)
         else:
-            # Process ended quickly, check for errors
-            stdout, stderr = result.communicate()
-            if result.returncode != 0:
-                logger.error(f"❌ Agent dispatch failed: {stderr.decode()}")
-            else:
-                logger.info(f"✅ Agent dispatch completed: {stdout.decode()}")
-        
-    except Exception as e:
-        logger.error(f"❌ Error launching agent: {e}")
+            released = False
+    if released:
+        call_directory.soon(call_directory.unregister([f"admission:{key}"]))
+    return released
+
+async def trigger_agent(room_name: str, agent: str = None):
+    """Dispatch the agent (default agent_name) into the specified LiveKit room through the AgentDispatch API"""
+    agent = agent or agent_name
+    logger.info(f"🚀 Triggering agent {agent} for room: {room_name}")
+    result = await agent_dispatcher.dispatch(agent, room_name)
+    if not result.success:
+        logger.error(f"❌ Agent dispatch failed: {result.error}")
+    return result
 
-async def handle_telephony_websocket(websocket, path):
+async def handle_telephony_websocket(websocket, path, handler_cls=None):
     """Handle incoming WebSocket connections from Plivo - OPTIMIZED"""
     try:
         logger.info(f"🔗 NEW PLIVO WEBSOCKET CONNECTION")
@@ -791,15 +1115,55 @@ async def handle_telephony_websocket(websocket, path):
         
         logger.info(f"📞 Room: {room_name}")
         
+        # Refuse the stream early rather than degrade every call on this worker; streams of calls
+        # this bridge answered (ticket) are always taken and free the slot reserved at answer time
+        call_key = query.get("call_uuid", [room_name])[0]
+        ticket = query.get("ticket", [None])[0]
+        admitted, reason = admission.admit_stream(call_key, ticket)
+        if not admitted:
+            logger.warning(f"🚫 Rejecting stream for {room_name}: over capacity ({reason})")
+            await websocket.close(code=CLOSE_CODE_OVERLOADED, reason=f"bridge over capacity ({reason})")
+            return
+        if ticket:
+            asyncio.create_task(release_reservation(call_key))
+        
+        # Background noise selected by the answer URL (forwarded by /plivo-app/plivo.xml)
+        comfort_noise = ComfortNoiseMixer.from_params({k: v[0] for k, v in query.items()})
+        if comfort_noise:
+            logger.info(f"🔈 Comfort noise: {comfort_noise.noise_type} @ volume {comfort_noise.volume}")
+        
+        # Local dual-channel recording (PLIVO_RECORD_CALLS or ?record=1)
+        recorder = None
+        if recording_enabled({k: v[0] for k, v in query.items()}):
+            try:
+                recorder = CallRecorder(room_name)
+                logger.info(f"🎙️ Recording call to {recorder.raw_path}")
+            except Exception as e:
+                logger.error(f"❌ Could not start call recording: {e}")
+        
+        # Setup waterfall starts when /plivo.xml answered (t0), possibly on another node
+        try:
+            answered_at = float(query["t0"][0]) if "t0" in query else None
+        except ValueError:
+            answered_at = None
+        setup_timeline = CallSetupTimeline("plivo", room_name, origin=answered_at,
+                                           origin_phase="answer_xml" if answered_at else None)
+        
         # Create handler for Plivo WebSocket
-        handler = TelephonyWebSocketHandler(room_name, websocket)
+        handler = (handler_cls or TelephonyWebSocketHandler)(room_name, websocket, comfort_noise=comfort_noise,
+                                                             recorder=recorder, setup_timeline=setup_timeline,
+                                                             plivo_call_id=query.get("call_id", [None])[0])
+        registry.add(handler)
         
         # OPTIMIZATION: Start all tasks concurrently
         logger.info(f"🚀 Starting concurrent setup...")
         
+        # Warm-pool rooms already have the agent dispatched and waiting
+        warm_room = query.get("warm", ["0"])[0] == "1"
+        
         # Start all three tasks at the same time
         livekit_task = asyncio.create_task(handler.connect_to_livekit())
-        agent_task = asyncio.create_task(trigger_agent(room_name))
+        agent_task = None if warm_room else asyncio.create_task(trigger_agent(room_name, query.get("agent", [None])[0]))
         message_task = asyncio.create_task(handler.handle_messages())
         
         # Wait for LiveKit connection with shorter timeout
@@ -812,12 +1176,15 @@ async def handle_telephony_websocket(websocket, path):
         except asyncio.TimeoutError:
             logger.error("❌ LiveKit connection timeout (8s)")
         
-        # Agent task should complete quickly (just process start)
-        try:
-            await asyncio.wait_for(agent_task, timeout=2.0)
-            logger.info("✅ Agent dispatch completed")
-        except asyncio.TimeoutError:
-            logger.warning("⚠️ Agent dispatch took longer than expected")
+        # Agent dispatch is a single API request (retried on transient errors)
+        if agent_task is None:
+            logger.info("♨️ Warm room - agent already dispatched")
+        else:
+            try:
+                await asyncio.wait_for(asyncio.shield(agent_task), timeout=2.0)
+                logger.info("✅ Agent dispatch completed")
+            except asyncio.TimeoutError:
+                logger.warning("⚠️ Agent dispatch took longer than expected")
         
         # Wait for message handling to complete
         await message_task
@@ -839,13 +1206,17 @@ async def start_websocket_server():
     
     async def websocket_handler(websocket):
         try:
-            path = websocket.path if hasattr(websocket, 'path') else "/"
+            if hasattr(websocket, 'request') and websocket.request is not None:
+                path = websocket.request.path
+            else:
+                path = websocket.path if hasattr(websocket, 'path') else "/"
             await handle_telephony_websocket(websocket, path)
         except Exception as e:
             logger.error(f"❌ Error in websocket handler: {e}")
     
     # Start the server
-    async with websockets.serve(websocket_handler, "0.0.0.0", 8765):
+    # reuse_port lets every bridge worker process bind the same port
+    async with websockets.serve(websocket_handler, "0.0.0.0", 8765, reuse_port=BRIDGE_WORKERS > 1):
         logger.info("✅ WebSocket server listening on ws://0.0.0.0:8765")
         logger.info("🔧 Ready for Plivo WebSocket connections")
         logger.info("📋 Plivo should connect to: ws://sbi.vaaniresearch.com:8765/?room=your_room_name")
@@ -854,11 +1225,46 @@ async def start_websocket_server():
 async def start_http_server():
     """Start HTTP server for API endpoints"""
     
+    async def handle_setup_timeline(request):
+        """Call setup waterfall percentiles per phase - GET /setup-timeline?recent=N"""
+        if BRIDGE_WORKERS > 1:
+            exports = [w.get("setup") for w in await query_workers()]
+        else:
+            exports = [setup_timelines.export()]
+        try:
+            recent = max(0, int(request.query.get("recent", 20)))
+        except ValueError:
+            recent = 20
+        return web.json_response({
+            "phases": summarize_exports(exports),
+            "recent": list(setup_timelines.recent)[-recent:] if recent else [],
+        })
+
+    async def handle_setup_timeline_report(request):
+        """Agent workers report SIP call setup timelines - POST /setup-timeline (X-Bridge-Token)"""
+        if not control_token_ok(request):
+            return web.json_response({"error": "forbidden"}, status=403)
+        try:
+            data = await request.json()
+            if not isinstance(data.get("phases"), dict) or not isinstance(data.get("steps", {}), dict):
+                raise ValueError("phases must be an object")
+            setup_timelines.add(data)
+            return web.json_response({"status": "ok"})
+        except Exception as e:
+            return web.json_response({"error": str(e)}, status=400)
+
     async def handle_health(request):
-        """Health check endpoint"""
+        """Health check endpoint (load / accepting let a balancer route around hot nodes)"""
+        bridge_stats = await collect_worker_stats()
         return web.json_response({
-            "status": "healthy",
+            "status": "healthy" if bridge_stats["accepting"] is not False else "overloaded",
             "timestamp": time.time(),
+            "load": bridge_stats["load"],
+            "accepting": bridge_stats["accepting"],
+            "bridge": bridge_stats,
+            "livekit_api": livekit_pool.get_stats(),
+            "agent_dispatch": agent_dispatcher.get_stats(),
+            "warm_pool": warm_pool.get_stats() if warm_pool else None,
             "services": {
                 "websocket": "running",
                 "http": "running",
@@ -867,9 +1273,23 @@ async def start_http_server():
             "config": {
                 "telephony_sample_rate": TELEPHONY_SAMPLE_RATE,
                 "livekit_sample_rate": LIVEKIT_SAMPLE_RATE,
-                "websocket_url": CALLBACK_WS_URL
+                "resample_quality": {
+                    "inbound": INBOUND_RESAMPLE_QUALITY,
+                    "outbound": OUTBOUND_RESAMPLE_QUALITY
+                },
+                "outbound_queue": {
+                    "packet_ms": PLIVO_PACKET_MS,
+                    "high_water_ms": PLIVO_MAX_QUEUED_MS,
+                    "drop_policy": PLIVO_QUEUE_DROP_POLICY,
+                    "late_ms": PLIVO_LATE_PACKET_MS
+                },
+                "silence_gate": SILENCE_GATE_MODE,
+                "call_directory": call_directory.backend,
+                "node": worker_address(),
+                "websocket_url": CALLBACK_WS_URL,
+                "workers": BRIDGE_WORKERS
             }
-        })
+        }, headers={"X-Bridge-Load": str(bridge_stats["load"])})
 
     async def handle_trigger_room(request):
         """Trigger agent in a specific room"""
@@ -878,7 +1298,7 @@ async def start_http_server():
             room = data["room"]
             
             logger.info(f"🎯 Manual agent trigger for room: {room}")
-            asyncio.create_task(trigger_agent(room))
+            asyncio.create_task(trigger_agent(room, data.get("agent")))
             
             return web.json_response({
                 "status": "triggered",
@@ -892,9 +1312,49 @@ async def start_http_server():
     async def handle_plivo_xml(request):
         """Return Plivo XML for call flow - /plivo-app/plivo.xml"""
         try:
-            # Get room name from query parameters
-            room = request.query.get("room", f"plivo-room-{uuid.uuid4()}")
-            logger.info(f"📋 Generating Plivo XML for room: {room}")
+            # Over capacity: hang up before a room or warm agent is spent on the call
+            call_uuid = request.query.get("CallUUID")
+            admitted, reason = admission.check(call_uuid)
+            if not admitted:
+                logger.warning(f"🚫 Rejecting call at answer time: over capacity ({reason})")
+                return web.Response(
+                    text="<?xml version='1.0' encoding='UTF-8'?><Response><Hangup reason=\"busy\"/></Response>",
+                    content_type="text/xml", headers={"X-Bridge-Load": str(admission.load()["load"])})
+            
+            # Get room name from query parameters; calls without one take a warm room
+            # only if the pool warmed one for the agent this call asks for (?agent,
+            # default agent_name) - otherwise the agent is dispatched cold below
+            room = request.query.get("room")
+            requested_agent = request.query.get("agent") or agent_name
+            warm_room = False
+            if room is None and warm_pool and requested_agent in warm_pool.agent_names:
+                room = warm_pool.claim(requested_agent)
+                warm_room = room is not None
+            if room is None:
+                room = f"plivo-room-{uuid.uuid4()}"
+            logger.info(f"📋 Generating Plivo XML for room: {room}{' (warm)' if warm_room else ''}")
+            # Hold the slot until the stream connects or the call hangs up
+            reserve_call(call_uuid or room)
+            
+            # Forward background-noise and recording settings to the WebSocket handler
+            stream_params = {"room": room, "agent": requested_agent, "t0": f"{time.time():.3f}"}
+            if warm_room:
+                stream_params["warm"] = "1"
+            # The backend records API calls under the request_uuid Plivo returned (recording S3 key)
+            plivo_call_id = request.query.get("RequestUUID") or request.query.get("CallUUID")
+            if plivo_call_id:
+                stream_params["call_id"] = plivo_call_id
+            if call_uuid:
+                stream_params["call_uuid"] = call_uuid
+            # Lets the stream in on whichever worker it lands on
+            stream_params["ticket"] = admission.ticket(call_uuid or room)
+            for key in ("bg_noise", "noise_type", "noise_volume", "record"):
+                if key in request.query:
+                    stream_params[key] = request.query[key]
+            stream_url = xml_escape(f"{CALLBACK_WS_URL}/?{urlencode(stream_params)}")
+            
+            # Create the room and mint the token while Plivo sets up the stream
+            asyncio.create_task(livekit_pool.prepare_room(room, PARTICIPANT_NAME))
             
             # Plivo XML response for audio streaming
             response_text = f"""<?xml version="1.0" encoding="UTF-8"?>
@@ -905,7 +1365,7 @@ async def start_http_server():
         contentType="audio/x-mulaw;rate=8000"
         streamTimeout="3600"
         statusCallbackUrl="{request.url.scheme}://{request.host}/plivo-app/stream-status"
-    >{CALLBACK_WS_URL}/?room={room}</Stream>
+    >{stream_url}</Stream>
 </Response>"""
             
             logger.info(f"📋 Returning Plivo XML for room: {room}")
@@ -939,8 +1399,14 @@ async def start_http_server():
             logger.info(f"   Duration: {call_duration}s")
             logger.info(f"   Full data: {data}")
             
-            # Here you can add custom logic for call cleanup if needed
-            # For example, notify other services, update databases, etc.
+            # A call that hangs up before its stream connects gives its reserved slot back
+            if await release_reservation(call_uuid):
+                logger.info(f"   Released admission reservation")
+            
+            # Free the call's handler and room right away (another worker or node may own the stream)
+            found = await route_teardown(call_uuid, data.get('StreamId', data.get('stream_id')),
+                                         f"hangup: {hangup_cause}")
+            logger.info(f"   Teardown: {'started' if found else 'no live handler'}")
             
             return web.Response(text="OK", status=200)
             
@@ -968,6 +1434,11 @@ async def start_http_server():
             logger.info(f"   Status: {status}")
             logger.info(f"   Full data: {data}")
             
+            # Stream stopped or failed: tear down without waiting for the socket to close
+            event = str(data.get('Event', data.get('event', ''))).lower()
+            if any(word in f"{status} {event}".lower() for word in ("stop", "fail", "drop", "timeout", "complete")):
+                await route_teardown(call_uuid, stream_id, f"stream {status or event}")
+            
             return web.Response(text="OK", status=200)
             
         except Exception as e:
@@ -1001,6 +1472,8 @@ async def start_http_server():
     
     # Health and utility endpoints
     app.router.add_get("/health", handle_health)
+    app.router.add_get("/setup-timeline", handle_setup_timeline)
+    app.router.add_post("/setup-timeline", handle_setup_timeline_report)
     app.router.add_post("/trigger", handle_trigger_room)
     
     # Plivo-specific endpoints
@@ -1016,11 +1489,12 @@ async def start_http_server():
     # Start server
     runner = web.AppRunner(app)
     await runner.setup()
-    site = web.TCPSite(runner, "0.0.0.0", 8080)
+    site = web.TCPSite(runner, "0.0.0.0", 8080, reuse_port=BRIDGE_WORKERS > 1)
     await site.start()
     logger.info("🌐 HTTP server listening on http://0.0.0.0:8080")
     logger.info("📋 Plivo XML endpoint: http://0.0.0.0:8080/plivo-app/plivo.xml")
     logger.info("📞 Plivo hangup callback: http://0.0.0.0:8080/plivo-app/hangup")
+    logger.info("⏱️ Call setup waterfall: http://0.0.0.0:8080/setup-timeline")
 
 async def main():
     """Main function to run both servers"""
@@ -1035,43 +1509,70 @@ async def main():
     if missing_vars:
         logger.error(f"❌ Missing required environment variables: {missing_vars}")
         return
+    if SILENCE_GATE_MODE not in SILENCE_GATE_MODES:
+        logger.error(f"❌ PLIVO_SILENCE_GATE must be one of {SILENCE_GATE_MODES}, got '{SILENCE_GATE_MODE}'")
+        return
+    if PLIVO_QUEUE_DROP_POLICY not in DROP_POLICIES:
+        logger.error(f"❌ PLIVO_QUEUE_DROP_POLICY must be one of {DROP_POLICIES}, got '{PLIVO_QUEUE_DROP_POLICY}'")
+        return
     
     # Log configuration (without secrets)
     logger.info("✅ All environment variables configured")
     logger.info(f"🔗 LiveKit URL: {LIVEKIT_URL}")
     logger.info(f"📞 WebSocket URL: {CALLBACK_WS_URL}")
     logger.info(f"🎵 Audio Config: Telephony({TELEPHONY_SAMPLE_RATE}Hz) <-> LiveKit({LIVEKIT_SAMPLE_RATE}Hz)")
+    logger.info(f"📦 Outbound queue: {PLIVO_MAX_QUEUED_MS}ms high-water, {PLIVO_QUEUE_DROP_POLICY}")
     logger.info("=" * 60)
     
-    # Global cleanup tracking
-    active_handlers = []
+    try:
+        if BRIDGE_WORKERS > 1:
+            logger.info(f"👷 Starting {BRIDGE_WORKERS} bridge workers (SO_REUSEPORT)...")
+            await run_supervisor(serve_bridge)
+        else:
+            await serve_bridge()
+    except KeyboardInterrupt:
+        logger.info("👋 Received shutdown signal")
+
+async def cleanup_all_handlers():
+    """Clean up all active handlers of this worker"""
+    handlers = registry.handlers()
+    logger.info(f"🧹 Cleaning up {len(handlers)} active handlers...")
+    if handlers:
+        await asyncio.gather(*(handler.cleanup() for handler in handlers), return_exceptions=True)
+    await wait_for_uploads()
+    logger.info("✅ All handlers cleaned up")
+
+async def serve_bridge(worker_id=0):
+    """Run the WebSocket and HTTP servers in this process (one bridge worker)"""
+    registry.worker_id = worker_id
     
-    async def cleanup_all_handlers():
-        """Clean up all active handlers"""
-        logger.info(f"🧹 Cleaning up {len(active_handlers)} active handlers...")
-        cleanup_tasks = []
-        for handler in active_handlers.copy():
-            if hasattr(handler, 'cleanup'):
-                cleanup_tasks.append(handler.cleanup())
-        
-        if cleanup_tasks:
-            await asyncio.gather(*cleanup_tasks, return_exceptions=True)
-        active_handlers.clear()
-        logger.info("✅ All handlers cleaned up")
+    # Generate the default comfort-noise loop before the first call needs it
+    ComfortNoiseMixer.from_params({"bg_noise": "true"})
     
-    # Store cleanup function globally for handlers to register themselves
-    import __main__
-    __main__.active_handlers = active_handlers
-    __main__.cleanup_all_handlers = cleanup_all_handlers
+    # Supervisor terminates workers with SIGTERM; hang up cleanly
+    loop = asyncio.get_running_loop()
+    servers_task = None
+    try:
+        loop.add_signal_handler(signal.SIGTERM, lambda: servers_task and servers_task.cancel())
+    except (NotImplementedError, RuntimeError):
+        pass
     
     try:
+        # Control server: forwarded teardowns from sibling workers and other nodes
+        if BRIDGE_WORKERS > 1 or call_directory.shared:
+            await start_control_server(registry, teardown_call, release_reserved_slot)
+        if warm_pool:
+            warm_pool.start()
+        admission.start()
+        
         # Run both servers concurrently
-        logger.info("🚀 Starting servers...")
-        await asyncio.gather(
+        logger.info(f"🚀 Starting servers (worker {worker_id}, PID {os.getpid()})...")
+        servers_task = asyncio.gather(
             start_websocket_server(),
             start_http_server()
         )
-    except KeyboardInterrupt:
+        await servers_task
+    except (KeyboardInterrupt, asyncio.CancelledError):
         logger.info("👋 Received shutdown signal")
         await cleanup_all_handlers()
     except Exception as e:
@@ -1079,6 +1580,12 @@ async def main():
         import traceback
         traceback.print_exc()
         await cleanup_all_handlers()
+    finally:
+        await admission.aclose()
+        await call_directory.aclose()
+        if warm_pool:
+            await warm_pool.aclose()
+        await livekit_pool.aclose()
 
 if __name__ == "__main__":
     try: